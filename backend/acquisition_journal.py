@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Acquisition journal: which collectors of an acquisition have finished.
+
+samsung_adb opens a journal per device run in the `acquisition_journals`
+collection and records every collector as it ends:
+
+    done         stored everything
+    interrupted  cut off by a connection drop (adb/transport errors)
+    failed       raised an error that another attempt would not fix
+
+`samsung_adb.py --resume` continues the latest open journal of the device
+(with the same acquisition options) and runs only the collectors that are
+not done or failed, in their usual order, so an acquisition interrupted
+by a wireless drop finishes in the time that was left. The journal is
+closed once every collector has ended.
+
+    python acquisition_journal.py [--serial S]   # open journals and their progress
+"""
+import argparse
+import datetime
+import threading
+
+JOURNALS = "acquisition_journals"
+
+DONE = "done"
+INTERRUPTED = "interrupted"
+FAILED = "failed"
+
+# States that need no further run.
+FINISHED = (DONE, FAILED)
+
+
+class Journal:
+    """One acquisition's collector states, written through to MongoDB."""
+
+    def __init__(self, db, doc):
+        self.db = db
+        self.doc = doc
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db, serial, options, resume=False):
+        """The latest open journal for serial+options when resuming, otherwise a new one."""
+        db[JOURNALS].create_index([("serial", 1), ("status", 1), ("started_at", -1)])
+        if resume:
+            doc = db[JOURNALS].find_one({"serial": serial, "options": options, "status": "open"},
+                                        sort=[("started_at", -1)])
+            if doc is not None:
+                return cls(db, doc)
+        now = datetime.datetime.now()
+        doc = {"serial": serial, "options": options, "status": "open", "started_at": now, "updated_at": now,
+               "runs": [], "collectors": {}}
+        doc["_id"] = db[JOURNALS].insert_one(dict(doc)).inserted_id
+        return cls(db, doc)
+
+    @property
+    def resumed(self):
+        return bool(self.doc["runs"])
+
+    def entry(self, name):
+        with self._lock:
+            return dict(self.doc["collectors"].get(name, {}))
+
+    def state(self, name):
+        return self.entry(name).get("state")
+
+    def pending(self, collectors):
+        """The collectors still to run, in the given order."""
+        return [c for c in collectors if self.state(c.__name__) not in FINISHED]
+
+    def record(self, name, state, elapsed, error=None, **extra):
+        """Store how a collector ended; `extra` fields are kept on its entry."""
+        now = datetime.datetime.now()
+        fields = {"state": state, "elapsed": elapsed, "finished_at": now, "error": error, **extra}
+        with self._lock:
+            entry = self.doc["collectors"].setdefault(name, {"attempts": 0})
+            entry.update(fields)
+            entry["attempts"] += 1
+        self.db[JOURNALS].update_one({"_id": self.doc["_id"]},
+                                     {"$set": {**{f"collectors.{name}.{k}": v for k, v in fields.items()},
+                                               "updated_at": now},
+                                      "$inc": {f"collectors.{name}.attempts": 1}})
+
+    def note(self, name, **extra):
+        """Add fields to a collector's entry without changing its state."""
+        with self._lock:
+            self.doc["collectors"].setdefault(name, {"attempts": 0}).update(extra)
+        self.db[JOURNALS].update_one({"_id": self.doc["_id"]},
+                                     {"$set": {f"collectors.{name}.{k}": v for k, v in extra.items()}})
+
+    def finish(self, collectors, elapsed):
+        """Log this run; close the journal if no collector is left. Returns the pending names."""
+        left = [c.__name__ for c in self.pending(collectors)]
+        run = {"finished_at": datetime.datetime.now(), "elapsed": elapsed, "pending": left}
+        status = "open" if left else "complete"
+        with self._lock:
+            self.doc["runs"].append(run)
+            self.doc["status"] = status
+        self.db[JOURNALS].update_one({"_id": self.doc["_id"]},
+                                     {"$push": {"runs": run}, "$set": {"status": status, "updated_at": run["finished_at"]}})
+        return left
+
+    def elapsed(self):
+        """Wall time of all runs of this acquisition so far."""
+        return sum(run["elapsed"] for run in self.doc["runs"])
+
+
+def open_journals(db, serial=None):
+    query = {"status": "open"}
+    if serial is not None:
+        query["serial"] = serial
+    return list(db[JOURNALS].find(query, sort=[("started_at", -1)]))
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="Show acquisitions that can be resumed.")
+    parser.add_argument("--serial")
+    args = parser.parse_args(argv)
+    journals = open_journals(mongo_store.get_db(), args.serial)
+    if not journals:
+        print("[-] No open acquisition journals.")
+        return
+    for doc in journals:
+        states = {}
+        for entry in doc["collectors"].values():
+            states[entry.get("state")] = states.get(entry.get("state"), 0) + 1
+        summary = ", ".join(f"{n} {s}" for s, n in sorted(states.items(), key=lambda kv: str(kv[0])))
+        print(f"[+] {doc['serial']} started {doc['started_at']:%Y-%m-%d %H:%M:%S}, {len(doc['runs'])} runs, "
+              f"options {doc['options']}: {summary or 'nothing recorded'}")
+        for name, entry in doc["collectors"].items():
+            if entry.get("state") not in FINISHED:
+                print(f"    {name:<28} {entry.get('state')}  {entry.get('error') or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Per-command profile of an acquisition.
+
+samsung_adb records every adb command it runs (wall time, bytes received,
+exit status, retries, transport) and every store into GridFS, tagged with
+the collector that issued it. At the end of a run the records are saved
+as one document in the `acquisitions` collection, next to the artifacts
+of the case, and `samsung_adb.py --profile` prints them ranked.
+
+    python acquisition_profile.py [serial]   # summary of the last stored run
+"""
+import contextlib
+import datetime
+import sys
+import threading
+import time
+
+ACQUISITIONS = "acquisitions"
+
+
+class Profile:
+    """Thread-safe list of command records for one acquisition."""
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def collector(self):
+        return getattr(self._local, "collector", None)
+
+    @collector.setter
+    def collector(self, name):
+        self._local.collector = name
+
+    def thread_initializer(self):
+        """
+        Initializer for a thread pool started by a collector: its worker
+        threads take over the calling thread's collector, so their commands
+        are not recorded (and journaled) under None.
+        """
+        name = self.collector
+
+        def init():
+            self.collector = name
+        return init
+
+    @contextlib.contextmanager
+    def measure(self, kind, command):
+        """
+        Time the block and append a record for it. The block fills in
+        "bytes", "exit_status", "retries" and "transport" on the yielded dict;
+        an exception is recorded as the error and re-raised.
+        """
+        record = {
+            "kind": kind,
+            "collector": self.collector,
+            "command": command if isinstance(command, str) else " ".join(command),
+            "bytes": 0,
+            "exit_status": None,
+            "retries": 0,
+            "transport": None,
+            "error": None,
+        }
+        start = time.perf_counter()
+        record["started_at"] = datetime.datetime.now()
+        try:
+            yield record
+        except GeneratorExit:
+            record["error"] = "abandoned"
+            raise
+        except BaseException as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record["wall"] = time.perf_counter() - start
+            with self._lock:
+                self.records.append(record)
+
+    def by_collector(self):
+        """{collector: {"commands", "adb_wall", "bytes", "stored_bytes", "errors", "retries"}}"""
+        with self._lock:
+            records = list(self.records)
+        totals = {}
+        for r in records:
+            t = totals.setdefault(r["collector"] or "-", {"commands": 0, "adb_wall": 0.0, "bytes": 0,
+                                                          "stored_bytes": 0, "errors": 0, "retries": 0})
+            if r["kind"] == "store":
+                t["stored_bytes"] += r["bytes"]
+            else:
+                t["commands"] += 1
+                t["adb_wall"] += r["wall"]
+                t["bytes"] += r["bytes"]
+                t["retries"] += r["retries"]
+            if r["error"] or r["exit_status"] not in (None, 0):
+                t["errors"] += 1
+        return totals
+
+    def errors(self, collector, since=None):
+        """Errors of the collector's records started at or after `since`."""
+        with self._lock:
+            return [r["error"] for r in self.records
+                    if r["collector"] == collector and r["error"] and (since is None or r["started_at"] >= since)]
+
+    def document(self, serial=None, fingerprint=None, timings=None, elapsed=None, workers=None):
+        """The acquisition manifest stored in the `acquisitions` collection."""
+        with self._lock:
+            records = list(self.records)
+        adb = [r for r in records if r["kind"] != "store"]
+        per_collector = self.by_collector()
+        return {
+            "serial": serial,
+            "device_fingerprint": fingerprint,
+            "finished_at": datetime.datetime.now(),
+            "wall_time": elapsed,
+            "workers": workers,
+            "collectors": {name: {"wall": wall, **per_collector.get(name, {})}
+                           for name, wall in (timings or {}).items()},
+            "totals": {
+                "commands": len(adb),
+                "adb_wall": sum(r["wall"] for r in adb),
+                "bytes": sum(r["bytes"] for r in adb),
+                "stored_bytes": sum(r["bytes"] for r in records if r["kind"] == "store"),
+                "retries": sum(r["retries"] for r in adb),
+                "failed": sum(1 for r in adb if r["error"] or r["exit_status"] not in (None, 0)),
+            },
+            "commands": records,
+        }
+
+    def save(self, db, document):
+        db[ACQUISITIONS].create_index([("serial", 1), ("finished_at", -1)])
+        return db[ACQUISITIONS].insert_one(document).inserted_id
+
+
+def print_summary(document, limit=15):
+    """Print collectors ranked by wall time and the slowest commands."""
+    totals = document["totals"]
+    print(f"\n[+] Acquisition profile for {document.get('serial') or 'device'}:")
+    print(f"    {'collector':<28} {'wall':>8} {'adb':>8} {'cmds':>5} {'received':>12} {'stored':>12} {'err':>4}")
+    collectors = sorted(document["collectors"].items(), key=lambda kv: kv[1]["wall"], reverse=True)
+    for name, c in collectors:
+        print(f"    {name:<28} {c['wall']:7.2f}s {c.get('adb_wall', 0):7.2f}s {c.get('commands', 0):>5} "
+              f"{c.get('bytes', 0):>12} {c.get('stored_bytes', 0):>12} {c.get('errors', 0):>4}")
+    print(f"    {totals['commands']} adb commands, {totals['adb_wall']:.2f}s, {totals['bytes']} bytes received, "
+          f"{totals['stored_bytes']} bytes stored, {totals['retries']} retries, {totals['failed']} failed")
+
+    print("\n[+] Slowest commands:")
+    commands = sorted((r for r in document["commands"] if r["kind"] != "store"),
+                      key=lambda r: r["wall"], reverse=True)
+    for r in commands[:limit]:
+        status = r["error"] or f"exit {r['exit_status']}"
+        rate = r["bytes"] / r["wall"] / 1024 if r["wall"] else 0
+        print(f"    {r['wall']:7.2f}s {r['bytes']:>12} B {rate:9.1f} KiB/s  {r['collector'] or '-':<24} "
+              f"{r['command'][:60]}  [{r['transport']}, {status}]")
+
+
+if __name__ == "__main__":
+    import mongo_store
+    query = {"serial": sys.argv[1]} if len(sys.argv) > 1 else {}
+    doc = mongo_store.get_db()[ACQUISITIONS].find_one(query, sort=[("finished_at", -1)])
+    if doc is None:
+        print("[-] No acquisition profile stored.")
+        sys.exit(1)
+    print_summary(doc)
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Pure-Python client for the adb host protocol (the adb server on localhost:5037).
+
+Talking to the server directly avoids forking the `adb` binary for every
+command. Each shell/exec service needs its own TCP connection to the server
+(the server hands the socket over to the service), which is a cheap local
+connect. Sync sessions are long-lived: one SyncConnection can serve any
+number of STAT/LIST/RECV requests, until adbd answers one with FAIL and
+ends the session.
+"""
+import os
+import socket
+import struct
+
+ADB_HOST = os.environ.get("ADB_SERVER_HOST", "127.0.0.1")
+ADB_PORT = int(os.environ.get("ADB_SERVER_PORT", "5037"))
+
+# shell protocol v2 packet ids
+SHELL_STDIN = 0
+SHELL_STDOUT = 1
+SHELL_STDERR = 2
+SHELL_EXIT = 3
+SHELL_CLOSE_STDIN = 4
+
+SYNC_DATA_MAX = 64 * 1024
+
+
+class AdbError(Exception):
+    """Raised when the adb server or device answers with FAIL."""
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise AdbError(f"connection closed after {len(buf)} of {size} bytes")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_upto(sock, size):
+    """Like _recv_exact, but returns a short read only at end of stream."""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            break
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _send_request(sock, payload):
+    data = payload.encode("utf-8")
+    sock.sendall(b"%04x" % len(data) + data)
+
+
+def _read_status(sock):
+    status = _recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        length = int(_recv_exact(sock, 4), 16)
+        raise AdbError(_recv_exact(sock, length).decode("utf-8", "ignore"))
+    raise AdbError(f"unexpected adb status {status!r}")
+
+
+def _read_length_prefixed(sock):
+    length = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, length).decode("utf-8", "ignore")
+
+
+class AdbClient:
+    """Issue adb commands over the server socket instead of spawning `adb`."""
+
+    def __init__(self, host=ADB_HOST, port=ADB_PORT, serial=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.serial = serial
+        self.timeout = timeout
+        self._features = None
+
+    def _connect(self, timeout=None):
+        sock = socket.create_connection((self.host, self.port), timeout=timeout or self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def host_command(self, request):
+        """Run a host:* request that answers with a length-prefixed string."""
+        with self._connect() as sock:
+            _send_request(sock, request)
+            _read_status(sock)
+            return _read_length_prefixed(sock)
+
+    def version(self):
+        return int(self.host_command("host:version"), 16)
+
+    def devices(self):
+        """Return a list of (serial, state) tuples, like `adb devices`."""
+        out = self.host_command("host:devices")
+        return [tuple(line.split("\t", 1)) for line in out.splitlines() if "\t" in line]
+
+    def connect(self, address):
+        """`adb connect host:port`; returns the server's answer ("connected to ...", "failed to ...")."""
+        return self.host_command(f"host:connect:{address}")
+
+    def disconnect(self, address):
+        return self.host_command(f"host:disconnect:{address}")
+
+    def features(self):
+        if self._features is None:
+            prefix = f"host-serial:{self.serial}" if self.serial else "host"
+            self._features = set(self.host_command(f"{prefix}:features").split(","))
+        return self._features
+
+    def open_service(self, service, timeout=None):
+        """Switch a fresh connection to the device transport and start `service`."""
+        sock = self._connect(timeout)
+        try:
+            _send_request(sock, f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+            _read_status(sock)
+            _send_request(sock, service)
+            _read_status(sock)
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    # --- shell / exec ---
+
+    def shell_stream(self, command, timeout=None):
+        """
+        Yield (stream_id, bytes) packets from a shell command.
+        Uses shell protocol v2 when the device supports it, which keeps stdout
+        and stderr apart and ends with a SHELL_EXIT packet carrying the exit code.
+        Older devices fall back to the v1 service, where everything is stdout.
+        """
+        if "shell_v2" in self.features():
+            sock = self.open_service(f"shell,v2,raw:{command}", timeout)
+            with sock:
+                while True:
+                    header = _recv_upto(sock, 5)
+                    if len(header) < 5:
+                        return
+                    stream_id, length = struct.unpack("<BI", header)
+                    payload = _recv_exact(sock, length) if length else b""
+                    yield stream_id, payload
+                    if stream_id == SHELL_EXIT:
+                        return
+        else:
+            with self.open_service(f"shell:{command}", timeout) as sock:
+                for chunk in iter(lambda: sock.recv(SYNC_DATA_MAX), b""):
+                    yield SHELL_STDOUT, chunk
+
+    def shell(self, command, timeout=None):
+        """Run a shell command and return (stdout bytes, stderr bytes, exit code or None)."""
+        out, err, code = [], [], None
+        for stream_id, payload in self.shell_stream(command, timeout):
+            if stream_id == SHELL_STDOUT:
+                out.append(payload)
+            elif stream_id == SHELL_STDERR:
+                err.append(payload)
+            elif stream_id == SHELL_EXIT:
+                code = payload[0] if payload else None
+        return b"".join(out), b"".join(err), code
+
+    def exec_stream(self, command, chunk_size=SYNC_DATA_MAX, timeout=None):
+        """Yield raw stdout chunks of `exec:` (binary-safe, like `adb exec-out`)."""
+        with self.open_service(f"exec:{command}", timeout) as sock:
+            for chunk in iter(lambda: sock.recv(chunk_size), b""):
+                yield chunk
+
+    # --- sync ---
+
+    def sync(self, timeout=None):
+        """Open a long-lived sync session; use as a context manager."""
+        return SyncConnection(self.open_service("sync:", timeout))
+
+
+class SyncConnection:
+    """A sync-protocol session. Requests can be issued back to back on one socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.sock is None:
+            return
+        try:
+            self.sock.sendall(b"QUIT" + struct.pack("<I", 0))
+        except OSError:
+            pass
+        self.sock.close()
+        self.sock = None
+
+    def _request(self, cmd, path):
+        if self.sock is None:
+            raise AdbError("sync session is closed")
+        data = path.encode("utf-8")
+        self.sock.sendall(cmd + struct.pack("<I", len(data)) + data)
+
+    def _fail(self, length):
+        """adbd closes the session after FAIL, so this one is done as well."""
+        message = _recv_exact(self.sock, length).decode("utf-8", "ignore")
+        self.sock.close()
+        self.sock = None
+        raise AdbError(message)
+
+    def stat(self, path):
+        """Return (mode, size, mtime); mode is 0 when the path does not exist."""
+        self._request(b"STAT", path)
+        reply = _recv_exact(self.sock, 16)
+        if reply[:4] != b"STAT":
+            raise AdbError(f"unexpected sync reply {reply[:4]!r}")
+        return struct.unpack("<III", reply[4:])
+
+    def list(self, path):
+        """Return [(name, mode, size, mtime)] for a directory, '.' and '..' excluded."""
+        self._request(b"LIST", path)
+        entries = []
+        while True:
+            kind = _recv_exact(self.sock, 4)
+            if kind == b"FAIL":
+                self._fail(struct.unpack("<I", _recv_exact(self.sock, 4))[0])
+            body = _recv_exact(self.sock, 16)
+            if kind == b"DONE":
+                return entries
+            if kind != b"DENT":
+                raise AdbError(f"unexpected sync reply {kind!r}")
+            mode, size, mtime, namelen = struct.unpack("<IIII", body)
+            name = _recv_exact(self.sock, namelen).decode("utf-8", "surrogateescape")
+            if name not in (".", ".."):
+                entries.append((name, mode, size, mtime))
+
+    def iter_recv(self, path):
+        """Yield the contents of a device file in DATA-sized chunks."""
+        self._request(b"RECV", path)
+        while True:
+            header = _recv_exact(self.sock, 8)
+            kind, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if kind == b"DATA":
+                yield _recv_exact(self.sock, length)
+            elif kind == b"DONE":
+                return
+            elif kind == b"FAIL":
+                self._fail(length)
+            else:
+                raise AdbError(f"unexpected sync reply {kind!r}")
+
+    def recv(self, path, sink):
+        """Copy a device file into a writable file object; returns bytes written."""
+        size = 0
+        for chunk in self.iter_recv(path):
+            sink.write(chunk)
+            size += len(chunk)
+        return size
+
+
+_clients = {}
+
+def get_client(serial=None):
+    """
+    Shared AdbClient for `serial` if an adb server is listening, otherwise None
+    so callers can fall back to the adb binary.
+    """
+    client = _clients.get(serial)
+    if client is None:
+        client = AdbClient(serial=serial)
+        try:
+            client.version()
+        except (OSError, AdbError):
+            return None
+        _clients[serial] = client
+    return client
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Timeouts and retries for adb commands.
+
+- DurationModel learns how long each command takes on each device (an
+  exponentially weighted mean and deviation, kept in the
+  `command_durations` collection across runs). Fast commands then get a
+  short inactivity timeout, so a dropped wireless link is noticed in
+  seconds, and slow watches get a total budget that fits them instead of
+  a fixed 30/60/120 s.
+- A hang is a read that has been blocked for longer than the inactivity
+  timeout (IdleTimeout), however long the command has been running.
+- Transient failures (device offline, connection reset, hangs) are retried
+  with full-jitter exponential backoff, as long as no output has been
+  handed to the caller yet.
+- adb children run in their own process group so everything they start
+  is killed with them on timeout or cancel.
+- ConnectionSupervisor brings a dropped device back: it waits for it and,
+  for wireless serials (host:port), re-runs `adb connect` with backoff.
+  Commands call it before retrying, so one drop is handled once for all
+  the collectors that hit it.
+"""
+import os
+import random
+import re
+import signal
+import subprocess
+import threading
+import time
+
+from pymongo import UpdateOne
+
+DURATIONS = "command_durations"
+
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 15.0
+
+# Reconnecting a dropped wireless device: attempts and backoff bounds.
+MAX_RECONNECTS = 8
+RECONNECT_BASE = 2.0
+RECONNECT_CAP = 30.0
+
+# Smoothing factor of the duration mean/deviation: higher follows recent
+# runs more closely.
+EWMA_ALPHA = 0.3
+
+# Bounds for learnt timeouts, in seconds.
+MIN_IDLE_TIMEOUT = 15
+DEVIATIONS = 4
+
+# adb / transport errors worth another attempt. Errors from the command on
+# the device (permission denied, unknown service, ...) are not.
+TRANSIENT_PATTERNS = re.compile(
+    r"device offline|device '.*' not found|no devices|device not found|error: closed|"
+    r"protocol fault|connection reset|broken pipe|unable to connect|timed out|connection refused",
+    re.IGNORECASE,
+)
+
+
+class IdleTimeout(subprocess.TimeoutExpired):
+    """No output for longer than the inactivity timeout."""
+
+
+def is_transient(error):
+    if isinstance(error, IdleTimeout):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return bool(TRANSIENT_PATTERNS.search(str(error)))
+
+
+def backoff(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Seconds to wait before retry number `attempt` (0-based), full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_network_serial(serial):
+    """True for serials of devices attached with `adb connect host:port`."""
+    return bool(serial) and re.fullmatch(r"[\w.\-]+:\d+", serial) is not None
+
+
+class ConnectionSupervisor:
+    """
+    Waits for a device that dropped off adb to come back. `online()` says
+    whether it is attached; `connect(address)` re-attaches a wireless one.
+    Only one thread reconnects at a time, the others wait for its outcome.
+    Once it has given up, later calls only check whether the device is back.
+    """
+
+    def __init__(self, serial, online, connect, attempts=MAX_RECONNECTS):
+        self.serial = serial
+        self.online = online
+        self.connect = connect
+        self.attempts = attempts
+        self.reconnects = 0
+        self.lost = False
+        self._lock = threading.Lock()
+
+    def ensure(self):
+        """True once the device is online again; False if it stayed away for every attempt."""
+        if self.online():
+            self.lost = False
+            return True
+        with self._lock:
+            if self.online():
+                return True
+            if self.lost:
+                return False
+            for attempt in range(self.attempts):
+                if is_network_serial(self.serial):
+                    answer = self.connect(self.serial)
+                    print(f"[!] {self.serial} dropped off adb, reconnecting ({attempt + 1}/{self.attempts}): {answer}")
+                else:
+                    print(f"[!] {self.serial or 'device'} dropped off adb, waiting ({attempt + 1}/{self.attempts})")
+                if self.online():
+                    self.reconnects += 1
+                    print(f"[+] {self.serial or 'device'} is back")
+                    return True
+                time.sleep(backoff(attempt, RECONNECT_BASE, RECONNECT_CAP) + 1)
+            self.lost = not self.online()
+            return not self.lost
+
+
+# Popen arguments that give the child its own process group.
+if os.name == "nt":
+    PROCESS_GROUP = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    PROCESS_GROUP = {"start_new_session": True}
+
+
+def kill_process_group(proc):
+    """Kill a child started with PROCESS_GROUP together with everything it spawned."""
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        proc.kill()
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        proc.kill()
+
+
+class ReadWatchdog:
+    """
+    Kills a process when one of its reads has been blocked for longer than
+    `idle` seconds or the whole command exceeds `total`. Time the consumer
+    spends between reads does not count as inactivity.
+    """
+
+    def __init__(self, proc, idle, total, interval=0.5):
+        self.proc = proc
+        self.idle = idle
+        self.total = total
+        self.started = time.monotonic()
+        self.waiting_since = None
+        self.fired = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def read(self, read, size):
+        self.waiting_since = time.monotonic()
+        try:
+            return read(size)
+        finally:
+            self.waiting_since = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            now = time.monotonic()
+            waiting = self.waiting_since
+            if waiting is not None and now - waiting > self.idle:
+                self.fired = "idle"
+            elif now - self.started > self.total:
+                self.fired = "total"
+            else:
+                continue
+            kill_process_group(self.proc)
+            return
+
+    def stop(self):
+        self._stop.set()
+
+
+class DurationModel:
+    """Learnt wall time of each (serial, command)."""
+
+    def __init__(self, alpha=EWMA_ALPHA):
+        self.alpha = alpha
+        self.stats = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def load(self, db, serial):
+        """Read what earlier runs learnt about this device (one query)."""
+        for doc in db[DURATIONS].find({"serial": serial}, {"_id": 0, "command": 1, "mean": 1, "dev": 1, "runs": 1}):
+            self.stats[(serial, doc["command"])] = {"mean": doc["mean"], "dev": doc["dev"], "runs": doc["runs"]}
+
+    def observe(self, serial, command, seconds):
+        key = (serial, command)
+        with self._lock:
+            s = self.stats.get(key)
+            if s is None:
+                s = {"mean": seconds, "dev": seconds / 2, "runs": 0}
+            else:
+                error = seconds - s["mean"]
+                s = {"mean": s["mean"] + self.alpha * error,
+                     "dev": (1 - self.alpha) * s["dev"] + self.alpha * abs(error),
+                     "runs": s["runs"]}
+            s["runs"] += 1
+            self.stats[key] = s
+            self._dirty.add(key)
+
+    def timeouts(self, serial, command, default):
+        """
+        (idle, total) seconds for a command. Without history both are the
+        caller's default. With history the inactivity timeout tightens to the
+        expected duration plus DEVIATIONS deviations (at least
+        MIN_IDLE_TIMEOUT), and the total budget grows to fit slow devices.
+        """
+        s = self.stats.get((serial, command))
+        if s is None:
+            return default, default
+        expected = s["mean"] + DEVIATIONS * s["dev"]
+        total = max(default, 3 * expected)
+        return min(total, max(MIN_IDLE_TIMEOUT, expected)), total
+
+    def save(self, db):
+        """Write the updated estimates back in one bulk upsert."""
+        with self._lock:
+            keys, self._dirty = self._dirty, set()
+            ops = [UpdateOne({"serial": serial, "command": command},
+                             {"$set": self.stats[(serial, command)]}, upsert=True)
+                   for serial, command in keys]
+        if ops:
+            db[DURATIONS].create_index([("serial", 1), ("command", 1)], unique=True)
+            db[DURATIONS].bulk_write(ops, ordered=False)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Page through a stored artifact without loading it whole.
+
+Used by the /artifact/content and /artifact/download routes of server.js,
+so the UI can fetch slices on demand:
+
+    python artifact_reader.py <filename> [--serial S] [--start N] [--lines M]
+    python artifact_reader.py <filename> [--serial S] --offset B --length L
+    python artifact_reader.py <filename> [--serial S] --raw
+
+Prints one JSON object with the requested slice, or with --raw streams the
+original (decompressed) bytes to stdout for downloads.
+"""
+import argparse
+import json
+import sys
+
+import evidence_store
+import mongo_store
+
+DEFAULT_PAGE_LINES = 200
+MAX_PAGE_BYTES = 4 * 1024 * 1024
+
+
+def read_page(db, fs, filename, serial=None, start=0, lines=DEFAULT_PAGE_LINES):
+    """Return a dict with `lines` lines of the artifact starting at line `start`."""
+    version = evidence_store.latest_version(db, filename, serial)
+    if version is None:
+        return None
+    page = evidence_store.read_lines(db, fs, version, start, lines)
+    return {
+        "filename": filename,
+        "start": start,
+        "lines": len(page),
+        "line_count": version.get("line_count"),
+        "size": version["length"],
+        "sha256": version["sha256"],
+        "text": "\n".join(line.decode("utf-8", "ignore") for line in page),
+    }
+
+
+def read_bytes(db, fs, filename, serial=None, offset=0, length=64 * 1024):
+    """Return a dict with `length` bytes of the artifact starting at `offset`."""
+    version = evidence_store.latest_version(db, filename, serial)
+    if version is None:
+        return None
+    data = evidence_store.read_range(fs, version, offset, min(length, MAX_PAGE_BYTES))
+    return {
+        "filename": filename,
+        "offset": offset,
+        "length": len(data),
+        "size": version["length"],
+        "sha256": version["sha256"],
+        "text": data.decode("utf-8", "ignore"),
+    }
+
+
+def write_raw(db, fs, filename, serial=None, out=None):
+    """Stream the original bytes of the latest version to `out`; False if missing."""
+    version = evidence_store.latest_version(db, filename, serial)
+    if version is None:
+        return False
+    out = out or sys.stdout.buffer
+    for chunk in evidence_store.iter_version(fs, version):
+        out.write(chunk)
+    out.flush()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read a slice of a stored artifact.")
+    parser.add_argument("filename")
+    parser.add_argument("--serial")
+    parser.add_argument("--start", type=int, default=0, help="first line (0-based)")
+    parser.add_argument("--lines", type=int, default=DEFAULT_PAGE_LINES)
+    parser.add_argument("--offset", type=int, help="byte offset; switches to byte-range mode")
+    parser.add_argument("--length", type=int, default=64 * 1024)
+    parser.add_argument("--raw", action="store_true", help="write the whole artifact to stdout")
+    args = parser.parse_args(argv)
+
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    if args.raw:
+        if not write_raw(db, fs, args.filename, args.serial):
+            print(f"Artifact '{args.filename}' not found", file=sys.stderr)
+            sys.exit(1)
+        return
+    if args.offset is not None:
+        result = read_bytes(db, fs, args.filename, args.serial, args.offset, args.length)
+    else:
+        result = read_page(db, fs, args.filename, args.serial, args.start, args.lines)
+
+    if result is None:
+        print(json.dumps({"error": f"Artifact '{args.filename}' not found"}))
+        sys.exit(1)
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Battery history from `dumpsys batterystats --history` as a columnar time series.
+
+The history is delta encoded: each line carries its time since the start
+of the history and only what changed,
+
+                        0 (15) RESET:TIME: 2024-03-30-10-00-00
+                        0 (2) 100 status=discharging plug=none +running +screen ...
+          +1s234ms (2) 100 -screen
+          +5m00s010ms (3) 099 +wake_lock=u0a123:"*sync*" -running
+
+("+name" turns a state on, "-name" off, "name=value" sets it; the three
+digit number is the battery level). The text is streamed into evidence
+storage and parsed on the way through into typed columns, never held as
+a whole:
+
+    transitions   time int64 (epoch ms, UTC), name int32, value int32, kind int8
+    levels        time int64, level uint8 (only when it changes)
+
+`name`/`value` index string tables kept in the blob header; kind is ON,
+OFF or SET. Times come from the history's TIME stamps (device local
+time; the timezone is printed by the same shell call) plus the elapsed
+offset of each line. The columns are stored as "battery_history.bin" in
+the columnar.py format, so load() returns numpy views, and state_at()
+answers "what was the battery/screen/charger/wakelock state" for a whole
+array of timestamps (logcat entries, sensor events) with one
+searchsorted per state.
+
+    python battery_history.py [--serial S]              # summary of the latest history
+"""
+import argparse
+import array
+import datetime
+import re
+import zoneinfo
+
+import numpy as np
+
+import columnar
+import evidence_store
+import text_stream
+
+HISTORY_FILE = "battery_history.bin"
+SOURCE_FILE = "batterystats_history.txt"
+CONTENT_TYPE = "application/x-battery-history"
+MAGIC = b"BATHIST1"
+
+COMMAND = text_stream.TIMEZONE_COMMAND + "dumpsys batterystats --history"
+
+ON, OFF, SET = 1, 0, 2
+
+HISTORY_LINE = re.compile(r"^\s*(0|[+-][\dhms]+)\s+\(\d+\)\s+(.*)$")
+OFFSET_PART = re.compile(r"(\d+)(ms|d|h|m|s)")
+TIME_STAMP = re.compile(r"(?:RESET:)?TIME:\s*(\d{4}-\d\d-\d\d-\d\d-\d\d-\d\d)")
+TOKEN = re.compile(r'([+-]?)([A-Za-z_][\w.]*)(?:=((?:[^\s"]|"[^"]*")*))?')
+UNITS_MS = {"d": 86400000, "h": 3600000, "m": 60000, "s": 1000, "ms": 1}
+
+# States most joins ask for.
+SCREEN, PLUGGED, WAKE_LOCK, STATUS = "screen", "plug", "wake_lock", "status"
+
+
+def parse_offset(text):
+    """History time ("+1h02m03s004ms", "0") in milliseconds."""
+    return sum(int(n) * UNITS_MS[unit] for n, unit in OFFSET_PART.findall(text))
+
+
+def _unquote(value):
+    return value[1:-1] if len(value) > 1 and value[0] == value[-1] == '"' else value
+
+
+class HistoryParser:
+    """
+    Streaming parser for COMMAND's output: feed() raw chunks, then
+    columns() returns the arrays. Memory grows with the number of state
+    transitions, not with the text.
+    """
+
+    def __init__(self):
+        self.tz = datetime.timezone.utc
+        self.names, self.values = [], []
+        self._name_ids, self._value_ids = {}, {}
+        self._elapsed = array.array("q")
+        self._name = array.array("i")
+        self._value = array.array("i")
+        self._kind = array.array("b")
+        self._level_elapsed = array.array("q")
+        self._level = array.array("B")
+        # (elapsed ms, epoch ms) at each TIME stamp, to place elapsed times on the clock
+        self.clock = []
+        self._lines = text_stream.LineFeed(self._line)
+
+    def feed(self, chunk):
+        self._lines.feed(chunk)
+
+    def _intern(self, table, ids, text):
+        if text not in ids:
+            ids[text] = len(table)
+            table.append(text)
+        return ids[text]
+
+    def _line(self, line):
+        tz = text_stream.timezone_line(line, self.tz)
+        if tz is not None:
+            self.tz = tz
+            return
+        match = HISTORY_LINE.match(line)
+        if not match:
+            return
+        elapsed = parse_offset(match.group(1))
+        rest = match.group(2)
+        stamp = TIME_STAMP.search(rest)
+        if stamp:
+            local = datetime.datetime.strptime(stamp.group(1), "%Y-%m-%d-%H-%M-%S").replace(tzinfo=self.tz)
+            self.clock.append((elapsed, int(local.timestamp() * 1000)))
+            return
+        level, _, tokens = rest.partition(" ")
+        if level.isdigit() and len(level) == 3:
+            if not self._level or self._level[-1] != int(level):
+                self._level_elapsed.append(elapsed)
+                self._level.append(min(int(level), 255))
+        else:
+            tokens = rest
+        for sign, name, value in TOKEN.findall(tokens):
+            if not sign and not value:
+                continue
+            self._elapsed.append(elapsed)
+            self._name.append(self._intern(self.names, self._name_ids, name))
+            self._value.append(self._intern(self.values, self._value_ids, _unquote(value)) if value else -1)
+            self._kind.append(ON if sign == "+" else OFF if sign == "-" else SET)
+
+    def _clock_time(self, elapsed):
+        """Elapsed history ms -> epoch ms, from the latest TIME stamp at or before each (the first stamp for earlier lines)."""
+        elapsed = np.asarray(elapsed, dtype=np.int64)
+        if not self.clock:
+            return np.full(len(elapsed), -1, dtype=np.int64)
+        marks = np.array([c[0] for c in self.clock], dtype=np.int64)
+        walls = np.array([c[1] for c in self.clock], dtype=np.int64)
+        index = np.clip(np.searchsorted(marks, elapsed, side="right") - 1, 0, len(marks) - 1)
+        return walls[index] + (elapsed - marks[index])
+
+    def columns(self):
+        self._lines.close()
+        # A clock change can step TIME backwards; keep every column time ordered.
+        time = self._clock_time(self._elapsed)
+        order = np.argsort(time, kind="stable")
+        level_time = self._clock_time(self._level_elapsed)
+        level_order = np.argsort(level_time, kind="stable")
+        return {
+            "time": time[order],
+            "name": np.frombuffer(self._name, dtype=np.int32)[order],
+            "value": np.frombuffer(self._value, dtype=np.int32)[order],
+            "kind": np.frombuffer(self._kind, dtype=np.int8)[order],
+            "level_time": level_time[level_order],
+            "level": np.frombuffer(self._level, dtype=np.uint8)[level_order],
+        }
+
+    def encode(self):
+        columns = self.columns()
+        meta = {"names": self.names, "values": self.values,
+                "timezone": self.tz.key if isinstance(self.tz, zoneinfo.ZoneInfo) else None}
+        return columnar.pack(MAGIC, meta, columns)
+
+
+class History:
+    """Decoded battery history: numpy views plus the string tables."""
+
+    def __init__(self, meta, columns):
+        self.names = meta["names"]
+        self.values = meta["values"]
+        self.timezone = meta.get("timezone")
+        self.time = columns["time"]
+        self.name = columns["name"]
+        self.value = columns["value"]
+        self.kind = columns["kind"]
+        self.level_time = columns["level_time"]
+        self.level = columns["level"]
+
+    def __len__(self):
+        return len(self.time)
+
+    def span(self):
+        """(first, last) epoch ms covered, or None."""
+        times = np.concatenate([self.time[self.time >= 0], self.level_time[self.level_time >= 0]])
+        return (int(times.min()), int(times.max())) if len(times) else None
+
+    def between(self, start_ms, end_ms):
+        """Index range [i, j) of the transitions with start <= time < end (times are sorted)."""
+        return int(np.searchsorted(self.time, start_ms, "left")), int(np.searchsorted(self.time, end_ms, "left"))
+
+    def transitions(self, start_ms, end_ms):
+        """Yield (epoch ms, name, value or None, kind) for transitions in [start, end)."""
+        i, j = self.between(start_ms, end_ms)
+        for k in range(i, j):
+            value = self.value[k]
+            yield int(self.time[k]), self.names[self.name[k]], self.values[value] if value >= 0 else None, int(self.kind[k])
+
+    def level_at(self, times_ms):
+        """Battery level at each epoch ms (-1 before the first sample)."""
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        index = np.searchsorted(self.level_time, times_ms, "right") - 1
+        levels = self.level.astype(np.int16)[np.clip(index, 0, None)] if len(self.level) else np.zeros(len(times_ms), np.int16)
+        return np.where(index >= 0, levels, -1)
+
+    def state_at(self, name, times_ms):
+        """
+        State of `name` at each epoch ms: for on/off states an int8 array
+        (1 on, 0 off, -1 unknown); for name=value states a list of values
+        (None where unset).
+        """
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        if name not in self.names:
+            return np.full(len(times_ms), -1, dtype=np.int8)
+        rows = np.flatnonzero(self.name == self.names.index(name))
+        index = np.searchsorted(self.time[rows], times_ms, "right") - 1
+        kinds = self.kind[rows]
+        if len(rows) and (kinds == SET).all():
+            values = self.value[rows]
+            return [self.values[values[i]] if i >= 0 else None for i in index]
+        state = np.where(kinds == OFF, 0, 1).astype(np.int8)
+        return np.where(index >= 0, state[np.clip(index, 0, None)], -1).astype(np.int8)
+
+
+def store(db, fs, parser, source_sha256=None, tags=None, batch=None):
+    """Store a parsed history as the next version of battery_history.bin; returns the version doc."""
+    data = parser.encode()
+    tags = {**(tags or {}), "source_file": SOURCE_FILE, "source_sha256": source_sha256}
+    return evidence_store.put_bytes(db, fs, HISTORY_FILE, data, tags=tags, content_type=CONTENT_TYPE,
+                                    batch=batch, binary=True)
+
+
+def load(db, fs, serial=None):
+    """History of the latest stored version, or None."""
+    version = evidence_store.latest_version(db, HISTORY_FILE, serial)
+    if version is None:
+        return None
+    with evidence_store.open_version(fs, version) as reader:
+        return History(*columnar.unpack(MAGIC, reader.read()))
+
+
+def epoch_ms(times):
+    """datetimes (naive ones are UTC) -> int64 epoch ms array."""
+    return np.array([int((t if t.tzinfo else t.replace(tzinfo=datetime.timezone.utc)).timestamp() * 1000)
+                     for t in times], dtype=np.int64)
+
+
+def join_logcat(db, history, start, end, serial=None, states=(SCREEN, PLUGGED, WAKE_LOCK)):
+    """
+    Battery state at every decoded logcat entry (see pull_binary_logs) in
+    [start, end): yields (entry, {"level": n, state: ...}). Only the entry
+    fields are read from Mongo, never the text dump.
+    """
+    query = {"time": {"$gte": start, "$lt": end}}
+    if serial is not None:
+        query["serial"] = serial
+    entries = list(db["logcat_entries"].find(query, {"_id": 0, "time": 1, "tag": 1, "priority": 1, "message": 1},
+                                             sort=[("time", 1)]))
+    times = epoch_ms(e["time"] for e in entries)
+    columns = {"level": history.level_at(times), **{s: history.state_at(s, times) for s in states}}
+    for i, entry in enumerate(entries):
+        yield entry, {k: (v[i].item() if hasattr(v[i], "item") else v[i]) for k, v in columns.items()}
+
+
+def join_sensor(history, wall, reference, states=(SCREEN, PLUGGED, WAKE_LOCK)):
+    """
+    Battery state at sensor events. `wall` is sensor_store's time-of-day
+    column; each value is placed on the latest day at or before
+    `reference` (the acquisition time, aware) in the history's timezone.
+    Returns {"time": epoch ms, "level": ..., state: ...} arrays.
+    """
+    tz = zoneinfo.ZoneInfo(history.timezone) if history.timezone else reference.tzinfo
+    local = reference.astimezone(tz)
+    midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    reference_of_day = int((local - midnight).total_seconds() * 1000)
+    day_start = int(midnight.timestamp() * 1000)
+    wall = np.asarray(wall, dtype=np.int64)
+    times = day_start + wall - np.where(wall > reference_of_day, 86400000, 0)
+    return {"time": times, "level": history.level_at(times), **{s: history.state_at(s, times) for s in states}}
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="Summarize the latest stored battery history.")
+    parser.add_argument("--serial")
+    args = parser.parse_args(argv)
+    history = load(mongo_store.get_db(), mongo_store.get_fs(), args.serial)
+    if history is None:
+        print("[-] No battery history stored.")
+        return
+    span = history.span()
+    if span:
+        first, last = (datetime.datetime.fromtimestamp(t / 1000, datetime.timezone.utc) for t in span)
+        print(f"[+] {len(history)} transitions, {len(history.level)} level changes, {first:%Y-%m-%d %H:%M} - {last:%Y-%m-%d %H:%M} UTC")
+    counts = np.bincount(history.name, minlength=len(history.names))
+    for i in np.argsort(counts)[::-1][:15]:
+        print(f"    {history.names[i]:<32} {counts[i]:>8}")
+
+
+if __name__ == "__main__":
+    main()
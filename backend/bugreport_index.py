@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Section index of a stored bugreport zip.
+
+`bugreportz -s` produces one zip holding everything the individual
+dumpsys/logcat/getprop calls would return. After it is stored as a raw
+blob, one pass over its main text entry records where every section
+starts and ends:
+
+    ------ SYSTEM LOG (logcat -v threadtime -d *:v) ------      kind "section"
+    DUMP OF SERVICE wifi:                                        kind "service"
+
+Zip members (proto dumps, FS/data/system/dropbox/* entries, ...) are
+indexed as kind "member" / "dropbox". Each section gets its offset and
+length inside the member, SHA-256, line count and sparse line index, kept
+in the `bugreport_sections` collection. The usual artifact names
+(wifi_information.txt, sensor_data.txt, ...) are then recorded as slice
+versions of the zip (evidence_store.record_slice): reading one decompresses
+only that member up to the end of the slice.
+
+    python bugreport_index.py [--serial S]      # list the sections of the latest bugreport
+"""
+import argparse
+import datetime
+import re
+import zipfile
+
+import evidence_store
+
+SECTIONS = "bugreport_sections"
+BUGREPORT_FILE = "bugreport.zip"
+
+SECTION_HEADER = re.compile(rb"^------ (.*?)(?: \((.*)\))? ------\s*$")
+DURATION_LINE = re.compile(rb"^-{6,} [\d.]+s was the duration of ")
+SERVICE_HEADER = re.compile(rb"^DUMP OF SERVICE (?:(?:CRITICAL|HIGH|NORMAL) )?(\S+?):\s*$")
+
+# Artifact name -> (kind, name pattern, command pattern) of the section holding it.
+ARTIFACT_SECTIONS = {
+    "device_properties.txt": ("section", r"SYSTEM PROPERTIES", None),
+    "logcat_capture.txt": ("section", r"SYSTEM LOG", None),
+    "account_information.txt": ("service", r"account", None),
+    "wifi_information.txt": ("service", r"wifi", None),
+    "bluetooth_information.txt": ("service", r"bluetooth_manager", None),
+    "ip_address_information.txt": ("section", None, r"\bip (-\d )?addr"),
+    "sensor_data.txt": ("service", r"sensorservice", None),
+    "dumpsys_location.txt": ("service", r"location", None),
+    "keystore_information.txt": ("service", r"(android\.security\.)?keystore2?", None),
+    "trust_information.txt": ("service", r"trust", None),
+    "notification_information.txt": ("service", r"notification", None),
+    "activity_summary.log": ("service", r"activity", None),
+}
+
+
+def main_entry(archive):
+    """Name of the bugreport text inside the zip."""
+    names = archive.namelist()
+    if "main_entry.txt" in names:
+        name = archive.read("main_entry.txt").decode("utf-8", "ignore").strip()
+        if name in names:
+            return name
+    texts = [i for i in archive.infolist() if i.filename.endswith(".txt") and "/" not in i.filename]
+    if not texts:
+        return None
+    return max(texts, key=lambda i: i.file_size).filename
+
+
+class _Open:
+    """A section being read: where its body starts and the stats of its bytes so far."""
+
+    def __init__(self, kind, name, command, offset, line):
+        self.kind, self.name, self.command = kind, name, command
+        self.offset, self.line = offset, line
+        self.stats = evidence_store.StreamStats()
+
+    def close(self, member):
+        return {"member": member, "kind": self.kind, "name": self.name, "command": self.command,
+                "offset": self.offset, "line_start": self.line, "stats": self.stats}
+
+
+def scan_text(reader, member):
+    """
+    One pass over a bugreport text stream. Returns the sections with their
+    body offsets and StreamStats; the header line itself is not part of a
+    section, so a service slice reads like the plain `dumpsys <service>`.
+    """
+    sections = []
+    top = service = None
+    offset = lineno = 0
+    for line in reader:
+        next_offset = offset + len(line)
+        duration = DURATION_LINE.match(line)
+        header = SECTION_HEADER.match(line) if line.startswith(b"------") and not duration else None
+        if duration and service and b"duration of dumpsys " in line:
+            # end of one service inside DUMPSYS; the DUMPSYS section goes on
+            sections.append(service.close(member))
+            service = None
+            if top:
+                top.stats.update(line)
+        elif header or duration:
+            if service:
+                sections.append(service.close(member))
+                service = None
+            if top:
+                sections.append(top.close(member))
+                top = None
+            if header:
+                name = header.group(1).decode("utf-8", "replace")
+                command = header.group(2).decode("utf-8", "replace") if header.group(2) else None
+                top = _Open("section", name, command, next_offset, lineno + 1)
+        elif line.startswith(b"DUMP OF SERVICE"):
+            match = SERVICE_HEADER.match(line)
+            if service:
+                sections.append(service.close(member))
+                service = None
+            if match:
+                service = _Open("service", match.group(1).decode("utf-8", "replace"),
+                                f"dumpsys {match.group(1).decode('utf-8', 'replace')}", next_offset, lineno + 1)
+            if top:
+                top.stats.update(line)
+        else:
+            for open_section in (top, service):
+                if open_section:
+                    open_section.stats.update(line)
+        offset, lineno = next_offset, lineno + 1
+    for open_section in (service, top):
+        if open_section:
+            sections.append(open_section.close(member))
+    return sections
+
+
+def scan_members(archive, skip):
+    """Every other zip member as a section of its own (dropbox entries flagged)."""
+    sections = []
+    for info in archive.infolist():
+        if info.is_dir() or info.filename == skip:
+            continue
+        stats = evidence_store.StreamStats()
+        with archive.open(info) as member:
+            for chunk in iter(lambda: member.read(1024 * 1024), b""):
+                stats.update(chunk)
+        kind = "dropbox" if "/dropbox/" in info.filename else "member"
+        sections.append({"member": info.filename, "kind": kind, "name": info.filename, "command": None,
+                         "offset": 0, "line_start": 0, "stats": stats})
+    return sections
+
+
+def build_index(fs, file_id):
+    """Scan a stored bugreport zip; returns its sections (with StreamStats)."""
+    with zipfile.ZipFile(fs.get(file_id)) as archive:
+        main = main_entry(archive)
+        sections = []
+        if main:
+            with archive.open(main) as reader:
+                sections = scan_text(reader, main)
+        return sections + scan_members(archive, main)
+
+
+def save_index(db, file_id, sections, serial=None):
+    """
+    Store the index in bugreport_sections, one insert_many. A zip that was
+    stored before (same blob) has its index replaced rather than duplicated.
+    """
+    db[SECTIONS].create_index([("file_id", 1), ("kind", 1), ("name", 1)])
+    db[SECTIONS].delete_many({"file_id": file_id})
+    indexed_at = datetime.datetime.now()
+    docs = [{
+        "file_id": file_id,
+        "serial": serial,
+        "member": s["member"],
+        "kind": s["kind"],
+        "name": s["name"],
+        "command": s["command"],
+        "offset": s["offset"],
+        "length": s["stats"].size,
+        "line_start": s["line_start"],
+        "line_count": s["stats"].line_count,
+        "sha256": evidence_store.digests(s["stats"].hashers)["sha256"],
+        "indexed_at": indexed_at,
+    } for s in sections]
+    if docs:
+        db[SECTIONS].insert_many(docs, ordered=False)
+    return docs
+
+
+def find_section(sections, kind, name=None, command=None):
+    """The largest section matching kind and name/command patterns, or None."""
+    matches = [
+        s for s in sections
+        if s["kind"] == kind
+        and (name is None or re.fullmatch(name, s["name"] or "", re.IGNORECASE))
+        and (command is None or re.search(command, s["command"] or ""))
+    ]
+    return max(matches, key=lambda s: s["stats"].size, default=None)
+
+
+def record_artifacts(db, file_id, sections, tags=None, batch=None):
+    """
+    Record every artifact of ARTIFACT_SECTIONS found in the bugreport as a
+    slice version. Returns {artifact name: version doc}.
+    """
+    versions = {}
+    for filename, (kind, name, command) in ARTIFACT_SECTIONS.items():
+        section = find_section(sections, kind, name, command)
+        if section is None or not section["stats"].size:
+            continue
+        versions[filename] = evidence_store.record_slice(
+            db, filename, file_id, section["member"], section["offset"], section["stats"],
+            tags={**(tags or {}), "section": f"{section['kind']}:{section['name']}"}, batch=batch,
+        )
+    return versions
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="List the sections of the latest stored bugreport.")
+    parser.add_argument("--serial")
+    args = parser.parse_args(argv)
+    db = mongo_store.get_db()
+    version = evidence_store.latest_version(db, BUGREPORT_FILE, args.serial)
+    if version is None:
+        print("[-] No bugreport stored.")
+        return
+    for s in db[SECTIONS].find({"file_id": version["file_id"]}, sort=[("member", 1), ("offset", 1)]):
+        print(f"{s['kind']:<8} {s['length']:>10} {s['line_count']:>8}  {s['name']}  [{s['member']}@{s['offset']}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Blob format for typed columns (numpy arrays) that are read without copying.
+
+    magic (8 bytes) | header length u32 | header JSON | padding | columns...
+
+The header holds caller metadata and, per column, its dtype, shape and
+offset. Columns are stored raw and 8-byte aligned, so unpack() returns
+numpy views straight into the stored bytes (numpy.frombuffer).
+"""
+import json
+import struct
+
+import numpy as np
+
+ALIGN = 8
+
+
+def _padding(size):
+    return -size % ALIGN
+
+
+def pack(magic, meta, columns):
+    """Serialize {name: ndarray} plus JSON-able `meta` into one blob."""
+    descriptors, body, offset = {}, [], 0
+    for name, array in columns.items():
+        data = np.ascontiguousarray(array)
+        descriptors[name] = {"dtype": data.dtype.str, "shape": list(data.shape), "offset": offset}
+        raw = data.tobytes()
+        body += [raw, b"\0" * _padding(len(raw))]
+        offset += len(raw) + _padding(len(raw))
+    header = json.dumps({"meta": meta, "columns": descriptors}, separators=(",", ":")).encode("utf-8")
+    prefix = magic + struct.pack("<I", len(header)) + header
+    return prefix + b"\0" * _padding(len(prefix)) + b"".join(body)
+
+
+def unpack(magic, buffer):
+    """(meta, {name: read-only ndarray view into `buffer`}); nothing is copied."""
+    view = memoryview(buffer)
+    if bytes(view[:len(magic)]) != magic:
+        raise ValueError(f"not a {magic.decode('ascii', 'replace')} blob")
+    (size,) = struct.unpack_from("<I", view, len(magic))
+    start = len(magic) + 4
+    header = json.loads(bytes(view[start:start + size]))
+    base = start + size + _padding(start + size)
+    columns = {}
+    for name, d in header["columns"].items():
+        count = int(np.prod(d["shape"], dtype=np.int64))
+        columns[name] = np.frombuffer(view, np.dtype(d["dtype"]), count, base + d["offset"]).reshape(d["shape"])
+    return header["meta"], columns
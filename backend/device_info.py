@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Device identity from one batched shell call.
+
+BATCH_COMMAND returns the full `getprop` dump and the Android ID in a
+single round trip. The dump is parsed into a key/value dict, the identity
+and build properties are written out as basic_device_info.txt
+("Key: Value" lines, as report_gen expects), and the device is kept in the
+`devices` collection, indexed on serial, model, build fingerprint and
+Android ID so a case lookup by device is an index hit.
+
+    python device_info.py [--serial S] [--model M] [--fingerprint F] [--android-id A]
+"""
+import argparse
+import datetime
+import re
+
+import pymongo
+
+DEVICES = "devices"
+
+# Separates the getprop dump from the settings output in BATCH_COMMAND.
+MARKER = "----- android_id -----"
+BATCH_COMMAND = f"getprop; echo '{MARKER}'; settings get secure android_id"
+
+PROPERTY_LINE = re.compile(r"^\[(.*?)\]: \[(.*)$")
+
+# Label -> property, in the order they appear in the report.
+BASIC_PROPERTIES = [
+    ("Manufacturer", "ro.product.manufacturer"),
+    ("Brand", "ro.product.brand"),
+    ("Model", "ro.product.model"),
+    ("Device", "ro.product.device"),
+    ("Product Name", "ro.product.name"),
+    ("Hardware", "ro.hardware"),
+    ("Serial Number", "ro.serialno"),
+    ("Android Version", "ro.build.version.release"),
+    ("SDK Level", "ro.build.version.sdk"),
+    ("Security Patch", "ro.build.version.security_patch"),
+    ("Build ID", "ro.build.display.id"),
+    ("Build Fingerprint", "ro.build.fingerprint"),
+    ("Build Date", "ro.build.date"),
+    ("Build Type", "ro.build.type"),
+    ("Bootloader", "ro.bootloader"),
+    ("Baseband", "gsm.version.baseband"),
+    ("Timezone", "persist.sys.timezone"),
+    ("Locale", "persist.sys.locale"),
+    ("Boot Completed", "sys.boot_completed"),
+]
+
+
+def split_output(output):
+    """(getprop text, android id or None) of BATCH_COMMAND's output."""
+    props, _, rest = output.partition(MARKER)
+    android_id = rest.strip()
+    if not android_id or android_id == "null":
+        android_id = None
+    return props.strip(), android_id
+
+
+def parse_getprop(text):
+    """`getprop` output as {key: value}. Values may span several lines."""
+    props, key, value = {}, None, None
+    for line in text.splitlines():
+        match = PROPERTY_LINE.match(line) if key is None else None
+        if match:
+            key, value = match.group(1), match.group(2)
+        elif key is not None:
+            value += "\n" + line
+        else:
+            continue
+        if value.endswith("]"):
+            props[key] = value[:-1]
+            key = None
+    return props
+
+
+def basic_info(props, android_id=None, serial=None):
+    """[(label, value)] of the identity and build properties that are set."""
+    rows = [("ADB Serial", serial)] if serial else []
+    rows += [(label, props[key]) for label, key in BASIC_PROPERTIES if props.get(key)]
+    if android_id:
+        rows.append(("Android ID", android_id))
+    return rows
+
+
+def info_text(rows):
+    return "".join(f"{label}: {value}\n" for label, value in rows)
+
+
+def ensure_indexes(db):
+    for field in ("serial", "model", "fingerprint", "android_id"):
+        db[DEVICES].create_index(field)
+    db[DEVICES].create_index([("serial", 1), ("fingerprint", 1), ("android_id", 1)], unique=True)
+
+
+def save_device(db, serial, props, android_id=None, properties_file_id=None):
+    """
+    Upsert the device document; one per (serial, build fingerprint, Android
+    ID), so an OS update or factory reset shows up as a new document.
+    The getprop dump is kept as [{"key", "value"}] pairs: property names
+    contain dots, which are not usable as field names.
+    Returns its _id.
+    """
+    ensure_indexes(db)
+    now = datetime.datetime.now()
+    key = {"serial": serial, "fingerprint": props.get("ro.build.fingerprint"), "android_id": android_id}
+    result = db[DEVICES].find_one_and_update(
+        key,
+        {
+            "$set": {
+                "model": props.get("ro.product.model"),
+                "manufacturer": props.get("ro.product.manufacturer"),
+                "android_version": props.get("ro.build.version.release"),
+                "security_patch": props.get("ro.build.version.security_patch"),
+                "properties": [{"key": k, "value": v} for k, v in sorted(props.items())],
+                "properties_file_id": properties_file_id,
+                "last_seen": now,
+            },
+            "$setOnInsert": {"first_seen": now},
+            "$inc": {"acquisitions": 1},
+        },
+        upsert=True,
+        projection={"_id": 1},
+        return_document=pymongo.ReturnDocument.AFTER,
+    )
+    return result["_id"]
+
+
+def find_devices(db, serial=None, model=None, fingerprint=None, android_id=None):
+    """Device documents matching the given identifiers, most recently seen first."""
+    query = {field: value for field, value in (("serial", serial), ("model", model), ("fingerprint", fingerprint),
+                                               ("android_id", android_id)) if value is not None}
+    return list(db[DEVICES].find(query, {"properties": 0}, sort=[("last_seen", -1)]))
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="Look up acquired devices by identifier.")
+    parser.add_argument("--serial")
+    parser.add_argument("--model")
+    parser.add_argument("--fingerprint")
+    parser.add_argument("--android-id")
+    args = parser.parse_args(argv)
+    devices = find_devices(mongo_store.get_db(), args.serial, args.model, args.fingerprint, args.android_id)
+    if not devices:
+        print("[-] No matching device.")
+        return
+    for d in devices:
+        print(f"[+] {d['serial']}  {d.get('manufacturer') or ''} {d.get('model') or ''}  "
+              f"android_id={d.get('android_id')}  seen {d['acquisitions']}x, last {d['last_seen']:%Y-%m-%d %H:%M}")
+        print(f"    {d.get('fingerprint')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Verify stored artifacts against hashes computed on the watch.
+
+Every stored version that was pulled from a file on the device carries its
+`source_path` (btsnoop logs, files from fs_acquisition.py). Instead of
+pulling those files a second time, the device runs `sha256sum` over all of
+them in one shell invocation, split into parallel groups, and only the
+digests travel back. They are compared with the SHA-256 recorded when the
+bytes were stored. Files in an app's private storage (databases pulled
+with run-as, see sqlite_acquisition.py) are not readable by the shell
+user and are hashed through `run-as <package> sha256sum` instead; one
+that cannot be hashed that way is reported as "unverifiable", not
+"missing".
+
+Artifacts captured from command output (dumpsys, logcat, getprop, ...)
+have no file on the device to re-hash and are not covered.
+
+    python device_verify.py [--serial S] [--parallel N]
+"""
+import argparse
+import datetime
+import re
+import shlex
+
+from pymongo import UpdateOne
+
+import evidence_store
+import mongo_store
+import samsung_adb
+
+VERIFICATIONS = "verifications"
+
+# sha256sum processes started side by side on the device.
+DEFAULT_PARALLEL = 4
+
+# The adb host protocol caps a service request at 64 KiB; stay below it so
+# the whole batch fits one shell invocation (larger sets are split).
+MAX_COMMAND_BYTES = 60 * 1024
+
+PRIVATE_PATH = re.compile(r"^/data/(?:data|user/\d+)/([^/]+)/")
+
+STATUSES = ("match", "mismatch", "missing", "unverifiable")
+
+
+def sourced_versions(db, serial=None):
+    """Latest version of every stored device file, keyed by source_path."""
+    match = {"source_path": {"$exists": True, "$ne": None}}
+    if serial is not None:
+        match["serial"] = serial
+    pipeline = [
+        {"$match": match},
+        {"$sort": dict(evidence_store.NEWEST_FIRST)},
+        {"$group": {"_id": "$source_path", "doc": {"$first": "$$ROOT"}}},
+        {"$project": {"doc._id": 1, "doc.filename": 1, "doc.sha256": 1, "doc.length": 1,
+                      "doc.serial": 1, "doc.acquired_at": 1, "doc.package": 1}},
+    ]
+    return {doc["_id"]: doc["doc"] for doc in db[evidence_store.VERSIONS].aggregate(pipeline)}
+
+
+def private_package(path, version):
+    """The app whose private storage `path` is in, or None for shell-readable files."""
+    match = PRIVATE_PATH.match(path)
+    if match is None:
+        return None
+    return version.get("package") or match.group(1)
+
+
+def hash_commands(paths, parallel=DEFAULT_PARALLEL, run_as=None):
+    """
+    Shell command lines that sha256sum `paths`, each with up to `parallel`
+    background sha256sum processes and no longer than MAX_COMMAND_BYTES.
+    With `run_as`, sha256sum runs as that app (`run-as <package>`).
+    """
+    commands, batch, size = [], [], 0
+    for path in paths:
+        quoted = shlex.quote(path)
+        if batch and size + len(quoted) + 1 > MAX_COMMAND_BYTES:
+            commands.append(_hash_command(batch, parallel, run_as))
+            batch, size = [], 0
+        batch.append(quoted)
+        size += len(quoted) + 1
+    if batch:
+        commands.append(_hash_command(batch, parallel, run_as))
+    return commands
+
+
+def _hash_command(batch, parallel, run_as=None):
+    prefix = f"run-as {shlex.quote(run_as)} " if run_as else ""
+    groups = [batch[i::parallel] for i in range(min(parallel, len(batch)))]
+    return " ".join(f"{prefix}sha256sum {' '.join(g)} 2>/dev/null &" for g in groups) + " wait"
+
+
+def device_hashes(paths, parallel=DEFAULT_PARALLEL, timeout=600, adb_lines=None, packages=None):
+    """
+    {path: sha256} as computed on the device; unreadable paths are absent.
+    `packages` maps app-private paths to their package, hashed via run-as.
+    `adb_lines` runs an adb command and yields its output lines
+    (samsung_adb.iter_adb_lines by default).
+    """
+    adb_lines = adb_lines or samsung_adb.iter_adb_lines
+    packages = packages or {}
+    by_package = {}
+    for path in paths:
+        by_package.setdefault(packages.get(path), []).append(path)
+    commands = []
+    for package, group in by_package.items():
+        commands += hash_commands(group, parallel, run_as=package)
+    hashes = {}
+    for command in commands:
+        for line in adb_lines(['shell', command], timeout=timeout):
+            # "<digest>  <path>"; a leading backslash marks an escaped path
+            digest, sep, path = line.partition("  ")
+            if sep and len(digest) == 64 and not digest.startswith("\\"):
+                hashes[path] = digest.lower()
+    return hashes
+
+
+def verify(db, serial=None, parallel=DEFAULT_PARALLEL, adb_lines=None):
+    """
+    Compare stored SHA-256 with on-device SHA-256 for every sourced artifact.
+    Each version doc gets a `device_verification` field; the run is stored
+    in the `verifications` collection and returned.
+    """
+    versions = sourced_versions(db, serial)
+    packages = {path: private_package(path, v) for path, v in versions.items() if private_package(path, v)}
+    on_device = (device_hashes(sorted(versions), parallel, adb_lines=adb_lines, packages=packages)
+                 if versions else {})
+    checked_at = datetime.datetime.now()
+    results, updates = [], []
+    for path, version in versions.items():
+        device = on_device.get(path)
+        if device is None:
+            status = "unverifiable" if path in packages else "missing"
+        elif device == version["sha256"]:
+            status = "match"
+        else:
+            status = "mismatch"
+        results.append({"source_path": path, "filename": version["filename"], "version_id": version["_id"],
+                        "stored_sha256": version["sha256"], "device_sha256": device, "status": status})
+        updates.append(UpdateOne({"_id": version["_id"]}, {"$set": {"device_verification": {
+            "status": status, "device_sha256": device, "checked_at": checked_at}}}))
+    if updates:
+        db[evidence_store.VERSIONS].bulk_write(updates, ordered=False)
+    report = {
+        "serial": serial,
+        "checked_at": checked_at,
+        "counts": {s: sum(1 for r in results if r["status"] == s) for s in STATUSES},
+        "bytes_verified": sum(versions[r["source_path"]]["length"] for r in results if r["status"] == "match"),
+        "results": results,
+    }
+    report["_id"] = db[VERIFICATIONS].insert_one(report).inserted_id
+    return report
+
+
+def print_report(report):
+    counts = report["counts"]
+    print(f"[+] Verified {len(report['results'])} device files on the watch: {counts['match']} match, "
+          f"{counts['mismatch']} mismatch, {counts['missing']} missing, {counts['unverifiable']} unverifiable "
+          f"({report['bytes_verified']} bytes confirmed without re-transfer)")
+    for r in report["results"]:
+        if r["status"] != "match":
+            print(f"[!] {r['status']}: {r['source_path']} (stored {r['stored_sha256']}, "
+                  f"device {r['device_sha256'] or '-'})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify stored device files against on-device SHA-256.")
+    parser.add_argument("--serial")
+    parser.add_argument("--parallel", type=int, default=DEFAULT_PARALLEL,
+                        help=f"sha256sum processes run at once on the device (default {DEFAULT_PARALLEL})")
+    args = parser.parse_args(argv)
+    serial = args.serial
+    if not serial:
+        serials = samsung_adb.list_adb_devices()
+        if len(serials) != 1:
+            print(f"[-] {len(serials)} devices attached; use --serial.")
+            return
+        serial = serials[0]
+    samsung_adb.select_device(serial)
+    print_report(verify(mongo_store.get_db(), serial, args.parallel))
+
+
+if __name__ == "__main__":
+    main()
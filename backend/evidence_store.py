@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Content-addressed, versioned artifact storage on top of GridFS.
+
+Blobs are GridFS files keyed by the SHA-256 of their contents; identical
+bytes are stored once no matter how often or under which name they are
+acquired. Every acquisition of an artifact adds a small document to the
+`artifact_versions` collection pointing at its blob and at the previous
+version of the same artifact (per filename and serial). Re-acquiring an
+unchanged dump therefore costs one metadata insert and no upload, and
+nothing is ever deleted.
+
+Text blobs can be stored zstd-compressed. The codec is recorded on the
+GridFS file (`codec`, `raw_length`) and every reader goes through
+open_version/open_latest, which decompress transparently as a stream.
+Hashes are always those of the original, uncompressed bytes.
+
+An acquisition that stores many artifacts passes a VersionBatch: previous
+versions are loaded in one query, unchanged artifacts are recognised
+without a blob lookup and all version docs go out in one insert_many.
+"""
+import datetime
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+
+import pymongo
+from bson import ObjectId
+
+try:
+    import zstandard
+except ImportError:  # compression is optional; blobs are then stored raw
+    zstandard = None
+
+VERSIONS = "artifact_versions"
+
+# Hashes besides SHA-256 to compute while storing, e.g. "md5,sha1".
+EXTRA_HASHES = tuple(a.strip().lower() for a in os.environ.get("EVIDENCE_EXTRA_HASHES", "").split(",") if a.strip())
+HASH_FIELDS = ("sha256",) + EXTRA_HASHES
+
+# Codec for blobs stored with compress=True: "zstd" or "none".
+COMPRESSION = (os.environ.get("EVIDENCE_COMPRESSION") or "zstd").lower()
+ZSTD_LEVEL = 3
+
+# Distance in bytes between line-index checkpoints, so read_lines() can
+# jump close to any line instead of scanning the blob from the start.
+LINE_INDEX_SPACING = 1024 * 1024
+
+# _id breaks ties between versions stored within the same millisecond.
+NEWEST_FIRST = [("acquired_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+
+
+# Version doc fields a VersionBatch keeps: enough to link the next version,
+# reuse the blob and write the manifest.
+PREVIOUS_FIELDS = {"_id": 1, "sha256": 1, "version": 1, "file_id": 1, "hashes": 1, "length": 1,
+                   "line_count": 1, "content_type": 1, "serial": 1, "acquired_at": 1, "slice": 1}
+
+_indexed = set()
+
+
+def ensure_indexes(db):
+    """Create the storage indexes; only the first call per database and process talks to Mongo."""
+    if db.name in _indexed:
+        return
+    db.fs.files.create_index("sha256")
+    db[VERSIONS].create_index([("filename", 1), ("serial", 1), ("acquired_at", -1), ("_id", -1)])
+    db[VERSIONS].create_index("sha256")
+    _indexed.add(db.name)
+
+
+def new_hashers():
+    return {name: hashlib.new(name) for name in HASH_FIELDS}
+
+
+def digests(hashers):
+    return {name: h.hexdigest() for name, h in hashers.items()}
+
+
+def _codec(compress):
+    if compress and COMPRESSION == "zstd" and zstandard is not None:
+        return "zstd"
+    return None
+
+
+# Blob fields copied onto version docs (and into the manifest).
+BLOB_INFO = {"_id": 1, "length": 1, "raw_length": 1, "sha256": 1, "hashes": 1,
+             "line_count": 1, "content_type": 1}
+
+
+def find_blob(db, sha256):
+    """
+    Return the GridFS files doc holding these bytes, or None.
+    Blobs carry `sha256` (indexed, the content key) and a `hashes` document
+    with every digest computed at write time.
+    """
+    return db.fs.files.find_one({"sha256": sha256}, BLOB_INFO)
+
+
+def latest_version(db, filename, serial=None, projection=None):
+    """Most recent version doc of an artifact; any serial when serial is None."""
+    query = {"filename": filename}
+    if serial is not None:
+        query["serial"] = serial
+    return db[VERSIONS].find_one(query, projection, sort=NEWEST_FIRST)
+
+
+class StreamStats:
+    """Hashes, size, line count and sparse line index of a byte stream."""
+
+    def __init__(self):
+        self.hashers = new_hashers()
+        self.size = 0
+        self.newlines = 0
+        self.last_byte = b""
+        # [byte offset, newlines before that offset]
+        self.line_index = [[0, 0]]
+
+    def update(self, chunk):
+        if not chunk:
+            return
+        if self.size - self.line_index[-1][0] >= LINE_INDEX_SPACING:
+            self.line_index.append([self.size, self.newlines])
+        for h in self.hashers.values():
+            h.update(chunk)
+        self.size += len(chunk)
+        self.newlines += chunk.count(b"\n")
+        self.last_byte = chunk[-1:]
+
+    @property
+    def line_count(self):
+        return self.newlines + (1 if self.size and self.last_byte != b"\n" else 0)
+
+    def info(self, content_type):
+        return {
+            "hashes": digests(self.hashers),
+            "length": self.size,
+            "line_count": self.line_count,
+            "content_type": content_type,
+        }
+
+
+def _blob_info(blob):
+    return {
+        "hashes": blob.get("hashes") or {"sha256": blob["sha256"]},
+        "length": blob.get("raw_length", blob["length"]),
+        "line_count": blob.get("line_count"),
+        "content_type": blob.get("content_type"),
+    }
+
+
+def _version_info(doc):
+    return {key: doc.get(key) for key in ("hashes", "length", "line_count", "content_type")}
+
+
+def _version_doc(filename, file_id, info, previous, reused, tags):
+    sha256 = info["hashes"]["sha256"]
+    changed = previous is None or previous["sha256"] != sha256
+    return {
+        "filename": filename,
+        "sha256": sha256,
+        "file_id": file_id,
+        **info,
+        "version": (previous["version"] if previous else 0) + (1 if changed else 0),
+        "changed": changed,
+        "reused_blob": reused,
+        "previous_id": previous["_id"] if previous else None,
+        "acquired_at": datetime.datetime.now(),
+        **tags,
+    }
+
+
+def record_version(db, filename, file_id, info, reused=False, tags=None):
+    """
+    Insert a version doc for an acquisition and link it to the previous one.
+    Hashes, size, line count and content type are copied onto the version
+    so integrity checks and the manifest never need to touch the blob.
+    """
+    tags = tags or {}
+    previous = latest_version(db, filename, tags.get("serial"), PREVIOUS_FIELDS)
+    doc = _version_doc(filename, file_id, info, previous, reused, tags)
+    doc["_id"] = db[VERSIONS].insert_one(doc).inserted_id
+    return doc
+
+
+class VersionBatch:
+    """
+    Version docs of one acquisition, written together.
+
+    The latest versions of the expected artifacts are loaded up front in one
+    aggregate. Recording a version then needs no query, bytes identical to
+    an already known version are matched without a blob lookup, and the
+    docs are inserted with one insert_many per `flush_every` versions (ids
+    are assigned client-side so previous_id links hold before the write).
+    Safe to share between collector threads.
+    """
+
+    def __init__(self, db, filenames=(), serial=None, flush_every=500):
+        self.db = db
+        self.serial = serial
+        self.flush_every = flush_every
+        self.latest = latest_versions(db, filenames, serial, PREVIOUS_FIELDS) if filenames else {}
+        self._loaded = set(filenames)
+        # Slices point into a larger blob, so they cannot stand in for one.
+        self._by_sha256 = {doc["sha256"]: doc for doc in self.latest.values() if not doc.get("slice")}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def known(self, sha256):
+        """Version doc already holding these bytes, or None."""
+        return self._by_sha256.get(sha256)
+
+    def _previous(self, filename, serial):
+        if serial == self.serial and (filename in self.latest or filename in self._loaded):
+            return self.latest.get(filename)
+        previous = latest_version(self.db, filename, serial, PREVIOUS_FIELDS)
+        if serial == self.serial:
+            self._loaded.add(filename)
+            if previous is not None:
+                self.latest[filename] = previous
+        return previous
+
+    def record(self, filename, file_id, info, reused=False, tags=None):
+        tags = tags or {}
+        with self._lock:
+            doc = _version_doc(filename, file_id, info, self._previous(filename, tags.get("serial")), reused, tags)
+            doc["_id"] = ObjectId()
+            self._pending.append(doc)
+            if tags.get("serial") == self.serial:
+                self.latest[filename] = doc
+            if not doc.get("slice"):
+                self._by_sha256.setdefault(doc["sha256"], doc)
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+        return doc
+
+    def _flush(self):
+        if self._pending:
+            self.db[VERSIONS].insert_many(self._pending)
+            self._pending = []
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def manifest(self, filenames):
+        """Manifest of the batch's latest versions, without a query (see manifest())."""
+        self.flush()
+        return {name: _manifest_entry(self.latest[name]) for name in filenames if name in self.latest}
+
+
+def _existing(db, sha256, batch=None):
+    """(file_id, info) of a stored blob with these bytes, or None."""
+    doc = batch.known(sha256) if batch is not None else None
+    if doc is not None:
+        return doc["file_id"], _version_info(doc)
+    blob = find_blob(db, sha256)
+    if blob:
+        return blob["_id"], _blob_info(blob)
+    return None
+
+
+def _record(db, filename, file_id, info, reused, tags, batch):
+    if batch is not None:
+        return batch.record(filename, file_id, info, reused=reused, tags=tags)
+    return record_version(db, filename, file_id, info, reused=reused, tags=tags)
+
+
+def put_bytes(db, fs, filename, data, tags=None, compress=False,
+              content_type="application/octet-stream", batch=None, **file_fields):
+    """
+    Store in-memory bytes. The hash is known up front, so an existing blob
+    is referenced without uploading anything. With compress=True the blob
+    is zstd-compressed (when available). With a VersionBatch the version
+    doc is queued on it instead of inserted. Returns the version doc.
+    """
+    stats = StreamStats()
+    for i in range(0, len(data), LINE_INDEX_SPACING):
+        stats.update(data[i:i + LINE_INDEX_SPACING])
+    info = stats.info(content_type)
+    existing = _existing(db, info["hashes"]["sha256"], batch)
+    if existing:
+        return _record(db, filename, *existing, True, tags, batch)
+    codec = _codec(compress)
+    stored = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data) if codec else data
+    file_id = fs.put(stored, filename=filename, uploadDate=datetime.datetime.now(),
+                     sha256=info["hashes"]["sha256"], hashes=info["hashes"], codec=codec,
+                     raw_length=len(data), line_count=info["line_count"], line_index=stats.line_index,
+                     content_type=content_type, **file_fields)
+    return _record(db, filename, file_id, info, False, tags, batch)
+
+
+def put_stream(db, fs, filename, chunks, tags=None, compress=False,
+               content_type="application/octet-stream", batch=None, **file_fields):
+    """
+    Store an iterable of byte chunks without holding them in memory.
+    Hashes are computed from the same chunks as they are uploaded. They are
+    only known at the end, so the upload happens first and is aborted (its
+    chunks removed) when a blob with the same hash already exists.
+    Returns the version doc.
+    """
+    stats = StreamStats()
+    codec = _codec(compress)
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj() if codec else None
+    grid_in = fs.new_file(filename=filename, uploadDate=datetime.datetime.now(), codec=codec,
+                          content_type=content_type, **file_fields)
+    try:
+        for chunk in chunks:
+            stats.update(chunk)
+            grid_in.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            grid_in.write(compressor.flush())
+        info = stats.info(content_type)
+        existing = _existing(db, info["hashes"]["sha256"], batch)
+        if existing:
+            grid_in.abort()
+            return _record(db, filename, *existing, True, tags, batch)
+        grid_in.sha256 = info["hashes"]["sha256"]
+        grid_in.hashes = info["hashes"]
+        grid_in.raw_length = stats.size
+        grid_in.line_count = info["line_count"]
+        grid_in.line_index = stats.line_index
+        grid_in.close()
+    except BaseException:
+        grid_in.abort()
+        raise
+    return _record(db, filename, grid_in._id, info, False, tags, batch)
+
+
+def record_slice(db, filename, file_id, member, offset, stats, content_type="text/plain; charset=utf-8",
+                 tags=None, batch=None):
+    """
+    Record a version whose bytes are a slice of a zip member already stored
+    as `file_id` (see bugreport_index.py). `stats` is the StreamStats of
+    the slice; its hashes and line index go on the version doc, so reads
+    never touch the rest of the archive.
+    """
+    tags = {**(tags or {}), "slice": {"member": member, "offset": offset, "length": stats.size},
+            "line_index": stats.line_index}
+    return _record(db, filename, file_id, stats.info(content_type), True, tags, batch)
+
+
+def open_blob(fs, file_id):
+    """
+    Readable file object with the original bytes of a blob, decompressing
+    on the fly when it was stored with a codec.
+    """
+    grid_out = fs.get(file_id)
+    codec = getattr(grid_out, "codec", None)
+    if codec is None:
+        return grid_out
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(f"blob {file_id} is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().stream_reader(grid_out, closefd=True)
+    raise RuntimeError(f"blob {file_id} uses unknown codec {codec!r}")
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+
+class SliceReader(io.RawIOBase):
+    """
+    Bytes [offset, offset + length) of one member of a zip stored as a raw
+    blob. Only that member is read, and only up to the end of the slice;
+    seeking backwards rewinds the member.
+    """
+
+    def __init__(self, fs, file_id, member, offset, length):
+        self._zip = zipfile.ZipFile(fs.get(file_id))
+        self._member = self._zip.open(member)
+        self._offset = offset
+        self._length = length
+        self._pos = 0
+        self._member.seek(offset)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        size = min(len(b), self._length - self._pos)
+        if size <= 0:
+            return 0
+        data = self._member.read(size)
+        b[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            pos += self._pos
+        elif whence == io.SEEK_END:
+            pos += self._length
+        self._pos = max(0, min(pos, self._length))
+        self._member.seek(self._offset + self._pos)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._member.close()
+            self._zip.close()
+        super().close()
+
+
+def open_version(fs, version):
+    """Readable file object with the original bytes of a version (blob or slice)."""
+    piece = version.get("slice")
+    if piece:
+        return io.BufferedReader(SliceReader(fs, version["file_id"], piece["member"],
+                                             piece["offset"], piece["length"]))
+    return open_blob(fs, version["file_id"])
+
+
+def iter_version(fs, version, chunk_size=1024 * 1024):
+    """Yield the original bytes of a version in chunks."""
+    with open_version(fs, version) as reader:
+        for chunk in iter(lambda: reader.read(chunk_size), b""):
+            yield chunk
+
+
+def open_latest(db, fs, filename, serial=None):
+    """Readable file object for the latest version of an artifact, or None."""
+    version = latest_version(db, filename, serial)
+    if version is None:
+        return None
+    return open_version(fs, version)
+
+
+def read_range(fs, version, offset=0, length=64 * 1024):
+    """Return `length` original bytes of a version starting at `offset`."""
+    with open_version(fs, version) as reader:
+        reader.seek(offset)
+        return reader.read(length)
+
+
+def read_lines(db, fs, version, start=0, count=200):
+    """
+    Return up to `count` lines (bytes, without newline) starting at 0-based
+    line `start`. The blob's line index (a slice's own, on its version doc)
+    lets this seek to within LINE_INDEX_SPACING bytes of the first wanted
+    line; zstd blobs still have to be decompressed up to that point, but
+    nothing is held in memory.
+    """
+    line_index = version.get("line_index")
+    if line_index is None:
+        blob = db.fs.files.find_one({"_id": version["file_id"]}, {"line_index": 1})
+        line_index = (blob or {}).get("line_index")
+    offset, seen = 0, 0
+    for entry_offset, entry_newlines in line_index or [[0, 0]]:
+        if entry_newlines < start and entry_offset > offset:
+            offset, seen = entry_offset, entry_newlines
+
+    lines = []
+    pending = b""
+    with open_version(fs, version) as reader:
+        reader.seek(offset)
+        for chunk in iter(lambda: reader.read(64 * 1024), b""):
+            parts = (pending + chunk).split(b"\n")
+            pending = parts.pop()
+            for part in parts:
+                if seen >= start:
+                    lines.append(part)
+                    if len(lines) == count:
+                        return lines
+                seen += 1
+    if pending and seen >= start:
+        lines.append(pending)
+    return lines
+
+
+def history(db, filename, serial=None):
+    """All versions of an artifact, newest first."""
+    query = {"filename": filename}
+    if serial is not None:
+        query["serial"] = serial
+    return list(db[VERSIONS].find(query, sort=NEWEST_FIRST))
+
+
+def latest_versions(db, filenames=None, serial=None, projection=None):
+    """
+    Latest version doc of each artifact in one aggregate over the
+    artifact_versions index, without reading any blob. `projection` limits
+    the fields returned. Returns {filename: version doc}.
+    """
+    match = {}
+    if filenames is not None:
+        match["filename"] = {"$in": list(filenames)}
+    if serial is not None:
+        match["serial"] = serial
+    pipeline = [
+        {"$match": match},
+        {"$sort": dict(NEWEST_FIRST)},
+        {"$group": {"_id": "$filename", "doc": {"$first": "$$ROOT"}}},
+    ]
+    if projection:
+        pipeline.append({"$project": {f"doc.{key}": 1 for key in projection}})
+    return {doc["_id"]: doc["doc"] for doc in db[VERSIONS].aggregate(pipeline)}
+
+
+def artifact_hashes(db, filenames=None, serial=None):
+    """
+    Stored hashes of the latest version of each artifact.
+    Returns {filename: {"sha256": ..., "length": ..., "acquired_at": ...}}.
+    """
+    return {
+        filename: {**doc["hashes"], "length": doc["length"],
+                   "serial": doc.get("serial"), "acquired_at": doc["acquired_at"]}
+        for filename, doc in latest_versions(db, filenames, serial).items()
+    }
+
+
+def _manifest_entry(doc):
+    return {
+        "size": doc["length"],
+        "line_count": doc.get("line_count"),
+        "sha256": doc["sha256"],
+        "hashes": doc["hashes"],
+        "content_type": doc.get("content_type"),
+        "file_id": str(doc["file_id"]),
+        "version": doc["version"],
+        "serial": doc.get("serial"),
+        "acquired_at": doc["acquired_at"].isoformat(),
+    }
+
+
+def manifest(db, filenames=None, serial=None):
+    """
+    Compact description of the latest artifacts: size, line count, hashes,
+    content type and GridFS id. Contents are fetched separately with
+    read_lines/read_range (see artifact_reader.py).
+    """
+    return {filename: _manifest_entry(doc)
+            for filename, doc in latest_versions(db, filenames, serial).items()}
+
+
+if __name__ == "__main__":
+    # Print the stored hashes as JSON for the UI and verification scripts:
+    #   python evidence_store.py [serial]
+    import mongo_store
+    db = mongo_store.get_db()
+    hashes = artifact_hashes(db, serial=sys.argv[1] if len(sys.argv) > 1 else None)
+    print(json.dumps(hashes, indent=2, default=str))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the adb server that replays recorded responses.
+
+Point AdbClient (or ADB_SERVER_PORT) at it to exercise the collectors without
+a watch attached. A recording is a JSON document:
+
+    {
+      "serial": "R3AW30ABCDE",
+      "features": ["shell_v2", "cmd"],
+      "shell": {"getprop": {"stdout": "...", "stderr": "", "exit": 0}},
+      "files": {"/sdcard/a.txt": {"data": "...", "mode": 33188, "mtime": 0}},
+      "dirs": {"/sdcard": ["a.txt"]}
+    }
+
+Shell output that is not valid UTF-8 can be given as "stdout_b64".
+`record_responses` builds such a file from a real device.
+"""
+import base64
+import json
+import socket
+import struct
+import sys
+import threading
+
+from adb_client import AdbClient, SHELL_STDOUT, SHELL_STDERR, SHELL_EXIT
+
+DIR_MODE = 0o040755
+FILE_MODE = 0o100644
+
+
+def _b(entry, key):
+    if f"{key}_b64" in entry:
+        return base64.b64decode(entry[f"{key}_b64"])
+    return entry.get(key, "").encode("utf-8")
+
+
+class FakeAdbServer:
+    """Threaded TCP server speaking enough of the adb host protocol for AdbClient."""
+
+    def __init__(self, recording, host="127.0.0.1", port=0):
+        self.recording = recording
+        self.requests = []
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(16)
+        self.host, self.port = self._sock.getsockname()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def client(self, **kwargs):
+        return AdbClient(host=self.host, port=self.port, **kwargs)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._sock.close()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    # --- protocol ---
+
+    def _read_request(self, conn):
+        length = int(self._recv(conn, 4), 16)
+        request = self._recv(conn, length).decode("utf-8")
+        self.requests.append(request)
+        return request
+
+    @staticmethod
+    def _recv(conn, size):
+        buf = b""
+        while len(buf) < size:
+            chunk = conn.recv(size - len(buf))
+            if not chunk:
+                raise ConnectionError("client went away")
+            buf += chunk
+        return buf
+
+    @staticmethod
+    def _okay(conn, payload=None):
+        conn.sendall(b"OKAY")
+        if payload is not None:
+            data = payload.encode("utf-8")
+            conn.sendall(b"%04x" % len(data) + data)
+
+    @staticmethod
+    def _fail(conn, message):
+        data = message.encode("utf-8")
+        conn.sendall(b"FAIL" + b"%04x" % len(data) + data)
+
+    def _handle(self, conn):
+        serial = self.recording.get("serial", "emulator-5554")
+        try:
+            with conn:
+                request = self._read_request(conn)
+                if request == "host:version":
+                    return self._okay(conn, "0029")
+                if request == "host:devices":
+                    return self._okay(conn, f"{serial}\tdevice\n")
+                if request.endswith(":features"):
+                    return self._okay(conn, ",".join(self.recording.get("features", ["shell_v2"])))
+                if request not in ("host:transport-any", f"host:transport:{serial}"):
+                    return self._fail(conn, f"device '{request.rsplit(':', 1)[-1]}' not found")
+                self._okay(conn)
+                self._service(conn, self._read_request(conn))
+        except ConnectionError:
+            pass
+
+    def _service(self, conn, service):
+        if service == "sync:":
+            self._okay(conn)
+            return self._sync(conn)
+        kind, _, command = service.partition(":")
+        entry = self.recording.get("shell", {}).get(command)
+        if entry is None:
+            return self._fail(conn, f"no recorded response for {command!r}")
+        self._okay(conn)
+        stdout, stderr = _b(entry, "stdout"), _b(entry, "stderr")
+        if kind.startswith("shell,v2"):
+            for stream_id, data in ((SHELL_STDOUT, stdout), (SHELL_STDERR, stderr)):
+                if data:
+                    conn.sendall(struct.pack("<BI", stream_id, len(data)) + data)
+            conn.sendall(struct.pack("<BIB", SHELL_EXIT, 1, entry.get("exit", 0)))
+        else:
+            conn.sendall(stdout + (stderr if kind == "shell" else b""))
+
+    def _sync(self, conn):
+        files = self.recording.get("files", {})
+        dirs = self.recording.get("dirs", {})
+        while True:
+            header = self._recv(conn, 8)
+            cmd, length = header[:4], struct.unpack("<I", header[4:])[0]
+            if cmd == b"QUIT":
+                return
+            path = self._recv(conn, length).decode("utf-8")
+            if cmd == b"STAT":
+                if path in dirs:
+                    conn.sendall(b"STAT" + struct.pack("<III", DIR_MODE, 4096, 0))
+                elif path in files:
+                    f = files[path]
+                    conn.sendall(b"STAT" + struct.pack("<III", f.get("mode", FILE_MODE),
+                                                       len(_b(f, "data")), f.get("mtime", 0)))
+                else:
+                    conn.sendall(b"STAT" + struct.pack("<III", 0, 0, 0))
+            elif cmd == b"LIST":
+                for name in dirs.get(path, []):
+                    child = f"{path.rstrip('/')}/{name}"
+                    if child in dirs:
+                        mode, size, mtime = DIR_MODE, 4096, 0
+                    else:
+                        f = files.get(child, {})
+                        mode, size, mtime = f.get("mode", FILE_MODE), len(_b(f, "data")), f.get("mtime", 0)
+                    raw = name.encode("utf-8")
+                    conn.sendall(b"DENT" + struct.pack("<IIII", mode, size, mtime, len(raw)) + raw)
+                conn.sendall(b"DONE" + struct.pack("<IIII", 0, 0, 0, 0))
+            elif cmd == b"RECV":
+                if path not in files:
+                    # like adbd, end the sync session after a failed RECV
+                    msg = b"No such file or directory"
+                    conn.sendall(b"FAIL" + struct.pack("<I", len(msg)) + msg)
+                    return
+                data = _b(files[path], "data")
+                for i in range(0, len(data), 64 * 1024):
+                    piece = data[i:i + 64 * 1024]
+                    conn.sendall(b"DATA" + struct.pack("<I", len(piece)) + piece)
+                conn.sendall(b"DONE" + struct.pack("<I", 0))
+            else:
+                msg = f"unknown sync command {cmd!r}".encode("utf-8")
+                conn.sendall(b"FAIL" + struct.pack("<I", len(msg)) + msg)
+                return
+
+
+def record_responses(client, commands, path):
+    """Run shell commands against a real device and save them as a recording."""
+    serial = client.serial or client.devices()[0][0]
+    recording = {"serial": serial, "features": sorted(client.features()), "shell": {}}
+    for command in commands:
+        out, err, code = client.shell(command)
+        recording["shell"][command] = {
+            "stdout_b64": base64.b64encode(out).decode("ascii"),
+            "stderr_b64": base64.b64encode(err).decode("ascii"),
+            "exit": code or 0,
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(recording, f, indent=2)
+    return recording
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python fake_adb_server.py <recording.json> <port>")
+        sys.exit(1)
+    server = FakeAdbServer.from_file(sys.argv[1], port=int(sys.argv[2]))
+    print(f"[+] Replaying {sys.argv[1]} on {server.host}:{server.port}")
+    server.start()
+    server._thread.join()
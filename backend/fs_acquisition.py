@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Bulk filesystem acquisition from the watch.
+
+Instead of one adb round trip per directory (and per entry), the device
+walks the tree once with `find ... -exec stat` and reports path, type,
+size, mode and mtime for every entry. Contents come over a single
+`tar -cf -` stream on exec-out that is unpacked on the fly: every regular
+file goes straight into evidence storage with its own hashes, and the
+listing is kept in the `filesystem_entries` collection.
+
+    python fs_acquisition.py [--root /sdcard] [--serial S]
+    python fs_acquisition.py --list-only [--root /sdcard/DCIM]
+    python fs_acquisition.py --tree [--root /sdcard/DCIM]   # JSON for the UI
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import posixpath
+import shlex
+import sys
+import tarfile
+import time
+
+from pymongo import UpdateOne
+
+import evidence_store
+import mongo_store
+import samsung_adb
+
+ENTRIES = "filesystem_entries"
+WRITE_BATCH = 1000
+
+# stat -c fields; the path goes last so '|' inside names survives the split.
+STAT_FORMAT = "%F|%s|%a|%Y|%n"
+FILE_TYPES = {
+    "regular file": "file",
+    "regular empty file": "file",
+    "directory": "dir",
+    "symbolic link": "link",
+}
+
+
+def walk(root, timeout=600):
+    """
+    One device-side walk of `root`; returns a list of entry dicts. -H
+    follows `root` itself when it is a symlink (/sdcard is one).
+    """
+    command = f"find -H {shlex.quote(root)} -exec stat -c '{STAT_FORMAT}' {{}} + 2>/dev/null"
+    entries = []
+    for line in samsung_adb.iter_adb_lines(['shell', command], timeout=timeout):
+        parts = line.split("|", 4)
+        if len(parts) != 5:
+            continue
+        ftype, size, mode, mtime, path = parts
+        try:
+            entries.append({
+                "path": posixpath.normpath(path),
+                "type": FILE_TYPES.get(ftype, "other"),
+                "size": int(size),
+                "mode": int(mode, 8),
+                "mtime": int(mtime),
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def save_listing(entries, root):
+    """Persist a walk in filesystem_entries, one batched insert per WRITE_BATCH entries."""
+    db = mongo_store.get_db()
+    db[ENTRIES].create_index([("serial", 1), ("path", 1), ("walked_at", -1)])
+    walked_at = datetime.datetime.now()
+    docs = [{**entry, "root": root, "walked_at": walked_at, **samsung_adb.device_tags()} for entry in entries]
+    for i in range(0, len(docs), WRITE_BATCH):
+        db[ENTRIES].insert_many(docs[i:i + WRITE_BATCH], ordered=False)
+    return walked_at
+
+
+def pull_tree(root, walked_at=None, paths=(), timeout=3600):
+    """
+    Stream `root` as one tar archive over exec-out and store every regular
+    file as it is unpacked. `paths` (e.g. the files of the walk) have their
+    previous versions loaded in one query. Returns {"files": n, "bytes": n}.
+    """
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    batch = evidence_store.VersionBatch(db, paths, samsung_adb.DEVICE_SERIAL)
+    command = ['exec-out', f"tar -cf - -C {shlex.quote(root)} . 2>/dev/null"]
+    stream = io.BufferedReader(evidence_store.ChunkReader(samsung_adb.iter_adb_output(command, timeout=timeout)),
+                               buffer_size=samsung_adb.STREAM_CHUNK_SIZE)
+    updates = []
+    files = size = 0
+    with tarfile.open(fileobj=stream, mode="r|") as tar, batch:
+        for member in tar:
+            if not member.isfile():
+                continue
+            path = posixpath.normpath(posixpath.join(root, member.name))
+            reader = tar.extractfile(member)
+            chunks = iter(lambda: reader.read(samsung_adb.STREAM_CHUNK_SIZE), b"")
+            version = evidence_store.put_stream(
+                db, fs, path, chunks, compress=False, content_type="application/octet-stream",
+                tags={**samsung_adb.device_tags(), "source_path": path,
+                      "mode": member.mode, "mtime": int(member.mtime)},
+                batch=batch, binary=True,
+            )
+            files += 1
+            size += version["length"]
+            if walked_at is not None:
+                updates.append(UpdateOne(
+                    {"serial": samsung_adb.DEVICE_SERIAL, "path": path, "walked_at": walked_at},
+                    {"$set": {"sha256": version["sha256"], "file_id": version["file_id"]}},
+                ))
+            if len(updates) >= WRITE_BATCH:
+                db[ENTRIES].bulk_write(updates, ordered=False)
+                updates = []
+    if updates:
+        db[ENTRIES].bulk_write(updates, ordered=False)
+    return {"files": files, "bytes": size}
+
+
+def build_tree(entries, root, base="/sdcard"):
+    """Nest a walk into the {name, type, path, children} shape the UI renders."""
+    def rel(path):
+        return posixpath.relpath(path, base) if path != base else ""
+
+    root = posixpath.normpath(root)
+    top = {"name": posixpath.basename(root) or root, "type": "folder",
+           "path": rel(root), "children": []}
+    folders = {root: top}
+    for entry in sorted(entries, key=lambda e: e["path"]):
+        path = entry["path"]
+        if path in folders:
+            continue
+        parent = folders.get(posixpath.dirname(path))
+        if parent is None:
+            continue
+        node = {"name": posixpath.basename(path), "path": rel(path)}
+        if entry["type"] == "dir":
+            node.update(type="folder", children=[])
+            folders[path] = node
+        else:
+            node.update(type="file", size=entry["size"], mtime=entry["mtime"])
+        parent["children"].append(node)
+    return top
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Acquire a device directory tree in one walk and one tar stream.")
+    parser.add_argument("--root", default="/sdcard")
+    parser.add_argument("--serial")
+    parser.add_argument("--list-only", action="store_true", help="record the listing but do not pull contents")
+    parser.add_argument("--tree", action="store_true", help="print the listing as a JSON tree and exit")
+    args = parser.parse_args(argv)
+
+    # With --tree, stdout carries nothing but the JSON that server.js parses;
+    # adb notices printed on the way (retries, ...) go to stderr.
+    with contextlib.redirect_stdout(sys.stderr if args.tree else sys.stdout):
+        if args.serial:
+            samsung_adb.select_device(args.serial)
+        start = time.perf_counter()
+        entries = walk(args.root)
+    if args.tree:
+        print(json.dumps(build_tree(entries, args.root)))
+        return
+    print(f"[+] Walked {len(entries)} entries under {args.root} in {time.perf_counter() - start:.2f}s")
+    evidence_store.ensure_indexes(mongo_store.get_db())
+    walked_at = save_listing(entries, args.root)
+    if args.list_only:
+        return
+    result = pull_tree(args.root, walked_at, [e["path"] for e in entries if e["type"] == "file"])
+    print(f"[+] Stored {result['files']} files ({result['bytes']} bytes) from {args.root} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -74,6 +74,34 @@ def count_events_by_day_hour(filepath):
                 hour_counts[key] += 1
     return hour_counts
 
+def count_events_from_entries(serial=None):
+    """
+    Same counts as count_events_by_day_hour, aggregated in MongoDB from the
+    decoded binary logcat records (samsung_adb.py --logcat-format binary)
+    instead of parsing text. Times are UTC. Returns an empty dict when no
+    binary capture is stored.
+    """
+    import mongo_store
+    entries = mongo_store.get_db()["logcat_entries"]
+    match = {"serial": serial} if serial else {}
+    latest = entries.find_one(match, {"capture_id": 1}, sort=[("_id", -1)])
+    if latest is None:
+        return {}
+    # Only the most recent capture, so repeated acquisitions are not counted twice
+    match["capture_id"] = latest["capture_id"]
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"day": {"$dateToString": {"format": "%m-%d", "date": "$time"}},
+                    "hour": {"$dateToString": {"format": "%H", "date": "$time"}}},
+            "count": {"$sum": 1},
+        }},
+    ]
+    hour_counts = defaultdict(int)
+    for row in entries.aggregate(pipeline):
+        hour_counts[(row["_id"]["day"], row["_id"]["hour"])] += row["count"]
+    return hour_counts
+
 def plot_log_events(doc, hour_counts):
     """
     Generates a bar chart for event frequencies (grouped by day and hour),
@@ -123,9 +151,17 @@ def main():
     # Set base directory to one level up (project root)
     directory = "./"
     
-    # Append the log events frequency graph using "logcat_capture.txt"
+    # Append the log events frequency graph, from decoded binary logcat
+    # records when there are any, otherwise from "logcat_capture.txt"
     log_file = os.path.join(directory, "logcat_capture.txt")
-    if os.path.exists(log_file):
+    try:
+        counts = count_events_from_entries()
+    except Exception as e:
+        print(f"Could not read decoded logcat entries: {e}")
+        counts = {}
+    if counts:
+        plot_log_events(doc, counts)
+    elif os.path.exists(log_file):
         counts = count_events_by_day_hour(log_file)
         plot_log_events(doc, counts)
     else:
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Decoder for binary logcat (`logcat -B`).
+
+The device writes its log entries as they sit in logd: a `logger_entry`
+header followed by the payload. That is smaller on the wire than the
+formatted text, and decoding it yields the fields directly instead of
+re-parsing text with regexes.
+
+Header versions (all little endian):
+
+    v1  len u16, pad u16, pid i32, tid i32, sec i32, nsec i32                 20 bytes
+    v2  len u16, hdr_size u16 (24), pid, tid, sec, nsec, euid u32             24 bytes
+    v3  len u16, hdr_size u16 (24), pid, tid, sec, nsec, lid u32              24 bytes
+    v4  len u16, hdr_size u16 (28), pid, tid, sec, nsec, lid u32, uid u32     28 bytes
+
+v2 and v3 share a size; the last word is read as a log id when it is one
+(0..7), otherwise as the euid. Text buffers carry
+`priority u8, tag\\0, message\\0`. Binary buffers (events, stats, security)
+carry an int32 tag number and a typed value, decoded into a readable
+message; tag numbers are not resolved to names.
+
+    python logcat_binary.py dump.bin        # print decoded entries as threadtime text
+"""
+import datetime
+import struct
+import sys
+
+LOG_IDS = {0: "main", 1: "radio", 2: "events", 3: "system", 4: "crash", 5: "stats", 6: "security", 7: "kernel"}
+BINARY_BUFFERS = {"events", "stats", "security"}
+PRIORITIES = {0: "?", 1: "?", 2: "V", 3: "D", 4: "I", 5: "W", 6: "E", 7: "F", 8: "S"}
+
+HEADER_V1 = struct.Struct("<HHiiii")
+HEADER_V2 = struct.Struct("<HHiiiiI")
+HEADER_V4 = struct.Struct("<HHiiiiII")
+
+# Event value types (liblog's AndroidEventLogType)
+EVENT_INT, EVENT_LONG, EVENT_STRING, EVENT_LIST, EVENT_FLOAT = range(5)
+
+
+def _event_value(payload, pos, depth=0):
+    """Decode one typed event value; returns (value, new position)."""
+    kind = payload[pos]
+    pos += 1
+    if kind == EVENT_INT:
+        return struct.unpack_from("<i", payload, pos)[0], pos + 4
+    if kind == EVENT_LONG:
+        return struct.unpack_from("<q", payload, pos)[0], pos + 8
+    if kind == EVENT_FLOAT:
+        return struct.unpack_from("<f", payload, pos)[0], pos + 4
+    if kind == EVENT_STRING:
+        size = struct.unpack_from("<i", payload, pos)[0]
+        pos += 4
+        return payload[pos:pos + size].decode("utf-8", "replace"), pos + size
+    if kind == EVENT_LIST and depth < 8:
+        count = payload[pos]
+        pos += 1
+        items = []
+        for _ in range(count):
+            item, pos = _event_value(payload, pos, depth + 1)
+            items.append(item)
+        return items, pos
+    raise ValueError(f"unknown event type {kind}")
+
+
+def decode_payload(buffer, payload):
+    """(priority letter, tag, message) of one entry payload."""
+    if buffer in BINARY_BUFFERS:
+        if len(payload) < 4:
+            return "I", "", ""
+        tag = str(struct.unpack_from("<I", payload, 0)[0])
+        try:
+            value, _ = _event_value(payload, 4) if len(payload) > 4 else ("", 4)
+        except (ValueError, IndexError, struct.error):
+            value = payload[4:].hex()
+        return "I", tag, value if isinstance(value, str) else repr(value)
+    if not payload:
+        return "?", "", ""
+    priority = PRIORITIES.get(payload[0], "?")
+    tag, _, rest = payload[1:].partition(b"\0")
+    message = rest.split(b"\0", 1)[0]
+    return priority, tag.decode("utf-8", "replace"), message.decode("utf-8", "replace").rstrip("\n")
+
+
+def decode_header(data, pos):
+    """
+    Parse the header at `pos`; returns (fields dict, header size, payload
+    length) or None when fewer bytes than a full header are available.
+    """
+    if len(data) - pos < HEADER_V1.size:
+        return None
+    length, hdr_size = struct.unpack_from("<HH", data, pos)
+    if hdr_size == 0:
+        _, _, pid, tid, sec, nsec = HEADER_V1.unpack_from(data, pos)
+        return {"pid": pid, "tid": tid, "sec": sec, "nsec": nsec, "lid": 0, "uid": None}, HEADER_V1.size, length
+    if len(data) - pos < hdr_size:
+        return None
+    if hdr_size >= HEADER_V4.size:
+        _, _, pid, tid, sec, nsec, lid, uid = HEADER_V4.unpack_from(data, pos)
+    elif hdr_size >= HEADER_V2.size:
+        _, _, pid, tid, sec, nsec, last = HEADER_V2.unpack_from(data, pos)
+        lid, uid = (last, None) if last in LOG_IDS else (0, last)
+    else:
+        raise ValueError(f"bad logger_entry header size {hdr_size} at offset {pos}")
+    return {"pid": pid, "tid": tid, "sec": sec, "nsec": nsec, "lid": lid, "uid": uid}, hdr_size, length
+
+
+class Decoder:
+    """
+    Incremental logger_entry decoder: feed() it chunks as they arrive and
+    it returns the complete entries, keeping at most one partial entry.
+    """
+
+    def __init__(self):
+        self._pending = b""
+        self.entries = 0
+
+    def feed(self, chunk):
+        data = self._pending + chunk
+        pos, records = 0, []
+        while True:
+            header = decode_header(data, pos)
+            if header is None:
+                break
+            fields, hdr_size, length = header
+            if len(data) - pos < hdr_size + length:
+                break
+            payload = data[pos + hdr_size:pos + hdr_size + length]
+            pos += hdr_size + length
+            buffer = LOG_IDS.get(fields["lid"], str(fields["lid"]))
+            priority, tag, message = decode_payload(buffer, payload)
+            records.append({**fields, "buffer": buffer, "priority": priority, "tag": tag, "message": message})
+        self._pending = data[pos:]
+        self.entries += len(records)
+        return records
+
+    def close(self):
+        """Bytes left over at the end of the stream (a truncated entry), if any."""
+        return len(self._pending)
+
+
+def iter_entries(chunks):
+    """Yield decoded entries from an iterable of byte chunks."""
+    decoder = Decoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+
+
+def entry_time(entry):
+    return datetime.datetime.fromtimestamp(entry["sec"] + entry["nsec"] / 1e9, tz=datetime.timezone.utc)
+
+
+def format_threadtime(entry):
+    """The entry as `logcat -v threadtime` style lines (UTC), one per message line."""
+    when = entry_time(entry)
+    prefix = (f"{when:%m-%d %H:%M:%S}.{entry['nsec'] // 1000000:03d} {entry['pid']:5d} {entry['tid']:5d} "
+              f"{entry['priority']} {entry['tag']}: ")
+    return "\n".join(prefix + line for line in entry["message"].split("\n"))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python logcat_binary.py <logcat -B dump>")
+        sys.exit(1)
+    with open(sys.argv[1], "rb") as f:
+        for entry in iter_entries(iter(lambda: f.read(1024 * 1024), b"")):
+            print(format_threadtime(entry))
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Continuous logcat capture.
+
+`pull_logs` only sees what is still in the ring buffer at acquisition time.
+This follows `logcat -v epoch` for as long as it runs and rotates the
+output into evidence storage in chunks, closed when they reach a size or
+an age limit. Only the open chunk is held in memory.
+
+Every chunk is stored like any other artifact (content-addressed, hashed,
+compressed) and described in the `logcat_chunks` collection with its first
+and last device timestamp and a rolling hash chain:
+
+    chain[n] = sha256(chain[n-1] + sha256(chunk[n]))     chain[-1] = 64 * "0"
+
+so removing, reordering or altering any chunk breaks every later link.
+Chunks are queryable by time range while the capture is still running.
+
+    python logcat_monitor.py [--serial S] [--buffers main,system,crash] [--duration SECONDS]
+    python logcat_monitor.py --query START END [--serial S]     # epoch seconds
+    python logcat_monitor.py --verify SESSION_ID
+"""
+import argparse
+import datetime
+import hashlib
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from bson import ObjectId
+
+import evidence_store
+import mongo_store
+import samsung_adb
+
+SESSIONS = "logcat_sessions"
+CHUNKS = "logcat_chunks"
+
+CHUNK_BYTES = 4 * 1024 * 1024
+CHUNK_SECONDS = 60
+DEFAULT_BUFFERS = "main,system,crash"
+
+# Budget for an open-ended capture (no --duration).
+FOREVER = 10 * 365 * 24 * 3600
+
+GENESIS = "0" * 64
+
+EPOCH_LINE = re.compile(r"^\s*(\d+\.\d+)\s")
+
+
+def chain_link(previous, sha256):
+    return hashlib.sha256((previous + sha256).encode("ascii")).hexdigest()
+
+
+def line_time(line):
+    """Device timestamp of a `-v epoch` line, or None (e.g. '--------- beginning of main')."""
+    match = EPOCH_LINE.match(line)
+    return float(match.group(1)) if match else None
+
+
+class LogcatCapture:
+    """
+    Collects logcat lines into chunks and stores each closed chunk.
+    add() is called by the reader; a background thread closes chunks that
+    are older than `chunk_seconds` even when no new line arrives.
+    """
+
+    def __init__(self, db, fs, serial=None, buffers=DEFAULT_BUFFERS,
+                 chunk_bytes=CHUNK_BYTES, chunk_seconds=CHUNK_SECONDS):
+        self.db = db
+        self.fs = fs
+        self.serial = serial
+        self.buffers = buffers
+        self.chunk_bytes = chunk_bytes
+        self.chunk_seconds = chunk_seconds
+        self.session_id = ObjectId()
+        self.seq = 0
+        self.chain = GENESIS
+        self.total_lines = 0
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._lines = []
+        self._size = 0
+        self._opened = time.monotonic()
+        self._first_ts = None
+        self._last_ts = None
+
+    def start(self):
+        self.db[CHUNKS].create_index([("session_id", 1), ("seq", 1)], unique=True)
+        self.db[CHUNKS].create_index([("serial", 1), ("first_ts", 1), ("last_ts", 1)])
+        self.db[SESSIONS].insert_one({
+            "_id": self.session_id,
+            "serial": self.serial,
+            "buffers": self.buffers,
+            "started_at": datetime.datetime.now(),
+            "status": "running",
+        })
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        return self
+
+    def add(self, line):
+        ts = line_time(line)
+        with self._lock:
+            if not self._lines:
+                self._opened = time.monotonic()
+            self._lines.append(line)
+            self._size += len(line) + 1
+            if ts is not None:
+                if self._first_ts is None:
+                    self._first_ts = ts
+                self._last_ts = ts
+            if self._size >= self.chunk_bytes:
+                self._rotate()
+
+    def _flush_loop(self):
+        while not self._stop.wait(1):
+            with self._lock:
+                if self._lines and time.monotonic() - self._opened >= self.chunk_seconds:
+                    self._rotate()
+
+    def _rotate(self):
+        """Store the open chunk and link it into the chain. Caller holds the lock."""
+        data = ("\n".join(self._lines) + "\n").encode("utf-8", "surrogateescape")
+        filename = f"logcat_stream/{self.session_id}/{self.seq:06d}.txt"
+        version = evidence_store.put_bytes(
+            self.db, self.fs, filename, data, compress=True, content_type="text/plain; charset=utf-8",
+            tags={"serial": self.serial, "logcat_session": self.session_id, "seq": self.seq},
+        )
+        link = chain_link(self.chain, version["sha256"])
+        self.db[CHUNKS].insert_one({
+            "session_id": self.session_id,
+            "serial": self.serial,
+            "seq": self.seq,
+            "filename": filename,
+            "file_id": version["file_id"],
+            "sha256": version["sha256"],
+            "prev_chain": self.chain,
+            "chain": link,
+            "first_ts": self._first_ts,
+            "last_ts": self._last_ts,
+            "lines": len(self._lines),
+            "bytes": len(data),
+            "stored_at": datetime.datetime.now(),
+        })
+        print(f"[+] Stored logcat chunk {self.seq} ({len(self._lines)} lines, {len(data)} bytes, chain {link[:16]})")
+        self.chain = link
+        self.seq += 1
+        self.total_lines += len(self._lines)
+        self.total_bytes += len(data)
+        self._reset()
+
+    def close(self, status="stopped"):
+        self._stop.set()
+        with self._lock:
+            if self._lines:
+                self._rotate()
+        self.db[SESSIONS].update_one({"_id": self.session_id}, {"$set": {
+            "status": status,
+            "stopped_at": datetime.datetime.now(),
+            "chunks": self.seq,
+            "lines": self.total_lines,
+            "bytes": self.total_bytes,
+            "chain": self.chain,
+        }})
+
+
+def capture(db, fs, serial=None, buffers=DEFAULT_BUFFERS, duration=None,
+            chunk_bytes=CHUNK_BYTES, chunk_seconds=CHUNK_SECONDS):
+    """Follow logcat until `duration` seconds pass or Ctrl-C; returns the LogcatCapture."""
+    session = LogcatCapture(db, fs, serial, buffers, chunk_bytes, chunk_seconds).start()
+    print(f"[+] Capturing logcat ({buffers}) as session {session.session_id}; Ctrl-C to stop")
+    status = "stopped"
+    try:
+        for line in samsung_adb.iter_adb_lines(['logcat', '-v', 'epoch', '-b', buffers],
+                                               timeout=duration or FOREVER):
+            session.add(line)
+        status = "ended"
+    except subprocess.TimeoutExpired:
+        status = "stopped" if duration else "failed"
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[!] logcat capture failed: {e}")
+        status = "failed"
+    finally:
+        session.close(status)
+    print(f"[+] Session {session.session_id}: {session.seq} chunks, {session.total_lines} lines ({status})")
+    return session
+
+
+def chunks_between(db, start, end, serial=None):
+    """Stored chunks overlapping [start, end] (device epoch seconds), oldest first."""
+    query = {"first_ts": {"$lte": end}, "last_ts": {"$gte": start}}
+    if serial is not None:
+        query["serial"] = serial
+    return list(db[CHUNKS].find(query, {"file_id": 1, "seq": 1, "session_id": 1, "first_ts": 1, "last_ts": 1},
+                                sort=[("first_ts", 1), ("seq", 1)]))
+
+
+def iter_lines_between(db, fs, start, end, serial=None):
+    """Yield stored logcat lines with a device timestamp in [start, end]."""
+    for chunk in chunks_between(db, start, end, serial):
+        pending = b""
+        with evidence_store.open_blob(fs, chunk["file_id"]) as reader:
+            for data in iter(lambda: reader.read(1024 * 1024), b""):
+                lines = (pending + data).split(b"\n")
+                pending = lines.pop()
+                for raw in lines:
+                    line = raw.decode("utf-8", "surrogateescape")
+                    ts = line_time(line)
+                    if ts is not None and start <= ts <= end:
+                        yield line
+
+
+def verify_chain(db, session_id):
+    """
+    Recompute the hash chain of a session from its chunk docs.
+    Returns (ok, number of chunks, first bad seq or None).
+    """
+    previous, expected_seq = GENESIS, 0
+    for chunk in db[CHUNKS].find({"session_id": session_id}, {"seq": 1, "sha256": 1, "prev_chain": 1, "chain": 1},
+                                 sort=[("seq", 1)]):
+        if (chunk["seq"] != expected_seq or chunk["prev_chain"] != previous
+                or chunk["chain"] != chain_link(previous, chunk["sha256"])):
+            return False, expected_seq, expected_seq
+        previous, expected_seq = chunk["chain"], expected_seq + 1
+    session = db[SESSIONS].find_one({"_id": session_id}, {"chain": 1})
+    if session and session.get("chain") not in (None, previous):
+        return False, expected_seq, expected_seq
+    return True, expected_seq, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously capture logcat into evidence storage.")
+    parser.add_argument("--serial")
+    parser.add_argument("--buffers", default=DEFAULT_BUFFERS)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds (default: until Ctrl-C)")
+    parser.add_argument("--chunk-mb", type=float, default=CHUNK_BYTES / (1024 * 1024))
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS)
+    parser.add_argument("--query", nargs=2, type=float, metavar=("START", "END"),
+                        help="print stored lines between two epoch timestamps and exit")
+    parser.add_argument("--verify", metavar="SESSION_ID", help="check the hash chain of a session and exit")
+    args = parser.parse_args(argv)
+
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    if args.query:
+        for line in iter_lines_between(db, fs, args.query[0], args.query[1], args.serial):
+            print(line)
+        return
+    if args.verify:
+        ok, chunks, bad = verify_chain(db, ObjectId(args.verify))
+        if ok:
+            print(f"[+] Chain of {chunks} chunks is intact")
+        else:
+            print(f"[!] Chain broken at chunk {bad}")
+            sys.exit(1)
+        return
+
+    if args.serial:
+        samsung_adb.select_device(args.serial)
+    evidence_store.ensure_indexes(db)
+    capture(db, fs, samsung_adb.DEVICE_SERIAL, args.buffers, args.duration,
+            int(args.chunk_mb * 1024 * 1024), args.chunk_seconds)
+
+
+if __name__ == "__main__":
+    main()
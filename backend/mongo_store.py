@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Shared MongoDB / GridFS access for the backend scripts.
+
+Nothing connects at import time: the client is created on the first
+get_db()/get_fs() call and reused by every thread of the process. Worker
+processes (spawned, see samsung_adb.acquire_all_devices) build their own
+client the same way; a client inherited across fork() is dropped and
+rebuilt, as pymongo clients must not be shared between processes.
+
+    MONGO_URI            connection string (default mongodb://localhost:27017/)
+    MONGO_DB             database name (default forensic_evidence)
+    MONGO_MAX_POOL_SIZE  connections per process (default 16)
+"""
+import os
+import threading
+
+from pymongo import MongoClient
+import gridfs
+
+MONGO_URI = os.environ.get("MONGO_URI") or "mongodb://localhost:27017/"
+MONGO_DB = os.environ.get("MONGO_DB") or "forensic_evidence"
+
+# Enough for the collector pool plus GridFS uploads running side by side
+# without queueing on a connection; idle ones are closed after a minute.
+MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE") or 16)
+MAX_IDLE_TIME_MS = 60 * 1000
+
+_lock = threading.Lock()
+_state = {"pid": None, "client": None, "db": None, "fs": None}
+
+
+def get_client():
+    """Process-wide MongoClient, created on first use."""
+    if _state["client"] is None or _state["pid"] != os.getpid():
+        with _lock:
+            if _state["client"] is None or _state["pid"] != os.getpid():
+                client = MongoClient(MONGO_URI, maxPoolSize=MAX_POOL_SIZE, minPoolSize=0,
+                                     maxIdleTimeMS=MAX_IDLE_TIME_MS, connect=False)
+                db = client[MONGO_DB]
+                _state.update(pid=os.getpid(), client=client, db=db, fs=gridfs.GridFS(db))
+    return _state["client"]
+
+
+def get_db():
+    get_client()
+    return _state["db"]
+
+
+def get_fs():
+    get_client()
+    return _state["fs"]
+
+
+def close():
+    """Close the process's client; the next get_db() reconnects."""
+    with _lock:
+        if _state["client"] is not None and _state["pid"] == os.getpid():
+            _state["client"].close()
+        _state.update(pid=None, client=None, db=None, fs=None)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Installed-package inventory.
+
+`pm list packages -f -U -i` gives every package with its APK path, UID and
+installer; `dumpsys package` adds versions, install/update times, flags
+and granted permissions, but runs to tens of MB on a watch. Both are
+streamed into evidence storage as usual and parsed on the way through
+(the capture tap), one line at a time: the parser only holds the package
+it is reading plus a batch of finished documents, never the dump.
+
+One document per package and acquisition goes into the `packages`
+collection, indexed on serial+package, installer, uid and granted
+permission:
+
+    {"serial", "inventory_id", "package", "path", "uid", "installer",
+     "version_code", "version_name", "min_sdk", "target_sdk",
+     "first_install_time", "last_update_time", "flags",
+     "install_permissions", "runtime_permissions", "permissions", ...}
+
+    python package_inventory.py [--serial S] [--permission P] [--installer I]
+"""
+import argparse
+import datetime
+import re
+
+from bson import ObjectId
+
+import text_stream
+
+PACKAGES = "packages"
+INVENTORIES = "package_inventories"
+
+BATCH_SIZE = 500
+
+LIST_LINE = re.compile(r"^package:(?P<path>\S*)=(?P<package>[\w.]+)(?P<rest>(?:\s.*)?)$")
+LIST_UID = re.compile(r"\buid:(\d+)")
+LIST_INSTALLER = re.compile(r"\binstaller=(\S+)")
+
+PACKAGE_HEADER = re.compile(r"^  Package \[(?P<package>[^\]]+)\] \((?P<id>[0-9a-f]+)\):")
+FIELD = re.compile(r"(\w+)=(\[[^\]]*\]|\S+)")
+PERMISSION = re.compile(r"^\s+([\w.$-]+): granted=(true|false)")
+TIME_LINE = re.compile(r"^\s+(firstInstallTime|lastUpdateTime)=(.+?)\s*$")
+USER_LINE = re.compile(r"^\s+User (\d+):(.*)")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# dumpsys fields copied onto the document, with their document names.
+DUMP_FIELDS = {
+    "userId": "uid",
+    "versionCode": "version_code",
+    "versionName": "version_name",
+    "minSdk": "min_sdk",
+    "targetSdk": "target_sdk",
+    "codePath": "code_path",
+    "installerPackageName": "installer",
+    "initiatingPackageName": "initiating_installer",
+    "firstInstallTime": "first_install_time",
+    "lastUpdateTime": "last_update_time",
+    "flags": "flags",
+    "privateFlags": "private_flags",
+    "signatures": "signatures",
+    "dataDir": "data_dir",
+}
+INTEGER_FIELDS = {"uid", "version_code", "min_sdk", "target_sdk"}
+TIME_FIELDS = {"first_install_time", "last_update_time"}
+
+
+def parse_list_line(line):
+    """{package, path, uid, installer} of one `pm list packages -f -U -i` line, or None."""
+    match = LIST_LINE.match(line.strip())
+    if not match:
+        return None
+    rest = match.group("rest")
+    uid = LIST_UID.search(rest)
+    installer = LIST_INSTALLER.search(rest)
+    return {
+        "package": match.group("package"),
+        "path": match.group("path"),
+        "uid": int(uid.group(1)) if uid else None,
+        "installer": None if not installer or installer.group(1) == "null" else installer.group(1),
+    }
+
+
+def _value(name, raw):
+    if raw.startswith("["):
+        return raw.strip("[]").split()
+    if name in INTEGER_FIELDS:
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if raw == "null":
+        return None
+    return raw
+
+
+class Inventory:
+    """
+    Builds the package documents of one acquisition. feed_list() and
+    feed_dump() take the raw chunks of the two commands (list first);
+    close() writes what is left and returns the number of packages.
+    """
+
+    def __init__(self, db, serial=None, batch_size=BATCH_SIZE):
+        self.db = db
+        self.serial = serial
+        self.batch_size = batch_size
+        self.inventory_id = ObjectId()
+        self.acquired_at = datetime.datetime.now()
+        self.listed = {}
+        self.count = 0
+        self._batch = []
+        self._section = None
+        self._package = None
+        self._permissions = None
+        self._list = text_stream.LineFeed(self._list_line)
+        self._dump = text_stream.LineFeed(self._dump_line)
+
+    def feed_list(self, chunk):
+        self._list.feed(chunk)
+
+    def feed_dump(self, chunk):
+        self._dump.feed(chunk)
+
+    def _list_line(self, line):
+        entry = parse_list_line(line)
+        if entry:
+            self.listed[entry["package"]] = entry
+
+    def _dump_line(self, line):
+        if line and not line.startswith(" "):
+            # top-level section ("Packages:", "Hidden system packages:", ...)
+            self._finish()
+            self._section = line.strip()
+            return
+        if self._section != "Packages:":
+            return
+        header = PACKAGE_HEADER.match(line)
+        if header:
+            self._finish()
+            self._package = {"package": header.group("package"), "install_permissions": [],
+                             "runtime_permissions": [], "users": {}}
+            return
+        if self._package is None:
+            return
+        stripped = line.strip()
+        if stripped in ("install permissions:", "runtime permissions:", "requested permissions:",
+                        "declared permissions:"):
+            self._permissions = stripped.split()[0]
+            return
+        permission = PERMISSION.match(line)
+        if permission and self._permissions in ("install", "runtime"):
+            if permission.group(2) == "true":
+                self._package[f"{self._permissions}_permissions"].append(permission.group(1))
+            return
+        user = USER_LINE.match(line)
+        if user:
+            self._permissions = None
+            self._package["users"][user.group(1)] = {k: _value(k, v) for k, v in FIELD.findall(user.group(2))}
+            return
+        timestamp = TIME_LINE.match(line)
+        if timestamp:
+            self._package.setdefault(DUMP_FIELDS[timestamp.group(1)], timestamp.group(2))
+            return
+        for name, raw in FIELD.findall(stripped):
+            field = DUMP_FIELDS.get(name)
+            if field and field not in self._package:
+                self._package[field] = _value(field, raw)
+
+    def _finish(self):
+        """Close the package being read and queue its document."""
+        package, self._package, self._permissions = self._package, None, None
+        if package is None:
+            return
+        listed = self.listed.pop(package["package"], {})
+        self._queue({**listed, **package})
+
+    def _queue(self, doc):
+        for field in TIME_FIELDS:
+            value = doc.get(field)
+            if isinstance(value, str):
+                try:
+                    doc[field] = datetime.datetime.strptime(value, TIME_FORMAT)
+                except ValueError:
+                    pass
+        doc["permissions"] = sorted(set(doc.get("install_permissions", []) + doc.get("runtime_permissions", [])))
+        doc.update(serial=self.serial, inventory_id=self.inventory_id, acquired_at=self.acquired_at)
+        self._batch.append(doc)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self.db[PACKAGES].insert_many(self._batch, ordered=False)
+            self.count += len(self._batch)
+            self._batch = []
+
+    def close(self, sources=None):
+        """Write the remaining packages (listed ones missing from the dump too) and the run summary."""
+        self._list.close()
+        self._dump.close()
+        self._finish()
+        for entry in self.listed.values():
+            self._queue(dict(entry))
+        self.listed = {}
+        self.flush()
+        self.db[INVENTORIES].insert_one({
+            "_id": self.inventory_id,
+            "serial": self.serial,
+            "acquired_at": self.acquired_at,
+            "packages": self.count,
+            "sources": sources or {},
+        })
+        return self.count
+
+
+def ensure_indexes(db):
+    db[PACKAGES].create_index([("serial", 1), ("package", 1), ("acquired_at", -1)])
+    db[PACKAGES].create_index("inventory_id")
+    db[PACKAGES].create_index("installer")
+    db[PACKAGES].create_index("uid")
+    db[PACKAGES].create_index("permissions")
+    db[INVENTORIES].create_index([("serial", 1), ("acquired_at", -1)])
+
+
+def latest_inventory(db, serial=None):
+    query = {} if serial is None else {"serial": serial}
+    return db[INVENTORIES].find_one(query, sort=[("acquired_at", -1)])
+
+
+def find_packages(db, serial=None, permission=None, installer=None):
+    """Packages of the latest inventory, optionally filtered by granted permission or installer."""
+    inventory = latest_inventory(db, serial)
+    if inventory is None:
+        return []
+    query = {"inventory_id": inventory["_id"]}
+    if permission:
+        query["permissions"] = permission
+    if installer:
+        query["installer"] = installer
+    return list(db[PACKAGES].find(query, {"package": 1, "version_name": 1, "installer": 1, "uid": 1,
+                                          "first_install_time": 1}, sort=[("package", 1)]))
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="List the installed packages of the latest acquisition.")
+    parser.add_argument("--serial")
+    parser.add_argument("--permission", help="only packages granted this permission")
+    parser.add_argument("--installer", help="only packages installed by this package")
+    args = parser.parse_args(argv)
+    packages = find_packages(mongo_store.get_db(), args.serial, args.permission, args.installer)
+    if not packages:
+        print("[-] No packages found.")
+        return
+    for p in packages:
+        installed = p.get("first_install_time")
+        print(f"{p['package']:<56} {p.get('version_name') or '':<16} uid {p.get('uid') or '-':<6} "
+              f"{p.get('installer') or '-':<28} {installed or ''}")
+
+
+if __name__ == "__main__":
+    main()
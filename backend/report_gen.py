@@ -1,6 +1,5 @@
-from pymongo import MongoClient
-import gridfs
 import pandas as pd
+import numpy as np
 import docx
 import re
 from collections import Counter
@@ -13,17 +12,14 @@ import os
 import json
 import hashlib
 from bson import Binary
+import evidence_store
+import mongo_store
+import sensor_store
 
 app = Flask(__name__)
 
 # ---------------- MongoDB Setup ----------------
-client = MongoClient("mongodb://localhost:27017/")
-db = client["forensic_evidence"]
-fs = gridfs.GridFS(db)
-
-print("Files in GridFS:")
-for filename in fs.list():
-    print(filename)
+# Connected lazily on first use (see mongo_store.py).
 
 def hash_binary_data(binary_data):
     """Hash binary data from MongoDB"""
@@ -38,15 +34,19 @@ def hash_binary_data(binary_data):
     return hash_object.hexdigest()
 
 def get_file_from_mongo(filename):
-    """Fetch a file from MongoDB GridFS and return content as text."""
-    file_doc = fs.find_one({"filename": filename})
-    if not file_doc:
+    """
+    Fetch a file from MongoDB GridFS and return (content as text, SHA-256).
+    The hash is the one recorded when the artifact was stored.
+    """
+    version = evidence_store.latest_version(mongo_store.get_db(), filename)
+    if not version:
         print(f"[-] File '{filename}' not found in MongoDB.")
         return "", ""
     try:
         print(f"File {filename} Found")
-        data = file_doc.read()
-        file_hash = hash_binary_data(data)
+        with evidence_store.open_version(mongo_store.get_fs(), version) as reader:
+            data = reader.read()
+        file_hash = version["sha256"]
         # Decode text files; binary files can be handled separately if needed
         return data.decode("utf-8", errors="ignore"), file_hash
     except Exception as e:
@@ -256,6 +256,21 @@ def extract_sensor_data(log_text, file_hash):
 
     return sensors, file_hash
 
+def sensor_frames(columns):
+    """One DataFrame per sensor from stored sensor columns (see sensor_store.py), same layout as extract_sensor_data."""
+    sensors = {}
+    for name, (ts, wall, values) in columns.items():
+        frame = {"ts": ts, "wall_time": sensor_store.wall_text(wall)}
+        masked = np.isnan(values).all(axis=1)
+        if masked.any():
+            marker = np.full(len(ts), np.nan, dtype=object)
+            marker[masked] = "[value masked]"
+            frame["values"] = marker
+        for i in range(values.shape[1]):
+            frame[f"value_{i + 1}"] = values[:, i]
+        sensors[name] = pd.DataFrame(frame, copy=False)
+    return sensors
+
 def parse_bluetooth_log(doc, text, file_hash):
     """Extracts Bluetooth connection and bonded device info."""
 
@@ -676,8 +691,17 @@ def generate_forensic_report(output_dir="downloads"):
     all_hashes.append({"File": "dumpsys_location.txt", "SHA256 Hash": loc_hash})
 
     # --- Sensor Data ---
-    sensor_text, sensor_hash = get_file_from_mongo(log_files["Sensor Data"])
-    sensor_dataframes, sensor_hash = extract_sensor_data(sensor_text, sensor_hash)
+    # Columns parsed at acquisition time when they match the stored text; the text otherwise.
+    stored = evidence_store.artifact_hashes(mongo_store.get_db(), [log_files["Sensor Data"]])
+    sensor_hash = stored.get(log_files["Sensor Data"], {}).get("sha256", "")
+    columns = None
+    if sensor_hash:
+        columns = sensor_store.load(mongo_store.get_db(), mongo_store.get_fs(), source_sha256=sensor_hash)
+    if columns is not None:
+        sensor_dataframes = sensor_frames(columns)
+    else:
+        sensor_text, sensor_hash = get_file_from_mongo(log_files["Sensor Data"])
+        sensor_dataframes, sensor_hash = extract_sensor_data(sensor_text, sensor_hash)
     for sensor_name, df in sensor_dataframes.items():
         add_dataframe_to_doc(doc, df, sensor_name)
     all_hashes.append({"File": "sensor_data.txt", "SHA256 Hash": sensor_hash})
@@ -695,12 +719,11 @@ def generate_forensic_report(output_dir="downloads"):
     add_dataframe_to_doc(doc, trust_df, "Trust Manager State Information")
     all_hashes.append({"File": "trust_manager_states.txt", "SHA256 Hash": trust_hash})
     
-    # --- adding hashing not summarized ---
-    keystore_text, keystore_hash = get_file_from_mongo(log_files["Keystore Information"])
-    all_hashes.append(({"File": "keystore_information.txt", "SHA256 Hash": keystore_hash}))
-    
-    notification_text, notification_hash = get_file_from_mongo(log_files["Notification Information"])
-    all_hashes.append(({"File": "notification_information.txt", "SHA256 Hash": notification_hash}))
+    # --- adding hashing not summarized (stored hashes only, no download) ---
+    unsummarized = [log_files["Keystore Information"], log_files["Notification Information"]]
+    stored = evidence_store.artifact_hashes(mongo_store.get_db(), unsummarized)
+    for filename in unsummarized:
+        all_hashes.append({"File": filename, "SHA256 Hash": stored.get(filename, {}).get("sha256", "")})
 
     # --- Add all hashes in one table at the end ---
     doc.add_paragraph("File Integrity Information", style='Heading1')
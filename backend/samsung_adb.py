@@ -1,112 +1,561 @@
 #!/usr/bin/env python3
 import subprocess
 import time
-import hashlib
-import datetime
-import os
-import re
-import csv
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import multiprocessing
 from datetime import datetime as D
-from pymongo import MongoClient
-import gridfs
 import json
+import threading
+import zipfile
+import zlib
+import types
+from bson import ObjectId
+import acquisition_journal
+import acquisition_profile
+import adb_client
+import adb_scheduler
+import battery_history
+import bugreport_index
+import device_info
+import evidence_store
+import logcat_binary
+import mongo_store
+import package_inventory
+import sensor_store
+import text_stream
+import usage_stats
 
 
+# Default number of collectors allowed to talk to one device at the same time.
+DEFAULT_WORKERS = 4
+
+# Read size used when streaming adb output into GridFS.
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Serial and build fingerprint of the device this process acquires. Each
+# device in --all-devices mode gets its own worker process, so these are
+# per-device rather than shared.
+DEVICE_SERIAL = None
+DEVICE_FINGERPRINT = None
+
+# adb sub-commands that can be sent over the adb server socket instead of
+# spawning the adb binary (see adb_client.py).
+NATIVE_COMMANDS = ("shell", "exec-out", "logcat")
+
+# Version docs of the running acquisition, written in batches (see
+# evidence_store.VersionBatch). None outside acquire_device.
+VERSION_BATCH = None
+
+# Wall time, bytes and exit status of every adb command and store of the
+# running acquisition (see acquisition_profile.py).
+PROFILE = acquisition_profile.Profile()
+
+# "text" pulls `logcat -d`; "binary" pulls `logcat -B` and decodes it on
+# the host (see pull_binary_logs).
+LOGCAT_FORMAT = "text"
+LOGCAT_ENTRIES = "logcat_entries"
+ENTRY_BATCH = 5000
+
+# Collect one `bugreportz` zip instead of the individual dumpsys calls
+# (see acquire_bugreport).
+BUGREPORT_MODE = False
+
+# Text dumps are gzipped on the device and inflated on the host (see
+# capture_dump); set by acquire_device when the device has gzip.
+COMPRESS_TRANSFER = False
+
+# Brings the device back after a drop (see adb_scheduler.ConnectionSupervisor);
+# set by select_device.
+SUPERVISOR = None
+
+# Collector states of the running acquisition, kept so an interrupted run
+# can be resumed (see acquisition_journal.py). None outside acquire_device.
+JOURNAL = None
+
+# Passes over the collectors a connection drop cut off, per run.
+INTERRUPTED_PASSES = 2
+
+# Learnt duration of each command on each device; sets timeouts (see
+# adb_scheduler.py). Loaded and saved by acquire_device.
+DURATIONS = adb_scheduler.DurationModel()
+
 # --- MongoDB Setup ---
-client = MongoClient("mongodb://localhost:27017/")
-db = client["forensic_evidence"]
-fs = gridfs.GridFS(db)
+# The connection is opened lazily on first use (see mongo_store.py).
+
+def adb_argv(command):
+    """Full argv for the adb binary, pinned to DEVICE_SERIAL when one is set."""
+    if DEVICE_SERIAL:
+        return ['adb', '-s', DEVICE_SERIAL] + command
+    return ['adb'] + command
+
+def device_command_line(command):
+    """Turn an adb argv like ['shell', 'dumpsys', 'wifi'] into the device-side command."""
+    if command[0] == "logcat":
+        return " ".join(command)
+    return " ".join(command[1:])
 
 def run_adb_command(command, timeout=30):
-    """Run an ADB command and return (stdout, stderr)."""
-    proc = subprocess.run(['adb'] + command, capture_output=True, text=True, timeout=timeout)
-    return proc.stdout.strip(), proc.stderr.strip()
+    """
+    Run an ADB command and return (stdout, stderr).
+    shell/exec-out/logcat commands go over the adb server socket when a server
+    is running; everything else spawns the adb binary. Timeouts and retries
+    are those of iter_adb_output.
+    """
+    stderr = []
+    try:
+        out = b"".join(iter_adb_output(command, timeout=timeout, stderr_sink=stderr))
+    except (OSError, adb_client.AdbError) as e:
+        return "", str(e)
+    return out.decode("utf-8", "ignore").strip(), b"".join(stderr).decode("utf-8", "ignore").strip()
 
-def check_adb_device():
-    """Check if the device is connected."""
-    devices_out, error = run_adb_command(['devices'])
-    if error:
-        return False
-    
-    lines = [l.strip() for l in devices_out.splitlines() if l.strip()]
-    if any((line.endswith("device") or "\tdevice" in line) and not line.startswith("List of devices") for line in lines[1:]):
-        return True
-    return False
+def list_adb_devices():
+    """Return the serials of all attached devices in the 'device' state."""
+    client = adb_client.get_client()
+    if client:
+        try:
+            return [serial for serial, state in client.devices() if state == "device"]
+        except (OSError, adb_client.AdbError):
+            return []
 
-def save_to_file(filename, data, binary=False):
-    """Save data as a BLOB in MongoDB using GridFS."""
+    proc = subprocess.run(['adb', 'devices'], capture_output=True, text=True, timeout=30)
+    serials = []
+    for line in proc.stdout.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+def connect_device(address):
+    """
+    `adb connect` a wireless device, after an `adb disconnect` that clears a
+    stale offline transport. Returns adb's answer.
+    """
+    client = adb_client.get_client()
+    if client:
+        try:
+            client.disconnect(address)
+        except (OSError, adb_client.AdbError):
+            pass
+        try:
+            return client.connect(address)
+        except (OSError, adb_client.AdbError) as e:
+            return str(e)
     try:
-        # Delete old version if exists
-        existing = db.fs.files.find_one({"filename": filename})
-        if existing:
-            fs.delete(existing["_id"])
+        subprocess.run(['adb', 'disconnect', address], capture_output=True, text=True, timeout=30)
+        proc = subprocess.run(['adb', 'connect', address], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError) as e:
+        return str(e)
+    return (proc.stdout or proc.stderr).strip()
 
-        if binary:
-            file_id = fs.put(data, filename=filename, binary=True, uploadDate=datetime.datetime.now())
-        else:
-            file_id = fs.put(data.encode("utf-8", "ignore"), filename=filename, binary=False, uploadDate=datetime.datetime.now())
+def check_adb_device():
+    """Check if the device (DEVICE_SERIAL, or any device when unset) is connected."""
+    serials = list_adb_devices()
+    if DEVICE_SERIAL:
+        return DEVICE_SERIAL in serials
+    return bool(serials)
+
+def device_tags():
+    """Metadata stamped on every artifact so multi-watch cases stay separable."""
+    return {"serial": DEVICE_SERIAL, "device_fingerprint": DEVICE_FINGERPRINT}
+
+def device_context():
+    """
+    The selected device for helper modules run from a collector
+    (sqlite_acquisition): they get its adb streams and tags from here
+    instead of importing this module, which as __main__ would load again
+    unconfigured. `thread_init` sets up the threads of pools they start.
+    """
+    return types.SimpleNamespace(serial=DEVICE_SERIAL, tags=device_tags(), chunk_size=STREAM_CHUNK_SIZE,
+                                 adb_lines=iter_adb_lines, adb_output=iter_adb_output,
+                                 thread_init=PROFILE.thread_initializer())
+
+def content_type(binary):
+    return "application/octet-stream" if binary else "text/plain; charset=utf-8"
 
-        print(f"[+] Saved '{filename}' to MongoDB with ID: {file_id}")
-        return file_id
+def _describe(version):
+    if version["reused_blob"]:
+        return f"unchanged (v{version['version']}), reusing blob {version['file_id']}"
+    return f"v{version['version']} with ID: {version['file_id']}"
+
+def save_to_file(filename, data, binary=False):
+    """
+    Save data as a BLOB in MongoDB using GridFS.
+    Storage is content-addressed: identical bytes are referenced, not re-uploaded,
+    and earlier versions are kept (see evidence_store.py).
+    """
+    try:
+        if not binary:
+            data = data.encode("utf-8", "ignore")
+        with PROFILE.measure("store", filename) as record:
+            version = evidence_store.put_bytes(mongo_store.get_db(), mongo_store.get_fs(), filename, data,
+                                               tags=device_tags(), compress=not binary,
+                                               content_type=content_type(binary), batch=VERSION_BATCH,
+                                               binary=binary)
+            record["bytes"] = version["length"]
+            record["transport"] = "reused" if version["reused_blob"] else "upload"
+        print(f"[+] Saved '{filename}' to MongoDB, {_describe(version)}")
+        return version["file_id"]
 
     except Exception as e:
         print(f"[!] Error saving {filename}: {e}")
 
 
-def create_json_summary():
-    # List all the filenames you saved to GridFS (or locally)
-    artifact_files = [
-        "device_properties.txt",
-        "logcat_capture.txt",
-        "account_information.txt",
-        "wifi_information.txt",
-        "bluetooth_information.txt",
-        "ip_address_information.txt",
-        "sensor_data.txt",
-        "dumpsys_location.txt",
-        "keystore_information.txt",
-        "trust_information.txt",
-        "notification_information.txt"
-    ]
-    
-    artifacts_summary = {}
-    
-    for filename in artifact_files:
+def _drain(pipe, sink, limit=64 * 1024):
+    """Read a pipe to EOF, keeping only the last `limit` bytes."""
+    for chunk in iter(lambda: pipe.read(8192), b""):
+        sink.append(chunk)
+        while sum(len(c) for c in sink) > limit and len(sink) > 1:
+            sink.pop(0)
+
+def iter_adb_output(command, timeout=120, stderr_sink=None):
+    """
+    Yield the stdout of an ADB command in chunks without buffering all of it.
+    stderr (or its tail, for the adb binary) is appended to stderr_sink.
+    Uses the adb server socket when possible, otherwise a child adb process.
+
+    `timeout` is the budget for a command never seen on this device; once
+    DURATIONS has history the inactivity and total timeouts follow it (see
+    adb_scheduler.py). A read blocked longer than the inactivity timeout
+    raises adb_scheduler.IdleTimeout, the total budget
+    subprocess.TimeoutExpired. Transient failures are retried with jittered
+    backoff while no output has been yielded yet.
+
+    The profiled wall time runs until the consumer has taken the last chunk,
+    so for streamed artifacts it includes storing them.
+    """
+    stderr_sink = [] if stderr_sink is None else stderr_sink
+    key = device_command_line(command)
+    idle, total = DURATIONS.timeouts(DEVICE_SERIAL, key, timeout)
+    with PROFILE.measure("adb", command) as record:
+        start = time.perf_counter()
+        for attempt in range(adb_scheduler.MAX_RETRIES + 1):
+            record["retries"] = attempt
+            mark = len(stderr_sink)
+            try:
+                for chunk in _iter_adb_output(command, idle, total, stderr_sink, record):
+                    record["bytes"] += len(chunk)
+                    yield chunk
+                error = None
+                if record["transport"] == "adb" and record["exit_status"] and not record["bytes"]:
+                    error = b"".join(stderr_sink[mark:]).decode("utf-8", "ignore").strip()
+                if not error or not adb_scheduler.is_transient(error):
+                    break
+            except (OSError, adb_client.AdbError, adb_scheduler.IdleTimeout) as e:
+                if record["bytes"] or not adb_scheduler.is_transient(e) or attempt == adb_scheduler.MAX_RETRIES:
+                    raise
+                error = e
+            if attempt == adb_scheduler.MAX_RETRIES:
+                break
+            del stderr_sink[mark:]
+            wait = adb_scheduler.backoff(attempt)
+            print(f"[!] '{key}' failed ({error}); retry {attempt + 1}/{adb_scheduler.MAX_RETRIES} in {wait:.1f}s")
+            time.sleep(wait)
+            if SUPERVISOR is not None and not SUPERVISOR.ensure():
+                if isinstance(error, Exception):
+                    raise error
+                break
+        if error is not None and adb_scheduler.is_transient(error):
+            # the adb binary reported a transport failure on stderr
+            record["error"] = error
+        if not record["exit_status"]:
+            DURATIONS.observe(DEVICE_SERIAL, key, time.perf_counter() - start)
+
+def _iter_adb_output(command, idle, total, stderr_sink, record):
+    """One attempt of iter_adb_output."""
+    client = adb_client.get_client(DEVICE_SERIAL)
+    if client and command[0] in NATIVE_COMMANDS:
+        record["transport"] = "socket"
+        deadline = time.monotonic() + total
+        line = device_command_line(command)
         try:
-            # Read back from GridFS
-            file_doc = fs.find_one({"filename": filename})
-            print(file_doc)
-            if file_doc:
-                data = file_doc.read().decode("utf-8", errors="ignore")
-                artifacts_summary[filename] = data
-                print(f"Successfully read {filename}")
-        except Exception as e:
-            artifacts_summary[filename] = f"Error reading {filename}: {e}"
+            if command[0] == "exec-out":
+                packets = ((adb_client.SHELL_STDOUT, data) for data in client.exec_stream(line, timeout=idle))
+            else:
+                packets = client.shell_stream(line, timeout=idle)
+            for stream_id, data in packets:
+                if stream_id == adb_client.SHELL_STDOUT:
+                    yield data
+                elif stream_id == adb_client.SHELL_STDERR:
+                    stderr_sink.append(data)
+                elif stream_id == adb_client.SHELL_EXIT:
+                    record["exit_status"] = data[0] if data else None
+                if time.monotonic() > deadline:
+                    raise subprocess.TimeoutExpired(line, total)
+        except TimeoutError:
+            raise adb_scheduler.IdleTimeout(line, idle) from None
+        return
+
+    record["transport"] = "adb"
+    proc = subprocess.Popen(adb_argv(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            **adb_scheduler.PROCESS_GROUP)
+    stderr_thread = threading.Thread(target=_drain, args=(proc.stderr, stderr_sink), daemon=True)
+    stderr_thread.start()
+    watchdog = adb_scheduler.ReadWatchdog(proc, idle, total)
+    try:
+        for chunk in iter(lambda: watchdog.read(proc.stdout.read1, STREAM_CHUNK_SIZE), b""):
+            yield chunk
+        proc.wait()
+        stderr_thread.join()
+        record["exit_status"] = proc.returncode
+        if watchdog.fired == "idle":
+            raise adb_scheduler.IdleTimeout(adb_argv(command), idle)
+        if watchdog.fired == "total":
+            raise subprocess.TimeoutExpired(adb_argv(command), total)
+    finally:
+        watchdog.stop()
+        adb_scheduler.kill_process_group(proc)
+
+def iter_adb_lines(command, timeout=120, stderr_sink=None):
+    """Yield decoded output lines of an ADB command as they arrive."""
+    return text_stream.iter_lines(iter_adb_output(command, timeout=timeout, stderr_sink=stderr_sink),
+                                  errors="surrogateescape")
+
+def stream_adb_to_gridfs(command, filename, timeout=120, binary=False, tags=None, tap=None, transfer=None):
+    """
+    Run an ADB command and stream its stdout straight into GridFS.
+    Memory use does not grow with the artifact; SHA-256 and byte count are
+    computed on the fly. `tags` are added to the version doc (e.g. the
+    device-side source path). `tap`, if given, sees every chunk on its way
+    to storage. With a `transfer` dict the stdout is a gzip stream: it is
+    inflated before tap, hashing and storage, and the dict gets the bytes
+    on the wire, the inflated bytes and their ratio.
+    Returns (file_id, sha256, size, stderr).
+    """
+    stderr_tail = []
+    chunks = iter_adb_output(command, timeout=timeout, stderr_sink=stderr_tail)
+    if transfer is not None:
+        chunks = _inflated(chunks, transfer)
+    if tap is not None:
+        chunks = _tapped(chunks, tap)
+    with PROFILE.measure("store", filename) as record:
+        version = evidence_store.put_stream(mongo_store.get_db(), mongo_store.get_fs(), filename, chunks,
+                                            tags={**device_tags(), **(tags or {})}, compress=not binary,
+                                            content_type=content_type(binary), batch=VERSION_BATCH, binary=binary)
+        record["bytes"] = version["length"]
+        record["transport"] = "reused" if version["reused_blob"] else "upload"
+
+    stderr = b"".join(stderr_tail).decode("utf-8", "ignore").strip()
+    print(f"[+] Streamed '{filename}' to MongoDB ({version['length']} bytes, sha256 {version['sha256']}), {_describe(version)}")
+    return version["file_id"], version["sha256"], version["length"], stderr
+
+def _tapped(chunks, tap):
+    for chunk in chunks:
+        tap(chunk)
+        yield chunk
+
+def _inflated(chunks, transfer):
+    """Inflate a gzip stream chunk by chunk; a stream cut short raises zlib.error."""
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        transfer["wire_bytes"] += len(chunk)
+        data = inflater.decompress(chunk)
+        if data:
+            transfer["bytes"] += len(data)
+            yield data
+    data = inflater.flush()
+    if data:
+        transfer["bytes"] += len(data)
+        yield data
+    if not inflater.eof:
+        raise zlib.error(f"gzip stream ended early after {transfer['wire_bytes']} bytes")
+    transfer["ratio"] = round(transfer["bytes"] / transfer["wire_bytes"], 2) if transfer["wire_bytes"] else None
+
+def capture_to_file(filename, command, timeout=120, binary=False, tags=None, tap=None, transfer=None):
+    """Streaming counterpart of run_adb_command + save_to_file for large dumps."""
+    try:
+        return stream_adb_to_gridfs(command, filename, timeout=timeout, binary=binary, tags=tags, tap=tap,
+                                    transfer=transfer)
+    except Exception as e:
+        print(f"[!] Error streaming {filename}: {e}")
+
+def capture_dump(filename, command, timeout=120, tags=None, tap=None):
+    """
+    capture_to_file for a text dump. With COMPRESS_TRANSFER the command
+    runs as `( ... ) | gzip -c` over exec-out, so only the compressed bytes
+    cross the link; the stored artifact, its hashes and the tap are those
+    of the plain text. The version doc's `transfer` field records the
+    saving. stderr is dropped on the device, as exec-out would mix it into
+    the gzip stream.
+    """
+    if not COMPRESS_TRANSFER:
+        return capture_to_file(filename, command, timeout=timeout, tags=tags, tap=tap)
+    # filled in while streaming; read when the version doc is written at the end
+    transfer = {"encoding": "gzip", "wire_bytes": 0, "bytes": 0, "ratio": None}
+    result = capture_to_file(filename, ['exec-out', f"( {device_command_line(command)} ) 2>/dev/null | gzip -c"],
+                             timeout=timeout, tags={**(tags or {}), "transfer": transfer}, tap=tap,
+                             transfer=transfer)
+    if result is not None and transfer["ratio"]:
+        print(f"[+] '{filename}': {transfer['wire_bytes']} bytes over the wire for {transfer['bytes']} "
+              f"({transfer['ratio']:.1f}x)")
+    return result
+
+def device_has_gzip():
+    """True if gzip on the device round-trips (toybox has it on current Wear OS)."""
+    out, _ = run_adb_command(['shell', 'echo gzip-ok | gzip -c | gzip -dc'])
+    return out == "gzip-ok"
+
+# Artifacts listed in packet_report.json
+ARTIFACT_FILES = [
+    "basic_device_info.txt",
+    "device_properties.txt",
+    "logcat_capture.txt",
+    "account_information.txt",
+    "wifi_information.txt",
+    "bluetooth_information.txt",
+    "ip_address_information.txt",
+    "sensor_data.txt",
+    "dumpsys_location.txt",
+    "keystore_information.txt",
+    "trust_information.txt",
+    "notification_information.txt"
+]
+
+# Everything the collectors store, so an acquisition can look up all
+# previous versions in one query.
+STORED_FILES = ARTIFACT_FILES + ["btsnoop_hci.log", "activity_summary.log", "logcat_binary.bin",
+                                "bugreport.zip", "sensor_columns.bin", "package_list.txt",
+                                "dumpsys_package.txt", "usagestats.txt",
+                                "batterystats_history.txt", "battery_history.bin"]
+
+def create_json_summary(output="packet_report.json", acquisition_id=None):
+    """
+    Write packet_report.json as a manifest of the acquired artifacts (size,
+    line count, hashes, content type, GridFS id). It is built from the
+    version index alone; contents are paged in on demand through
+    artifact_reader.py, so this step does not grow with the evidence size.
+    """
+    try:
+        if VERSION_BATCH is not None:
+            artifacts = VERSION_BATCH.manifest(ARTIFACT_FILES)
+        else:
+            artifacts = evidence_store.manifest(mongo_store.get_db(), ARTIFACT_FILES, DEVICE_SERIAL)
+    except Exception as e:
+        print(f"[!] Error building artifact manifest: {e}")
+        artifacts = {}
 
     summary = {
         "success": True,
         "message": "Acquisition completed successfully",
-        "artifacts": artifacts_summary
+        "serial": DEVICE_SERIAL,
+        "device_fingerprint": DEVICE_FINGERPRINT,
+        "acquisition_id": str(acquisition_id) if acquisition_id else None,
+        "artifacts": artifacts
     }
     # Write JSON locally so Node can serve it
-    with open("packet_report.json", "w", encoding="utf-8") as f:
-        json.dump(summary, f, indent=2)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(summary, f, separators=(",", ":"))
+    print(f"[+] Wrote manifest of {len(artifacts)} artifacts to {output}")
 
 def collect_device_properties():
-    props, _ = run_adb_command(['shell', 'getprop'])
-    save_to_file("device_properties.txt", props)
+    """
+    getprop and the Android ID in one shell call. Stores the raw dump, the
+    identity summary basic_device_info.txt and the `devices` document.
+    """
+    output, _ = run_adb_command(['shell', device_info.BATCH_COMMAND])
+    props_text, android_id = device_info.split_output(output)
+    file_id = save_to_file("device_properties.txt", props_text)
+    props = device_info.parse_getprop(props_text)
+    if not props:
+        print("[-] getprop returned no properties.")
+        return
+    save_to_file("basic_device_info.txt", device_info.info_text(device_info.basic_info(props, android_id, DEVICE_SERIAL)))
+    try:
+        device_info.save_device(mongo_store.get_db(), DEVICE_SERIAL, props, android_id, file_id)
+        print(f"[+] Recorded device {props.get('ro.product.model')} (android_id {android_id})")
+    except Exception as e:
+        print(f"[!] Error recording device: {e}")
 
 def pull_logs():
-    logcat_data, _ = run_adb_command(['logcat', '-d'], timeout=120)
-    save_to_file("logcat_capture.txt", logcat_data)
+    if LOGCAT_FORMAT == "binary":
+        pull_binary_logs()
+    else:
+        capture_dump("logcat_capture.txt", ['logcat', '-d'], timeout=120)
+
+def pull_binary_logs():
+    """
+    Pull every log buffer as binary logger_entry records (`logcat -B`) and
+    decode them on the host (see logcat_binary.py):
+    - the raw dump is stored as logcat_binary.bin;
+    - decoded entries (time, pid, tid, priority, tag, message, buffer) go
+      to the logcat_entries collection while the dump streams in;
+    - logcat_capture.txt is rendered from the stored dump for the report
+      and UI, without a second transfer.
+    """
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    db[LOGCAT_ENTRIES].create_index([("serial", 1), ("time", 1)])
+    db[LOGCAT_ENTRIES].create_index("capture_id")
+    capture_id = ObjectId()
+    decoder = logcat_binary.Decoder()
+    pending = []
+    failed = []
+
+    def flush():
+        if pending:
+            db[LOGCAT_ENTRIES].insert_many(pending, ordered=False)
+            pending.clear()
+
+    def decode(chunk):
+        # a decoding error must not abort the upload of the raw dump
+        if failed:
+            return
+        try:
+            entries = decoder.feed(chunk)
+        except ValueError as e:
+            failed.append(e)
+            pending.clear()
+            print(f"[!] Could not decode logcat -B ({e}); storing the raw dump only")
+            return
+        first = decoder.entries - len(entries)
+        for seq, entry in enumerate(entries, first):
+            pending.append({**entry, "time": logcat_binary.entry_time(entry), "seq": seq,
+                            "serial": DEVICE_SERIAL, "capture_id": capture_id})
+            if len(pending) >= ENTRY_BATCH:
+                flush()
+
+    result = capture_to_file("logcat_binary.bin", ['exec-out', 'logcat -B -d -b all'], timeout=120,
+                             binary=True, tags={"capture_id": capture_id}, tap=decode)
+    flush()
+    if result is None or failed:
+        # entries of a dump that was cut off or could not be decoded to the
+        # end would show up in the timeline as if they were the whole log
+        db[LOGCAT_ENTRIES].delete_many({"capture_id": capture_id})
+    if result is None:
+        return
+    if failed:
+        capture_dump("logcat_capture.txt", ['logcat', '-d'], timeout=120)
+        return
+    print(f"[+] Decoded {decoder.entries} binary log entries into {LOGCAT_ENTRIES}")
+    trailing = decoder.close()
+    if trailing:
+        print(f"[!] logcat -B ended inside an entry; {trailing} trailing bytes not decoded")
+
+    def rendered():
+        lines, size = [], 0
+        raw = evidence_store.iter_version(fs, {"file_id": result[0]})
+        for entry in logcat_binary.iter_entries(raw):
+            line = (logcat_binary.format_threadtime(entry) + "\n").encode("utf-8")
+            lines.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_SIZE:
+                yield b"".join(lines)
+                lines, size = [], 0
+        if lines:
+            yield b"".join(lines)
+
+    with PROFILE.measure("store", "logcat_capture.txt") as record:
+        version = evidence_store.put_stream(db, fs, "logcat_capture.txt", rendered(),
+                                            tags={**device_tags(), "capture_id": capture_id, "rendered_from": result[0]},
+                                            compress=True, content_type=content_type(False), batch=VERSION_BATCH)
+        record["bytes"] = version["length"]
+    print(f"[+] Rendered logcat_capture.txt from the binary dump ({version['length']} bytes), {_describe(version)}")
 
 def collect_account_info():
     acc_info, _ = run_adb_command(['shell', 'dumpsys', 'account'])
     save_to_file("account_information.txt", acc_info)
 
 def wifi_info():
-    wifi_out, _ = run_adb_command(['shell', 'dumpsys', 'wifi'])
-    save_to_file("wifi_information.txt", wifi_out)
+    capture_dump("wifi_information.txt", ['shell', 'dumpsys', 'wifi'], timeout=30)
 
 def ip_info():
     ip_out, _ = run_adb_command(['shell', 'ip', 'addr', 'show'])
@@ -117,43 +566,115 @@ def bluetooth_info():
     save_to_file("bluetooth_information.txt", bt_out)
 
 def sensor_data():
-    s_out, _ = run_adb_command(['shell', 'dumpsys', 'sensorservice'])
-    save_to_file("sensor_data.txt", s_out)
+    """Stream the sensorservice dump and store its events as columns (see sensor_store.py)."""
+    parser = sensor_store.SensorParser()
+    result = capture_dump("sensor_data.txt", ['shell', 'dumpsys', 'sensorservice'], timeout=30, tap=parser.feed)
+    if result is not None:
+        store_sensor_columns(parser, result[1])
+
+def store_sensor_columns(parser, source_sha256):
+    columns = parser.columns()
+    if not columns:
+        print("[-] No sensor events in the sensorservice dump.")
+        return
+    try:
+        with PROFILE.measure("store", sensor_store.COLUMNS_FILE) as record:
+            version = sensor_store.store(mongo_store.get_db(), mongo_store.get_fs(), columns, source_sha256,
+                                         tags=device_tags(), batch=VERSION_BATCH)
+            record["bytes"] = version["length"]
+            record["transport"] = "reused" if version["reused_blob"] else "upload"
+    except Exception as e:
+        print(f"[!] Error storing sensor columns: {e}")
+        return
+    print(f"[+] Stored {sum(len(c[0]) for c in columns.values())} events of {len(columns)} sensors "
+          f"as columns ({version['length']} bytes)")
+
+def installed_packages():
+    """
+    Stream `pm list packages` and `dumpsys package` into evidence storage and
+    parse both on the way into the packages collection (see package_inventory.py).
+    """
+    db = mongo_store.get_db()
+    package_inventory.ensure_indexes(db)
+    inventory = package_inventory.Inventory(db, DEVICE_SERIAL)
+    sources = {}
+    for filename, command, timeout, tap in (
+        ("package_list.txt", ['shell', 'pm', 'list', 'packages', '-f', '-U', '-i'], 60, inventory.feed_list),
+        ("dumpsys_package.txt", ['shell', 'dumpsys', 'package'], 300, inventory.feed_dump),
+    ):
+        result = capture_dump(filename, command, timeout=timeout, tap=tap)
+        sources[filename] = result[1] if result else None
+    count = inventory.close(sources)
+    print(f"[+] Recorded {count} installed packages (inventory {inventory.inventory_id})")
+
+def app_databases():
+    """SQLite databases under /sdcard and of debuggable apps, pulled and exported (see sqlite_acquisition.py)."""
+    import sqlite_acquisition
+    docs = sqlite_acquisition.acquire(device_context(), batch=VERSION_BATCH)
+    print(f"[+] Exported {len(docs)} SQLite databases ({sum(d['row_count'] for d in docs)} rows)")
+
+# Where Android and Samsung builds leave the HCI snoop log, in order of preference.
+BTSNOOP_PATHS = [
+    "/sdcard/btsnoop_hci.log",
+    "/sdcard/btsnoop.log",
+    "/data/misc/bluetooth/logs/btsnoop_hci.log",
+    "/data/misc/bluetooth/btsnoop_hci.log",
+    "/data/misc/bluedroid/btsnoop_hci.log"
+]
 
 def bluetooth_snoop():
-    paths = [
-        "/sdcard/btsnoop_hci.log",
-        "/sdcard/btsnoop.log",
-        "/data/misc/bluetooth/logs/btsnoop_hci.log",
-        "/data/misc/bluetooth/btsnoop_hci.log",
-        "/data/misc/bluedroid/btsnoop_hci.log"
-    ]
-    for path in paths:
-        out = subprocess.run(["adb", "shell", "ls", path], capture_output=True, text=True)
-        if "No such file" in out.stdout or "No such file" in out.stderr:
-            continue
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        local_file = f"btsnoop_{ts}.log"
-        pull = subprocess.run(["adb", "pull", path, local_file], capture_output=True, text=True)
-        if "does not exist" in pull.stderr or not os.path.exists(local_file):
-            continue
-        with open(local_file, "rb") as f:
-            data = f.read()
-        save_to_file(local_file, data, binary=True)
-        break
+    """
+    Probe all candidate snoop-log paths in one shell call, then stream the
+    first readable one from the device straight into evidence storage
+    with exec-out. Nothing is written to local disk.
+    """
+    probe = "; ".join(f"[ -r '{p}' ] && echo '{p}'" for p in BTSNOOP_PATHS) + "; true"
+    out, _ = run_adb_command(['shell', probe])
+    found = [line.strip() for line in out.splitlines() if line.strip() in BTSNOOP_PATHS]
+    if not found:
+        print("[-] No readable btsnoop log on the device.")
+        return
+    path = found[0]
+    capture_to_file("btsnoop_hci.log", ['exec-out', 'cat', path], timeout=300,
+                    binary=True, tags={"source_path": path})
 
 def collect_location_info():
-    loc_raw, err = run_adb_command(['shell', 'dumpsys', 'location'], timeout=45)
-    save_to_file("dumpsys_location.txt", loc_raw)
+    capture_dump("dumpsys_location.txt", ['shell', 'dumpsys', 'location'], timeout=45)
     # (rest of your CSV generation stays same)
 
 def extract_activity_info():
     output, _ = run_adb_command(['shell', 'dumpsys', 'activity', 'intents'], timeout=60)
     if not output:
         return
-    timestamp = D.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"activity_summary_{timestamp}.log"
-    save_to_file(filename, output)
+    # Versions carry their own acquisition time, so the name stays stable.
+    save_to_file("activity_summary.log", output)
+
+def usage_events():
+    """Stream `dumpsys usagestats` and parse its events into usage_events (see usage_stats.py)."""
+    db = mongo_store.get_db()
+    usage_stats.ensure_indexes(db)
+    ingest = usage_stats.UsageIngest(db, DEVICE_SERIAL)
+    capture_dump("usagestats.txt", ['shell', usage_stats.COMMAND], timeout=120, tap=ingest.feed)
+    inserted = ingest.close()
+    print(f"[+] Parsed {ingest.parsed} usage events, {inserted} new")
+
+def battery_stats_history():
+    """Stream `dumpsys batterystats --history` and store it as columns (see battery_history.py)."""
+    parser = battery_history.HistoryParser()
+    result = capture_dump(battery_history.SOURCE_FILE, ['shell', battery_history.COMMAND], timeout=180,
+                             tap=parser.feed)
+    if result is None:
+        return
+    try:
+        with PROFILE.measure("store", battery_history.HISTORY_FILE) as record:
+            version = battery_history.store(mongo_store.get_db(), mongo_store.get_fs(), parser, result[1],
+                                            tags=device_tags(), batch=VERSION_BATCH)
+            record["bytes"] = version["length"]
+            record["transport"] = "reused" if version["reused_blob"] else "upload"
+    except Exception as e:
+        print(f"[!] Error storing battery history: {e}")
+        return
+    print(f"[+] Stored battery history: {len(parser.names)} states, {version['length']} bytes of columns")
 
 def keystore_info():
     keystore_data, _ = run_adb_command(['shell', 'dumpsys', 'keystore'])
@@ -165,33 +686,364 @@ def trust_info():
 
 def notification_info():
     """Collect notification-related information from the device."""
-    notif_data, err = run_adb_command(['shell', 'dumpsys', 'notification'], timeout=60)
-    if notif_data:
-        save_to_file("notification_information.txt", notif_data)
-    else:
+    result = capture_dump("notification_information.txt", ['shell', 'dumpsys', 'notification'], timeout=60)
+    if result is None or result[2] == 0:
+        err = result[3] if result else "capture failed"
         save_to_file("notification_information.txt", f"Error or empty output: {err}")
 
-def main():
-    if not check_adb_device():
+# Slowest collectors first so long dumps start early and short ones fill the gaps.
+COLLECTORS = [
+    pull_logs,
+    installed_packages,
+    app_databases,
+    notification_info,
+    usage_events,
+    battery_stats_history,
+    extract_activity_info,
+    collect_location_info,
+    bluetooth_snoop,
+    sensor_data,
+    wifi_info,
+    bluetooth_info,
+    collect_account_info,
+    keystore_info,
+    trust_info,
+    collect_device_properties,
+    ip_info,
+]
+
+# Artifacts each collector stores, for skipping those the bugreport covers.
+COLLECTOR_ARTIFACTS = {
+    "pull_logs": ["logcat_capture.txt"],
+    "installed_packages": ["package_list.txt", "dumpsys_package.txt"],
+    "notification_info": ["notification_information.txt"],
+    "usage_events": ["usagestats.txt"],
+    "battery_stats_history": ["batterystats_history.txt", "battery_history.bin"],
+    "extract_activity_info": ["activity_summary.log"],
+    "collect_location_info": ["dumpsys_location.txt"],
+    "bluetooth_snoop": ["btsnoop_hci.log"],
+    "sensor_data": ["sensor_data.txt"],
+    "wifi_info": ["wifi_information.txt"],
+    "bluetooth_info": ["bluetooth_information.txt"],
+    "collect_account_info": ["account_information.txt"],
+    "keystore_info": ["keystore_information.txt"],
+    "trust_info": ["trust_information.txt"],
+    "collect_device_properties": ["device_properties.txt", "basic_device_info.txt"],
+    "ip_info": ["ip_address_information.txt"],
+}
+
+def acquire_bugreport():
+    """
+    Stream one `bugreportz -s` zip into evidence storage, index its sections
+    (see bugreport_index.py) and record the usual artifacts as slices of it.
+    Returns the recorded artifact names; empty if the zip is unusable.
+    """
+    result = capture_to_file(bugreport_index.BUGREPORT_FILE, ['exec-out', 'bugreportz', '-s'],
+                             timeout=900, binary=True)
+    if result is None or result[2] == 0:
+        print("[-] bugreportz returned no data.")
+        return []
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    try:
+        sections = bugreport_index.build_index(fs, result[0])
+    except zipfile.BadZipFile as e:
+        print(f"[!] bugreport is not a valid zip: {e}")
+        return []
+    bugreport_index.save_index(db, result[0], sections, DEVICE_SERIAL)
+    versions = bugreport_index.record_artifacts(db, result[0], sections, tags=device_tags(), batch=VERSION_BATCH)
+    print(f"[+] Indexed {len(sections)} bugreport sections; {len(versions)} artifacts served from the zip")
+    if "sensor_data.txt" in versions:
+        parser = sensor_store.SensorParser()
+        for chunk in evidence_store.iter_version(fs, versions["sensor_data.txt"]):
+            parser.feed(chunk)
+        store_sensor_columns(parser, versions["sensor_data.txt"]["sha256"])
+    return list(versions)
+
+def bugreport_collectors():
+    """
+    Collectors of a bugreport acquisition: the zip, plus the collectors of
+    artifacts it did not contain (the btsnoop log is never in it) and those
+    with no artifacts mapped (app databases, for one), which it never covers.
+    """
+    found = set()
+
+    def bugreport():
+        found.update(acquire_bugreport())
+        if JOURNAL is not None:
+            JOURNAL.note("acquire_bugreport", artifacts=sorted(found))
+
+    bugreport.__name__ = "acquire_bugreport"
+    timings = {}
+    if JOURNAL is not None and JOURNAL.state(bugreport.__name__) == acquisition_journal.DONE:
+        found.update(JOURNAL.entry(bugreport.__name__).get("artifacts", []))
+        print(f"[+] Bugreport already acquired, {len(found)} artifacts served from it")
+    else:
+        name, elapsed, _ = timed_collector(bugreport)
+        timings[name] = elapsed
+        print(f"[+] {name} finished in {elapsed:.2f}s")
+    missing = [c for c in COLLECTORS
+               if c.__name__ not in COLLECTOR_ARTIFACTS or not set(COLLECTOR_ARTIFACTS[c.__name__]) <= found]
+    return timings, missing
+
+def timed_collector(collector):
+    """Run one collector, journal how it ended and return (name, seconds, error)."""
+    start = time.perf_counter()
+    started_at = D.now()
+    error = None
+    PROFILE.collector = collector.__name__
+    try:
+        collector()
+    except Exception as e:
+        error = e
+        print(f"[!] Collector {collector.__name__} failed: {e}")
+    finally:
+        PROFILE.collector = None
+    elapsed = time.perf_counter() - start
+    if JOURNAL is not None:
+        journal_collector(collector.__name__, elapsed, error, started_at)
+    return collector.__name__, elapsed, error
+
+def journal_collector(name, elapsed, error, started_at):
+    """
+    Record a collector in the journal. Collectors catch their own capture
+    errors, so a drop is recognised from the transient adb errors profiled
+    for it since it started.
+    """
+    errors = PROFILE.errors(name, since=started_at)
+    dropped = [e for e in errors if adb_scheduler.is_transient(e)]
+    if error is not None and adb_scheduler.is_transient(error):
+        dropped.append(str(error))
+    if dropped:
+        state, reason = acquisition_journal.INTERRUPTED, dropped[-1]
+    elif error is not None:
+        state, reason = acquisition_journal.FAILED, str(error)
+    else:
+        state, reason = acquisition_journal.DONE, None
+    try:
+        JOURNAL.record(name, state, elapsed, reason)
+    except Exception as e:
+        print(f"[!] Error updating the acquisition journal: {e}")
+
+def run_journaled(collectors, max_workers=DEFAULT_WORKERS):
+    """
+    Run the collectors the journal does not have as finished. Those cut off
+    by a connection drop run again once the supervisor has the device back.
+    Returns a dict of collector name -> wall time summed over the passes.
+    """
+    pending = JOURNAL.pending(collectors)
+    if len(pending) < len(collectors):
+        print(f"[+] Resuming: {len(collectors) - len(pending)} collectors already finished, {len(pending)} to run")
+    timings = {}
+    for attempt in range(INTERRUPTED_PASSES + 1):
+        for name, elapsed in run_collectors(pending, max_workers=max_workers).items():
+            timings[name] = timings.get(name, 0.0) + elapsed
+        pending = JOURNAL.pending(pending)
+        if not pending or attempt == INTERRUPTED_PASSES or not SUPERVISOR.ensure():
+            break
+        print(f"[!] {len(pending)} collectors were interrupted, running them again: "
+              f"{', '.join(c.__name__ for c in pending)}")
+    return timings
+
+def run_collectors(collectors, max_workers=DEFAULT_WORKERS):
+    """
+    Run the collectors on a bounded thread pool.
+    max_workers limits how many adb commands hit the device at once;
+    1 keeps the old sequential behaviour.
+    Returns a dict of collector name -> wall time in seconds.
+    """
+    timings = {}
+    if max_workers <= 1:
+        for collector in collectors:
+            name, elapsed, _ = timed_collector(collector)
+            timings[name] = elapsed
+        return timings
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="collector") as pool:
+        futures = [pool.submit(timed_collector, c) for c in collectors]
+        for future in as_completed(futures):
+            name, elapsed, _ = future.result()
+            timings[name] = elapsed
+            print(f"[+] {name} finished in {elapsed:.2f}s")
+    return timings
+
+def print_timings(timings, total):
+    """Print per-collector wall time, slowest first, and the overall total."""
+    print("\n[+] Collector timings:")
+    for name, elapsed in sorted(timings.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"    {name:<28} {elapsed:8.2f}s")
+    print(f"    {'sum of collectors':<28} {sum(timings.values()):8.2f}s")
+    print(f"    {'total wall time':<28} {total:8.2f}s")
+
+def select_device(serial):
+    """Pin this process to one device and record its build fingerprint."""
+    global DEVICE_SERIAL, DEVICE_FINGERPRINT, SUPERVISOR
+    DEVICE_SERIAL = serial
+    SUPERVISOR = adb_scheduler.ConnectionSupervisor(serial, check_adb_device, connect_device)
+    fingerprint, _ = run_adb_command(['shell', 'getprop', 'ro.build.fingerprint'])
+    DEVICE_FINGERPRINT = fingerprint or None
+
+def save_profile(timings, elapsed, workers):
+    """Store the command profile of this acquisition; returns (id, document)."""
+    document = PROFILE.document(DEVICE_SERIAL, DEVICE_FINGERPRINT, timings, elapsed, workers)
+    try:
+        return PROFILE.save(mongo_store.get_db(), document), document
+    except Exception as e:
+        print(f"[!] Error saving acquisition profile: {e}")
+        return None, document
+
+def acquire_device(serial, workers=DEFAULT_WORKERS, output="packet_report.json", logcat_format="text",
+                   bugreport=False, resume=False, compress=False):
+    """
+    Acquire every artifact from one device. Runs in its own process in
+    --all-devices mode. With `resume`, continues the device's open journal
+    with the same options instead of starting over; with `compress`, text
+    dumps are gzipped on the device (see capture_dump).
+    Returns (serial, timings, seconds, profile document).
+    """
+    global VERSION_BATCH, PROFILE, LOGCAT_FORMAT, BUGREPORT_MODE, JOURNAL, COMPRESS_TRANSFER
+    LOGCAT_FORMAT = logcat_format
+    BUGREPORT_MODE = bugreport
+    PROFILE = acquisition_profile.Profile()
+    start = time.perf_counter()
+    select_device(serial)
+    COMPRESS_TRANSFER = compress and device_has_gzip()
+    if compress and not COMPRESS_TRANSFER:
+        print(f"[-] [{serial}] no working gzip on the device, transferring dumps uncompressed")
+    db = mongo_store.get_db()
+    evidence_store.ensure_indexes(db)
+    DURATIONS.load(db, serial)
+    VERSION_BATCH = evidence_store.VersionBatch(db, STORED_FILES, serial)
+    options = {"bugreport": bugreport, "logcat_format": logcat_format, "compress": compress}
+    JOURNAL = acquisition_journal.Journal.open(db, serial, options, resume=resume)
+    if JOURNAL.resumed:
+        print(f"[+] [{serial}] resuming the acquisition started {JOURNAL.doc['started_at']:%Y-%m-%d %H:%M:%S} "
+              f"({len(JOURNAL.doc['runs'])} earlier runs, {JOURNAL.elapsed():.0f}s)")
+    elif resume:
+        print(f"[-] [{serial}] no interrupted acquisition to resume, starting a new one")
+    print(f"[+] [{serial}] collecting forensic evidence ({DEVICE_FINGERPRINT})...")
+    with VERSION_BATCH:
+        if BUGREPORT_MODE:
+            timings, collectors = bugreport_collectors()
+            timings.update(run_journaled(collectors, max_workers=workers))
+        else:
+            collectors = COLLECTORS
+            timings = run_journaled(collectors, max_workers=workers)
+        left = JOURNAL.finish(collectors, time.perf_counter() - start)
+        if left:
+            print(f"[!] [{serial}] {len(left)} collectors did not finish ({', '.join(left)}); "
+                  f"reconnect the device and run again with --resume")
+        try:
+            DURATIONS.save(db)
+        except Exception as e:
+            print(f"[!] Error saving command durations: {e}")
+        acquisition_id, profile = save_profile(timings, time.perf_counter() - start, workers)
+        create_json_summary(output, acquisition_id)
+    VERSION_BATCH = None
+    JOURNAL = None
+    return serial, timings, time.perf_counter() - start, profile
+
+def acquire_all_devices(serials, workers=DEFAULT_WORKERS, logcat_format="text", bugreport=False, resume=False,
+                        compress=False):
+    """
+    Acquire several devices in parallel, one worker process per serial.
+    Processes are spawned rather than forked so each gets its own device
+    globals; mongo_store connects separately in each of them.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with ProcessPoolExecutor(max_workers=len(serials), mp_context=ctx) as pool:
+        futures = {
+            pool.submit(acquire_device, serial, workers, f"packet_report_{serial}.json", logcat_format,
+                        bugreport, resume, compress): serial
+            for serial in serials
+        }
+        for future in as_completed(futures):
+            serial = futures[future]
+            try:
+                _, timings, elapsed, profile = future.result()
+                results[serial] = (timings, elapsed, profile)
+            except Exception as e:
+                print(f"[!] Acquisition of {serial} failed: {e}")
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Acquire forensic artifacts from a Samsung watch over ADB.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"collectors run concurrently against each device (default {DEFAULT_WORKERS}, 1 = sequential)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--serial", help="acquire only the device with this serial")
+    target.add_argument("--all-devices", action="store_true",
+                        help="acquire every attached device in parallel, one process per serial")
+    parser.add_argument("--profile", action="store_true",
+                        help="print collectors and adb commands ranked by wall time and bytes moved")
+    parser.add_argument("--logcat-format", choices=["text", "binary"], default="text",
+                        help="binary pulls logcat -B (smaller on the wire) and decodes it on the host")
+    parser.add_argument("--bugreport", action="store_true",
+                        help="pull one bugreport zip and serve the dumpsys artifacts as indexed slices of it")
+    parser.add_argument("--compress", action="store_true",
+                        help="gzip text dumps on the watch and inflate them on the host (less data over wireless adb)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the last interrupted acquisition of the device, skipping finished collectors")
+    parser.add_argument("--verify", action="store_true",
+                        help="afterwards, re-hash pulled device files on the watch and compare with the stored hashes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    serials = list_adb_devices()
+    if args.serial and args.serial not in serials and adb_scheduler.is_network_serial(args.serial):
+        # a wireless watch that dropped since the last run
+        supervisor = adb_scheduler.ConnectionSupervisor(args.serial, lambda: args.serial in list_adb_devices(),
+                                                        connect_device, attempts=3)
+        if supervisor.ensure():
+            serials = list_adb_devices()
+    if not serials:
         print("[-] No ADB device connected.")
         return
+
+    if args.all_devices:
+        print(f"[+] {len(serials)} devices connected: {', '.join(serials)}")
+        start = time.perf_counter()
+        results = acquire_all_devices(serials, workers=args.workers, logcat_format=args.logcat_format,
+                                      bugreport=args.bugreport, resume=args.resume,
+                                      compress=args.compress)
+        for serial, (timings, elapsed, profile) in results.items():
+            print(f"\n[+] Device {serial}:")
+            print_timings(timings, elapsed)
+            if args.profile:
+                acquisition_profile.print_summary(profile)
+            if args.verify:
+                verify_on_device(serial)
+        print(f"\n[+] All devices acquired in {time.perf_counter() - start:.2f}s")
+        return
+
+    if args.serial and args.serial not in serials:
+        print(f"[-] Device {args.serial} is not connected (attached: {', '.join(serials)}).")
+        return
+    if not args.serial and len(serials) > 1:
+        print(f"[-] Several devices attached ({', '.join(serials)}); use --serial or --all-devices.")
+        return
+
     print("[+] Device connected, collecting forensic evidence...")
     time.sleep(1)
-    collect_device_properties()
-    pull_logs()
-    collect_account_info()
-    wifi_info()
-    bluetooth_info()
-    ip_info()
-    bluetooth_snoop()
-    sensor_data()
-    collect_location_info()
-    extract_activity_info()
-    keystore_info()
-    trust_info()
-    notification_info()
-    create_json_summary()
+    serial, timings, elapsed, profile = acquire_device(args.serial or serials[0], workers=args.workers,
+                                                       logcat_format=args.logcat_format,
+                                                       bugreport=args.bugreport, resume=args.resume,
+                                                       compress=args.compress)
+    print_timings(timings, elapsed)
+    if args.profile:
+        acquisition_profile.print_summary(profile)
+    if args.verify:
+        verify_on_device(serial)
+
+def verify_on_device(serial):
+    """Check pulled device files against sha256sum run on the watch (see device_verify.py)."""
+    import device_verify
+    if DEVICE_SERIAL != serial:
+        select_device(serial)
+    report = device_verify.verify(mongo_store.get_db(), serial, adb_lines=iter_adb_lines)
+    device_verify.print_report(report)
 
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
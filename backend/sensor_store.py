@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Columnar store of the sensor events in `dumpsys sensorservice`.
+
+The "Recent Sensor events" part of the dump lists, per sensor,
+
+    lsm6dso Accelerometer: last 50 events
+         1 (ts=12345.678901, wall=10:11:12.345) 0.12, 9.81, 0.30,
+
+Instead of re-parsing that text into dicts for every chart or report, the
+events are parsed once at acquisition time into typed columns per sensor:
+
+    ts      float64   device uptime in seconds
+    wall    int64     device wall-clock time of day, in ms since midnight
+    values  float32   rows x width (NaN where the value is masked; a
+                      row of NaN is a "[value masked]" event)
+
+and stored as one binary blob ("sensor_columns.bin") next to the raw text,
+tagged with the SHA-256 of the text it was parsed from. The blob is in
+the columnar.py format, so load() hands out numpy views of the stored
+bytes without copying or parsing anything.
+
+    python sensor_store.py [--serial S]       # list the stored sensors
+"""
+import argparse
+import re
+
+import numpy as np
+
+import columnar
+import evidence_store
+import text_stream
+
+COLUMNS_FILE = "sensor_columns.bin"
+SOURCE_FILE = "sensor_data.txt"
+CONTENT_TYPE = "application/x-sensor-columns"
+
+MAGIC = b"SNSRCOL2"
+
+TS_DTYPE = np.dtype("<f8")
+WALL_DTYPE = np.dtype("<i8")
+VALUE_DTYPE = np.dtype("<f4")
+
+SENSOR_HEADER = re.compile(r'^(.*?):.*events$')
+EVENT_LINE = re.compile(r'^\d+\s*\(ts=([\d.]+),\s*wall=(\d+):(\d+):(\d+)(?:\.(\d+))?\)\s*(.*)')
+NUMBER = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+
+
+class SensorParser:
+    """
+    Incremental parser: feed() it chunks of the dump as they are streamed,
+    then columns() returns {sensor name: (ts, wall, values)} numpy arrays.
+    """
+
+    def __init__(self):
+        self._lines = text_stream.LineFeed(self._line)
+        self._sensors = {}
+        self._current = None
+
+    def feed(self, chunk):
+        self._lines.feed(chunk)
+
+    def _line(self, line):
+        line = line.strip()
+        event = EVENT_LINE.match(line)
+        if event:
+            if self._current is None:
+                return
+            hours, minutes, seconds, fraction, rest = event.group(2, 3, 4, 5, 6)
+            millis = int((fraction or "0")[:3].ljust(3, "0"))
+            wall = ((int(hours) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + millis
+            values = [] if "masked" in rest else [float(x) for x in NUMBER.findall(rest)]
+            self._current.append((float(event.group(1)), wall, values))
+            return
+        header = SENSOR_HEADER.match(line)
+        if header:
+            self._current = self._sensors.setdefault(header.group(1).strip(), [])
+
+    def columns(self):
+        self._lines.close()
+        result = {}
+        for name, events in self._sensors.items():
+            if not events:
+                continue
+            width = max(len(values) for _, _, values in events)
+            values = np.full((len(events), width), np.nan, dtype=VALUE_DTYPE)
+            for row, (_, _, v) in enumerate(events):
+                values[row, :len(v)] = v
+            result[name] = (np.array([e[0] for e in events], dtype=TS_DTYPE),
+                            np.array([e[1] for e in events], dtype=WALL_DTYPE),
+                            values)
+        return result
+
+
+def parse(text):
+    """Columns of a whole sensorservice dump (str or bytes)."""
+    parser = SensorParser()
+    parser.feed(text.encode("utf-8") if isinstance(text, str) else text)
+    return parser.columns()
+
+
+def encode(columns):
+    """Serialize {name: (ts, wall, values)} into the blob format."""
+    arrays = {}
+    for i, (ts, wall, values) in enumerate(columns.values()):
+        arrays[f"{i}.ts"] = np.asarray(ts, dtype=TS_DTYPE)
+        arrays[f"{i}.wall"] = np.asarray(wall, dtype=WALL_DTYPE)
+        arrays[f"{i}.values"] = np.asarray(values, dtype=VALUE_DTYPE)
+    return columnar.pack(MAGIC, {"sensors": list(columns)}, arrays)
+
+
+def decode(buffer):
+    """
+    {name: (ts, wall, values)} as read-only numpy views into `buffer`
+    (bytes, memoryview or mmap); nothing is copied.
+    """
+    meta, arrays = columnar.unpack(MAGIC, buffer)
+    return {name: (arrays[f"{i}.ts"], arrays[f"{i}.wall"], arrays[f"{i}.values"])
+            for i, name in enumerate(meta["sensors"])}
+
+
+def store(db, fs, columns, source_sha256=None, tags=None, batch=None):
+    """Store the columns as the next version of sensor_columns.bin; returns the version doc."""
+    tags = {**(tags or {}), "source_file": SOURCE_FILE, "source_sha256": source_sha256,
+            # a list, not {name: count}: sensor names may contain "." or
+            # start with "$", which MongoDB does not take as field names
+            "sensors": [{"name": name, "events": len(ts)} for name, (ts, _, _) in columns.items()]}
+    return evidence_store.put_bytes(db, fs, COLUMNS_FILE, encode(columns), tags=tags,
+                                    content_type=CONTENT_TYPE, batch=batch, binary=True)
+
+
+def load(db, fs, serial=None, source_sha256=None):
+    """
+    Columns of the latest stored version, or None. With `source_sha256`
+    only columns parsed from that exact sensor_data.txt are returned.
+    """
+    version = evidence_store.latest_version(db, COLUMNS_FILE, serial)
+    if version is None or (source_sha256 and version.get("source_sha256") != source_sha256):
+        return None
+    with evidence_store.open_version(fs, version) as reader:
+        return decode(reader.read())
+
+
+def wall_text(wall):
+    """wall column -> "HH:MM:SS.mmm" strings, as printed by the device."""
+    seconds, millis = np.divmod(wall, 1000)
+    minutes, seconds = np.divmod(seconds, 60)
+    hours, minutes = np.divmod(minutes, 60)
+    return [f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}" for h, m, s, ms in zip(hours, minutes, seconds, millis)]
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="List the sensor columns of the latest acquisition.")
+    parser.add_argument("--serial")
+    args = parser.parse_args(argv)
+    columns = load(mongo_store.get_db(), mongo_store.get_fs(), args.serial)
+    if columns is None:
+        print("[-] No sensor columns stored.")
+        return
+    for name, (ts, wall, values) in columns.items():
+        span = f"ts {ts.min():.3f}..{ts.max():.3f}" if len(ts) else "empty"
+        print(f"{name:<48} {len(ts):>6} events x {values.shape[1]} values  {span}")
+
+
+if __name__ == "__main__":
+    main()
@@ -38,18 +38,54 @@ app.get("/", (req, res) => {
   res.json({ message: "Forensic Artifact Express API is running" });
 });
 
+// Artifacts are content-addressed and may be zstd-compressed in GridFS, so
+// contents are read through backend/artifact_reader.py rather than by filename.
+const artifactReader = path.join(__dirname, 'artifact_reader.py');
+
+const readArtifactPage = (filename, query) => new Promise((resolve, reject) => {
+  const args = [artifactReader, filename];
+  if (query.serial) args.push('--serial', String(query.serial));
+  if (query.offset !== undefined) {
+    args.push('--offset', String(parseInt(query.offset, 10) || 0));
+    if (query.length !== undefined) args.push('--length', String(parseInt(query.length, 10) || 0));
+  } else {
+    args.push('--start', String(parseInt(query.start, 10) || 0));
+    if (query.lines !== undefined) args.push('--lines', String(parseInt(query.lines, 10) || 0));
+  }
+  const child = spawn('python', args);
+  let stdout = '';
+  let stderr = '';
+  child.stdout.on('data', (chunk) => { stdout += chunk.toString('utf8'); });
+  child.stderr.on('data', (chunk) => { stderr += chunk.toString('utf8'); });
+  child.on('error', reject);
+  child.on('close', () => {
+    try {
+      resolve(JSON.parse(stdout));
+    } catch (error) {
+      reject(new Error(stderr || error.message));
+    }
+  });
+});
+
 app.get("/artifacts", async (req, res) => {
-  /** List all stored artifacts. */
+  /** List the latest version of every stored artifact. */
   try {
-    const files = await db.collection('fs.files')
-      .find()
-      .sort({ uploadDate: -1 })
+    const versions = await db.collection('artifact_versions')
+      .aggregate([
+        { $sort: { acquired_at: -1, _id: -1 } },
+        { $group: { _id: { filename: '$filename', serial: '$serial' }, doc: { $first: '$$ROOT' } } },
+        { $sort: { 'doc.acquired_at': -1 } }
+      ])
       .toArray();
     
-    const result = files.map(f => ({
-      filename: f.filename,
-      uploadDate: f.uploadDate.toISOString(),
-      size: f.length
+    const result = versions.map(({ doc }) => ({
+      filename: doc.filename,
+      serial: doc.serial,
+      uploadDate: doc.acquired_at.toISOString(),
+      size: doc.length,
+      lineCount: doc.line_count,
+      sha256: doc.sha256,
+      version: doc.version
     }));
     
     res.json({ artifacts: result });
@@ -59,60 +95,53 @@ app.get("/artifacts", async (req, res) => {
   }
 });
 
-app.get("/artifact/content/:filename", async (req, res) => {
-  /** Return the text content of a file for preview. */
+// Artifact names can contain "/" (files from fs_acquisition keep their device
+// path), which a :filename parameter does not match, hence the wildcards.
+app.get("/artifact/content/*", async (req, res) => {
+  /** Return one page of an artifact's text (?start=&lines= or ?offset=&length=). */
   try {
-    const { filename } = req.params;
-    const file = await db.collection('fs.files').findOne({ filename });
-    
-    if (!file) {
+    const filename = req.params[0];
+    const page = await readArtifactPage(filename, req.query);
+    if (page.error) {
       return res.status(404).json({ error: "File not found" });
     }
-
-    const downloadStream = gfs.openDownloadStreamByName(filename);
-    let data = '';
-    
-    downloadStream.on('data', (chunk) => {
-      data += chunk.toString('utf8');
-    });
-    
-    downloadStream.on('end', () => {
-      res.json({ filename, content: data });
-    });
-    
-    downloadStream.on('error', (error) => {
-      console.error('Error reading file:', error);
-      res.status(500).json({ error: error.message });
-    });
-    
+    res.json({ ...page, content: page.text });
   } catch (error) {
     console.error('Error getting artifact content:', error);
     res.status(500).json({ error: error.message });
   }
 });
 
-app.get("/artifact/download/:filename", async (req, res) => {
+app.get("/artifact/download/*", async (req, res) => {
   /** Download the full file. */
   try {
-    const { filename } = req.params;
+    const filename = req.params[0];
     console.log(`Download request for: ${filename}`);
-    
-    const file = await db.collection('fs.files').findOne({filename});
-    if (!file) {
-      return res.status(404).json({ error: "File not found" });
-    }
-    
-    console.log("File found:", filename);
-    
-    res.setHeader('Content-Type', 'application/octet-stream');
-    res.setHeader('Content-Disposition', `attachment; filename="${filename}"`);
-    
-    const downloadStream = gfs.openDownloadStreamByName(filename);
-    downloadStream.pipe(res);
-    
-    downloadStream.on('error', (error) => {
-      console.error('Error downloading file:', error);
-      res.status(500).json({ error: error.message });
+
+    const args = [artifactReader, filename, '--raw'];
+    if (req.query.serial) args.push('--serial', String(req.query.serial));
+    const child = spawn('python', args);
+    let started = false;
+    let stderr = '';
+
+    const startDownload = () => {
+      started = true;
+      res.setHeader('Content-Type', 'application/octet-stream');
+      res.setHeader('Content-Disposition', `attachment; filename="${path.posix.basename(filename)}"`);
+    };
+    child.stdout.once('data', (chunk) => {
+      startDownload();
+      res.write(chunk);
+      child.stdout.pipe(res);
+    });
+    child.stderr.on('data', (chunk) => { stderr += chunk.toString('utf8'); });
+    child.on('close', (code) => {
+      if (started) return;
+      if (code !== 0) {
+        return res.status(404).json({ error: stderr.trim() || "File not found" });
+      }
+      startDownload();
+      res.end();
     });
     
   } catch (error) {
@@ -340,79 +369,34 @@ function runAdbCommand(command, options = {}) {
   });
 }
 
-// Proper recursive folder scanning
-async function scanFolderRecursive(basePath, currentPath = '', depth = 0) {
-  const fullPath = basePath + currentPath;
-  
-  // Safety limit to prevent infinite recursion
-  if (depth > 8) {
-    return {
-      name: currentPath.split('/').pop() || 'sdcard',
-      type: 'folder',
-      path: currentPath,
-      children: [],
-      partial: true,
-      info: 'Depth limit reached'
-    };
-  }
-  
-  try {
-    console.log(` Scanning (depth ${depth}): ${fullPath}`);
-    
-    // Get all items (simple list)
-    const itemsOutput = await runAdbCommand(`adb shell "ls -1 '${fullPath}'"`, { ignoreStderr: true });
-    const items = itemsOutput.split('\n').filter(item => item.trim());
-    
-    const folderNode = {
-      name: currentPath.split('/').pop() || 'sdcard',
-      type: 'folder',
-      path: currentPath,
-      children: []
-    };
+// Folder scanning: one device-side walk (backend/fs_acquisition.py --tree)
+// instead of an `ls` per directory and a `[ -d ]` per entry.
+async function scanFolderRecursive(basePath, currentPath = '') {
+  const fullPath = path.posix.join(basePath, currentPath);
+  console.log(` Scanning: ${fullPath}`);
 
-    for (const itemName of items) {
-      if (!itemName || itemName === '.' || itemName === '..') continue;
-      
-      const fullItemPath = `${fullPath}/${itemName}`;
-      const relativePath = currentPath ? `${currentPath}/${itemName}` : itemName;
-      
-      // Check if it's a directory
-      const isDir = await runAdbCommand(`adb shell "if [ -d '${fullItemPath}' ]; then echo 'dir'; fi"`, { 
-        ignoreStderr: true 
-      }).then(output => output.includes('dir')).catch(() => false);
-      
-      if (isDir) {
-        // RECURSIVE CALL - scan the subfolder
-        try {
-          const subFolder = await scanFolderRecursive(basePath, relativePath, depth + 1);
-          folderNode.children.push(subFolder);
-        } catch (subError) {
-          folderNode.children.push({
-            name: itemName,
-            type: 'folder',
-            path: relativePath,
-            children: [],
-            error: subError.message,
-            partial: true
-          });
-        }
-      } else {
-        // It's a file
-        folderNode.children.push({
-          name: itemName,
-          type: 'file',
-          path: relativePath
-        });
+  const script = path.join(__dirname, 'fs_acquisition.py');
+  return new Promise((resolve, reject) => {
+    const child = spawn('python', [script, '--tree', '--root', fullPath]);
+    let stdout = '';
+    let stderr = '';
+    child.stdout.on('data', (chunk) => { stdout += chunk.toString('utf8'); });
+    child.stderr.on('data', (chunk) => { stderr += chunk.toString('utf8'); });
+    child.on('error', reject);
+    child.on('close', (code) => {
+      if (code !== 0) {
+        console.error(` Error scanning folder ${fullPath}:`, stderr);
+        return reject(new Error(stderr.trim() || `Folder scan exited with code ${code}`));
       }
-    }
-
-    console.log(` ${fullPath}: ${folderNode.children.length} items`);
-    return folderNode;
-    
-  } catch (error) {
-    console.error(` Error scanning folder ${fullPath}:`, error.message);
-    throw error;
-  }
+      try {
+        const folderNode = JSON.parse(stdout);
+        console.log(` ${fullPath}: ${folderNode.children.length} items`);
+        resolve(folderNode);
+      } catch (error) {
+        reject(error);
+      }
+    });
+  });
 }
 
 // NEW: Get list of top-level folders in /sdcard
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+SQLite databases from the watch.
+
+1. Discovery, one shell call each: database files under /sdcard (by
+   name), and the `databases/` directory of every third-party app that
+   `run-as` works for (debuggable builds).
+2. Pull: each database travels in one `tar` stream together with its
+   -wal/-shm/-journal files, so the main file and its log are read back to
+   back and stay consistent. Databases are pulled in parallel; every file
+   is stored as evidence with its `source_path` and also unpacked into a
+   scratch directory.
+3. Parse: a process pool opens each copy read-only (`mode=ro`, so the WAL
+   is applied without writing anything back) and exports every table to
+   CSV.
+4. Each export is stored as evidence ("sqlite/<device path>/<table>.csv").
+   One document per database goes into the `sqlite_databases` collection:
+   its hashes, user_version, and per table the schema SQL, columns, row
+   count and the export's version.
+
+The device comes in as `samsung_adb.device_context()` (adb streams, serial,
+tags) rather than through an import: run as `samsung_adb.py`, that module
+is __main__, and importing it here would load a second copy with no
+device selected and no connection supervisor.
+
+    python sqlite_acquisition.py [--serial S] [--root /sdcard] [--no-apps] [--workers N]
+    python sqlite_acquisition.py --find TABLE_OR_COLUMN [--serial S]
+"""
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import fnmatch
+import io
+import multiprocessing
+import os
+import pathlib
+import posixpath
+import shlex
+import sqlite3
+import subprocess
+import tarfile
+import tempfile
+import time
+
+import adb_client
+import evidence_store
+import mongo_store
+
+DATABASES = "sqlite_databases"
+
+DEFAULT_ROOTS = ("/sdcard",)
+DEFAULT_PULLS = 4
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+DB_NAMES = ("*.db", "*.sqlite", "*.sqlite3", "*.db3")
+COMPANION_SUFFIXES = ("-wal", "-shm", "-journal")
+
+# Rows buffered per CSV write.
+EXPORT_ROWS = 5000
+
+
+def find_command(root):
+    """
+    Databases and their companion files under `root`, one path per line.
+    -H follows `root` itself when it is a symlink (/sdcard is one).
+    """
+    patterns = DB_NAMES + tuple(f"*{s}" for s in COMPANION_SUFFIXES)
+    names = " -o ".join(f"-name {shlex.quote(n)}" for n in patterns)
+    return f"find -H {shlex.quote(root)} -type f \\( {names} \\) 2>/dev/null"
+
+
+# Third-party packages whose data directory run-as can read, one per line.
+RUN_AS_PROBE = ("for p in $(pm list packages -3 2>/dev/null | cut -d: -f2); do "
+                "run-as \"$p\" true 2>/dev/null && echo \"$p\"; done")
+
+
+def discover(device, roots=DEFAULT_ROOTS, apps=True):
+    """
+    Databases on the device as dicts {path, package, files}: `files` are the
+    main file plus whichever companions exist, device paths.
+    """
+    groups = []
+    for root in roots:
+        groups += _group(_search(device, ['shell', find_command(root)], 600, root), None)
+    if apps:
+        for package in _search(device, ['shell', RUN_AS_PROBE], 120, "debuggable apps"):
+            base = f"/data/data/{package}"
+            lines = _search(device, ['shell', f"run-as {shlex.quote(package)} find databases -type f"], 60, package)
+            groups += _group([posixpath.join(base, posixpath.normpath(line)) for line in lines], package,
+                             every_file=True)
+    return groups
+
+
+def _search(device, command, timeout, what):
+    """Non-empty output lines of a discovery command; a failed search is logged and yields nothing."""
+    try:
+        return [line.strip() for line in device.adb_lines(command, timeout=timeout) if line.strip()]
+    except (OSError, adb_client.AdbError, subprocess.SubprocessError) as e:
+        print(f"[!] Could not search {what} for databases: {e}")
+        return []
+
+
+def _group(paths, package, every_file=False):
+    """Attach each -wal/-shm/-journal file to its database."""
+    files = {posixpath.normpath(p.strip()) for p in paths if p.strip()}
+    companions = {p for p in files if p.endswith(COMPANION_SUFFIXES)}
+    mains = sorted(p for p in files - companions
+                   if every_file or any(fnmatch.fnmatch(posixpath.basename(p), n) for n in DB_NAMES))
+    return [{"path": main, "package": package,
+             "files": [main] + [main + s for s in COMPANION_SUFFIXES if main + s in companions]}
+            for main in mains]
+
+
+def pull_command(group):
+    """exec-out command streaming a database and its companions as one tar."""
+    directory = posixpath.dirname(group["path"])
+    names = " ".join(shlex.quote(posixpath.basename(f)) for f in group["files"])
+    tar = f"tar -cf - -C {shlex.quote(directory)} {names}"
+    if group["package"]:
+        tar = f"run-as {shlex.quote(group['package'])} {tar}"
+    return ['exec-out', f"{tar} 2>/dev/null"]
+
+
+def pull(device, group, scratch, batch=None):
+    """
+    Stream one database group from the device, storing every file as
+    evidence and unpacking it under `scratch`. Returns {device path: version}.
+    """
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    directory = posixpath.dirname(group["path"])
+    stream = io.BufferedReader(evidence_store.ChunkReader(device.adb_output(pull_command(group), timeout=900)),
+                               buffer_size=device.chunk_size)
+    versions = {}
+    with tarfile.open(fileobj=stream, mode="r|") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            path = posixpath.normpath(posixpath.join(directory, member.name))
+            local = local_path(scratch, path)
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            reader = tar.extractfile(member)
+            with open(local, "wb") as out:
+                def chunks():
+                    for chunk in iter(lambda: reader.read(device.chunk_size), b""):
+                        out.write(chunk)
+                        yield chunk
+                versions[path] = evidence_store.put_stream(
+                    db, fs, path, chunks(), content_type="application/vnd.sqlite3",
+                    tags={**device.tags, "source_path": path, "package": group["package"],
+                          "mode": member.mode, "mtime": int(member.mtime)},
+                    batch=batch, binary=True,
+                )
+    return versions
+
+
+def local_path(scratch, device_path):
+    return os.path.join(scratch, *device_path.strip("/").split("/"))
+
+
+def _cell(value):
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def export_database(path, out_dir):
+    """
+    Open a pulled copy read-only and export every table to CSV under
+    `out_dir`. Runs in a worker process. Returns the schema index:
+    {"user_version", "tables": [{name, sql, columns, rows, csv}], "error"}.
+    """
+    result = {"user_version": None, "tables": [], "error": None}
+    try:
+        conn = sqlite3.connect(pathlib.Path(path).as_uri() + "?mode=ro", uri=True)
+        conn.text_factory = lambda data: data.decode("utf-8", "surrogateescape")
+    except sqlite3.Error as e:
+        result["error"] = str(e)
+        return result
+    try:
+        result["user_version"] = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY name").fetchall()
+        os.makedirs(out_dir, exist_ok=True)
+        for i, (name, sql) in enumerate(tables):
+            table = {"name": name, "sql": sql, "columns": [], "rows": 0, "csv": None}
+            try:
+                quoted = '"' + name.replace('"', '""') + '"'
+                table["columns"] = [{"name": c[1], "type": c[2], "pk": bool(c[5])}
+                                    for c in conn.execute(f"PRAGMA table_info({quoted})")]
+                cursor = conn.execute(f"SELECT * FROM {quoted}")
+                table["csv"] = os.path.join(out_dir, f"{i:04d}.csv")
+                with open(table["csv"], "w", newline="", encoding="utf-8", errors="surrogateescape") as f:
+                    writer = csv.writer(f)
+                    writer.writerow([d[0] for d in cursor.description])
+                    while True:
+                        rows = cursor.fetchmany(EXPORT_ROWS)
+                        if not rows:
+                            break
+                        writer.writerows([[_cell(v) for v in row] for row in rows])
+                        table["rows"] += len(rows)
+            except sqlite3.Error as e:
+                # virtual tables whose module is missing, corrupt pages, ...
+                table["error"] = str(e)
+            result["tables"].append(table)
+    except sqlite3.Error as e:
+        result["error"] = str(e)
+    finally:
+        conn.close()
+    return result
+
+
+def store_exports(device, group, versions, schema, batch=None):
+    """Store the CSV exports and the sqlite_databases document of one database."""
+    db, fs = mongo_store.get_db(), mongo_store.get_fs()
+    tables = []
+    for table in schema["tables"]:
+        csv_path = table.pop("csv")
+        if csv_path:
+            filename = f"sqlite{group['path']}/{table['name']}.csv"
+            with open(csv_path, "rb") as f:
+                version = evidence_store.put_stream(
+                    db, fs, filename, iter(lambda: f.read(device.chunk_size), b""), compress=True,
+                    content_type="text/csv; charset=utf-8",
+                    tags={**device.tags, "database": group["path"], "table": table["name"]},
+                    batch=batch,
+                )
+            table["export"] = {"filename": filename, "file_id": version["file_id"], "sha256": version["sha256"]}
+        tables.append(table)
+    main = versions.get(group["path"])
+    doc = {
+        "serial": device.serial,
+        "path": group["path"],
+        "package": group["package"],
+        "files": {posixpath.basename(p): {"sha256": v["sha256"], "length": v["length"], "file_id": v["file_id"]}
+                  for p, v in versions.items()},
+        "sha256": main["sha256"] if main else None,
+        "user_version": schema["user_version"],
+        "tables": tables,
+        "table_count": len(tables),
+        "row_count": sum(t["rows"] for t in tables),
+        "error": schema["error"],
+        "acquired_at": datetime.datetime.now(),
+    }
+    db[DATABASES].insert_one(doc)
+    return doc
+
+
+def ensure_indexes(db):
+    db[DATABASES].create_index([("serial", 1), ("path", 1), ("acquired_at", -1)])
+    db[DATABASES].create_index("package")
+    db[DATABASES].create_index("tables.name")
+    db[DATABASES].create_index("tables.columns.name")
+
+
+def acquire(device, roots=DEFAULT_ROOTS, apps=True, pulls=DEFAULT_PULLS, workers=DEFAULT_WORKERS, batch=None):
+    """
+    Discover, pull (`pulls` at a time) and export (`workers` processes)
+    every reachable database. Returns the sqlite_databases documents.
+    """
+    ensure_indexes(mongo_store.get_db())
+    groups = discover(device, roots, apps)
+    print(f"[+] Found {len(groups)} SQLite databases")
+    if not groups:
+        return []
+    docs = []
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory(prefix="sqlite_") as scratch, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=pulls, thread_name_prefix="sqlite-pull",
+                                                  initializer=device.thread_init) as pullers, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as parsers:
+        pulled = {pullers.submit(pull, device, g, scratch, batch): g for g in groups}
+        parsing = {}
+        for future in concurrent.futures.as_completed(pulled):
+            group = pulled[future]
+            try:
+                versions = future.result()
+            except Exception as e:
+                print(f"[!] Could not pull {group['path']}: {e}")
+                continue
+            if group["path"] not in versions:
+                print(f"[-] {group['path']} was not readable")
+                continue
+            out_dir = os.path.join(scratch, "exports", str(len(parsing)))
+            job = parsers.submit(export_database, local_path(scratch, group["path"]), out_dir)
+            parsing[job] = (group, versions)
+        for future in concurrent.futures.as_completed(parsing):
+            group, versions = parsing[future]
+            try:
+                doc = store_exports(device, group, versions, future.result(), batch)
+            except Exception as e:
+                print(f"[!] Could not export {group['path']}: {e}")
+                continue
+            docs.append(doc)
+            print(f"[+] {group['path']}: {doc['table_count']} tables, {doc['row_count']} rows"
+                  + (f" ({doc['error']})" if doc["error"] else ""))
+    return docs
+
+
+def find_tables(db, name, serial=None):
+    """Latest database documents with a table or column called `name`."""
+    query = {"$or": [{"tables.name": name}, {"tables.columns.name": name}]}
+    if serial is not None:
+        query["serial"] = serial
+    return list(db[DATABASES].find(query, {"path": 1, "package": 1, "acquired_at": 1, "tables.name": 1,
+                                           "tables.rows": 1, "tables.export": 1},
+                                   sort=[("acquired_at", -1)]))
+
+
+def main(argv=None):
+    import samsung_adb
+    parser = argparse.ArgumentParser(description="Pull and export the SQLite databases of the watch.")
+    parser.add_argument("--serial")
+    parser.add_argument("--root", action="append", help=f"directory to search (default {', '.join(DEFAULT_ROOTS)})")
+    parser.add_argument("--no-apps", action="store_true", help="skip run-as app databases")
+    parser.add_argument("--pulls", type=int, default=DEFAULT_PULLS, help="databases pulled at once")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parser processes")
+    parser.add_argument("--find", metavar="NAME", help="list stored databases with this table or column and exit")
+    args = parser.parse_args(argv)
+
+    if args.find:
+        for doc in find_tables(mongo_store.get_db(), args.find, args.serial):
+            for table in doc["tables"]:
+                export = table.get("export", {}).get("filename", "-")
+                print(f"{doc['path']}  {table['name']:<32} {table['rows']:>8} rows  {export}")
+        return
+    if args.serial:
+        samsung_adb.select_device(args.serial)
+    evidence_store.ensure_indexes(mongo_store.get_db())
+    start = time.perf_counter()
+    docs = acquire(samsung_adb.device_context(), tuple(args.root or DEFAULT_ROOTS), not args.no_apps,
+                   args.pulls, args.workers)
+    print(f"[+] Exported {len(docs)} databases ({sum(d['row_count'] for d in docs)} rows) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
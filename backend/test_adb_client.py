@@ -0,0 +1,100 @@
+"""AdbClient against FakeAdbServer: shell v1/v2, exec and the sync protocol."""
+import base64
+
+import pytest
+
+from adb_client import AdbError
+from fake_adb_server import DIR_MODE, FILE_MODE, FakeAdbServer
+
+SERIAL = "R3AW30ABCDE"
+BLOB = bytes(range(256)) * 600  # > one 64 KiB DATA packet
+
+RECORDING = {
+    "serial": SERIAL,
+    "features": ["shell_v2", "cmd"],
+    "shell": {
+        "dumpsys battery": {"stdout": "level: 80\n", "stderr": "warning\n", "exit": 3},
+        "cat /sdcard/blob.bin": {"stdout_b64": base64.b64encode(BLOB).decode("ascii")},
+    },
+    "files": {
+        "/sdcard/a.txt": {"data": "hello\n", "mode": FILE_MODE, "mtime": 1700000000},
+        "/sdcard/blob.bin": {"data_b64": base64.b64encode(BLOB).decode("ascii")},
+    },
+    "dirs": {"/sdcard": ["a.txt", "blob.bin", "DCIM"], "/sdcard/DCIM": []},
+}
+
+
+@pytest.fixture
+def server():
+    with FakeAdbServer(RECORDING) as fake:
+        yield fake
+
+
+@pytest.fixture
+def client(server):
+    return server.client(serial=SERIAL)
+
+
+def test_host_commands(server, client):
+    assert client.version() == 0x29
+    assert client.devices() == [(SERIAL, "device")]
+    assert client.features() == {"shell_v2", "cmd"}
+
+
+def test_unknown_serial_is_refused(server):
+    with pytest.raises(AdbError, match="not found"):
+        server.client(serial="other").open_service("shell:true")
+
+
+def test_shell_v2_separates_streams_and_reports_exit(client, server):
+    assert client.shell("dumpsys battery") == (b"level: 80\n", b"warning\n", 3)
+    assert "shell,v2,raw:dumpsys battery" in server.requests
+
+
+def test_shell_v1_fallback(server):
+    server.recording = {**RECORDING, "features": []}
+    client = server.client(serial=SERIAL)
+    # v1 has no stderr channel and no exit code
+    assert client.shell("dumpsys battery") == (b"level: 80\nwarning\n", b"", None)
+    assert "shell:dumpsys battery" in server.requests
+
+
+def test_unrecorded_command_fails(client):
+    with pytest.raises(AdbError, match="no recorded response"):
+        client.shell("dumpsys wifi")
+
+
+def test_exec_stream_is_binary_safe(client, server):
+    assert b"".join(client.exec_stream("cat /sdcard/blob.bin", chunk_size=4096)) == BLOB
+    assert "exec:cat /sdcard/blob.bin" in server.requests
+
+
+def test_sync_stat(client):
+    with client.sync() as sync:
+        assert sync.stat("/sdcard/a.txt") == (FILE_MODE, 6, 1700000000)
+        assert sync.stat("/sdcard")[0] == DIR_MODE
+        assert sync.stat("/sdcard/missing") == (0, 0, 0)
+
+
+def test_sync_list(client):
+    with client.sync() as sync:
+        entries = {name: (mode, size) for name, mode, size, _ in sync.list("/sdcard")}
+        assert entries == {"a.txt": (FILE_MODE, 6), "blob.bin": (FILE_MODE, len(BLOB)), "DCIM": (DIR_MODE, 4096)}
+        assert sync.list("/sdcard/DCIM") == []
+
+
+def test_sync_recv(client):
+    with client.sync() as sync:
+        assert b"".join(sync.iter_recv("/sdcard/blob.bin")) == BLOB
+        chunks = list(sync.iter_recv("/sdcard/blob.bin"))
+        assert len(chunks) > 1
+
+
+def test_sync_recv_fail_ends_session(client):
+    with client.sync() as sync:
+        with pytest.raises(AdbError, match="No such file"):
+            b"".join(sync.iter_recv("/sdcard/missing"))
+        with pytest.raises(AdbError, match="closed"):
+            sync.stat("/sdcard/a.txt")
+    with client.sync() as sync:
+        assert b"".join(sync.iter_recv("/sdcard/a.txt")) == b"hello\n"
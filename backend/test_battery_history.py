@@ -0,0 +1,87 @@
+"""battery_history on sample `dumpsys batterystats --history` output, through the stored column format."""
+import datetime
+
+import numpy as np
+import pytest
+
+import battery_history
+import columnar
+
+UTC = datetime.timezone.utc
+
+DUMP = b"""timezone=Europe/Berlin
+utc_offset=+0100
+Battery History (1% used, 5KB used of 4096KB, 50 strings using 3KB):
+                    0 (15) RESET:TIME: 2024-03-30-10-00-00
+                    0 (2) 100 status=discharging health=good plug=none temp=250 +running +wake_lock +screen
+      +1s234ms (2) 100 -screen
+      +5m00s010ms (3) 099 +wake_lock=u0a123:"*sync* adapter" -running
+      +1h02m03s004ms (2) 098 status=charging plug=ac +screen
+"""
+
+# 2024-03-30 10:00:00 in Berlin (UTC+1)
+START = int(datetime.datetime(2024, 3, 30, 9, 0, tzinfo=UTC).timestamp() * 1000)
+
+
+def parse(chunk_size=11):
+    parser = battery_history.HistoryParser()
+    for i in range(0, len(DUMP), chunk_size):
+        parser.feed(DUMP[i:i + chunk_size])
+    return parser
+
+
+@pytest.fixture
+def history():
+    return battery_history.History(*columnar.unpack(battery_history.MAGIC, parse().encode()))
+
+
+@pytest.mark.parametrize("text, ms", [("0", 0), ("+1s234ms", 1234), ("+5m00s010ms", 300010),
+                                      ("+1d00h00m00s000ms", 86400000), ("+1h02m03s004ms", 3723004)])
+def test_parse_offset(text, ms):
+    assert battery_history.parse_offset(text) == ms
+
+
+def test_timezone_and_clock():
+    parser = parse()
+    assert parser.tz.key == "Europe/Berlin"
+    assert parser.clock == [(0, START)]
+
+
+def test_transitions(history):
+    assert history.timezone == "Europe/Berlin"
+    assert list(history.transitions(START + 1, START + 4_000_000)) == [
+        (START + 1234, "screen", None, battery_history.OFF),
+        (START + 300010, "wake_lock", 'u0a123:"*sync* adapter"', battery_history.ON),
+        (START + 300010, "running", None, battery_history.OFF),
+        (START + 3723004, "status", "charging", battery_history.SET),
+        (START + 3723004, "plug", "ac", battery_history.SET),
+        (START + 3723004, "screen", None, battery_history.ON),
+    ]
+    assert history.span() == (START, START + 3723004)
+
+
+def test_levels_only_when_they_change(history):
+    assert list(history.level) == [100, 99, 98]
+    assert list(history.level_at([START - 1, START, START + 300010, START + 9_000_000])) == [-1, 100, 99, 98]
+
+
+def test_state_at(history):
+    times = [START - 1, START + 500, START + 2000, START + 4_000_000]
+    assert list(history.state_at(battery_history.SCREEN, times)) == [-1, 1, 0, 1]
+    assert history.state_at(battery_history.PLUGGED, times) == [None, "none", "none", "ac"]
+    assert list(history.state_at("unknown", times)) == [-1, -1, -1, -1]
+
+
+def test_join_sensor_places_wall_times_on_the_device_day(history):
+    reference = datetime.datetime(2024, 3, 30, 12, 0, tzinfo=UTC)  # 13:00 in Berlin
+    wall = np.array([10 * 3600000 + 1000, 23 * 3600000])  # 10:00:01 today, 23:00 the day before
+    joined = battery_history.join_sensor(history, wall, reference)
+    assert list(joined["time"]) == [START + 1000, START - 11 * 3600000]
+    assert list(joined[battery_history.SCREEN]) == [1, -1]
+
+
+def test_fixed_offset_without_zone_name():
+    parser = battery_history.HistoryParser()
+    parser.feed(b"timezone=\nutc_offset=-0300\n                    0 (15) RESET:TIME: 2024-03-30-10-00-00\n")
+    parser.columns()
+    assert parser.clock == [(0, int(datetime.datetime(2024, 3, 30, 13, 0, tzinfo=UTC).timestamp() * 1000))]
@@ -0,0 +1,92 @@
+"""bugreport_index on a synthetic bugreport zip: sections, services, members and slices."""
+import io
+import zipfile
+
+import pytest
+
+import bugreport_index
+
+MAIN = "bugreport-watch-2024-03-30.txt"
+
+WIFI = b"Wi-Fi is enabled\nSSID: home\n"
+SENSORS = b"lsm6dso Accelerometer: last 1 events\n 1 (ts=1.5, wall=10:11:12.345) 0.1, 9.8, 0.3,\n"
+PROPS = b"[ro.product.model]: [SM-R890]\n"
+LOG = b"03-30 10:00:00.000  100  101 I Tag: hello\n"
+
+TEXT = (b"== dumpstate: 2024-03-30 10:00:00\n"
+        b"------ SYSTEM PROPERTIES (getprop) ------\n" + PROPS
+        + b"------ 0.01s was the duration of 'SYSTEM PROPERTIES' ------\n"
+        b"------ SYSTEM LOG (logcat -v threadtime -v printable -v uid -d *:v) ------\n" + LOG
+        + b"------ DUMPSYS (/system/bin/dumpsys) ------\n"
+        b"DUMP OF SERVICE wifi:\n" + WIFI
+        + b"--------- 0.02s was the duration of dumpsys wifi, ending at: 2024-03-30 10:00:01\n"
+        b"DUMP OF SERVICE HIGH sensorservice:\n" + SENSORS
+        + b"--------- 0.01s was the duration of dumpsys sensorservice, ending at: 2024-03-30 10:00:01\n"
+        b"------ 0.05s was the duration of 'DUMPSYS' ------\n")
+
+
+class FakeFs:
+    """Stands in for GridFS: get() returns the stored zip."""
+
+    def __init__(self, blob):
+        self.blob = blob
+
+    def get(self, file_id):
+        return io.BytesIO(self.blob)
+
+
+@pytest.fixture
+def zipped():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("main_entry.txt", MAIN)
+        archive.writestr(MAIN, TEXT)
+        archive.writestr("FS/data/system/dropbox/system_app_crash@1711792800000.txt", b"crash\n")
+        archive.writestr("proto/activity.proto", b"\x08\x01")
+    return buf.getvalue()
+
+
+def by_name(sections):
+    return {(s["kind"], s["name"]): s for s in sections}
+
+
+def test_scan_text_sections_and_services():
+    sections = by_name(bugreport_index.scan_text(io.BytesIO(TEXT), MAIN))
+    assert set(sections) == {("section", "SYSTEM PROPERTIES"), ("section", "SYSTEM LOG"), ("section", "DUMPSYS"),
+                             ("service", "wifi"), ("service", "sensorservice")}
+    assert sections[("section", "SYSTEM PROPERTIES")]["command"] == "getprop"
+    assert sections[("service", "sensorservice")]["command"] == "dumpsys sensorservice"
+
+
+@pytest.mark.parametrize("key, body", [(("section", "SYSTEM PROPERTIES"), PROPS), (("section", "SYSTEM LOG"), LOG),
+                                       (("service", "wifi"), WIFI), (("service", "sensorservice"), SENSORS)])
+def test_section_offsets_slice_the_body(key, body):
+    section = by_name(bugreport_index.scan_text(io.BytesIO(TEXT), MAIN))[key]
+    assert TEXT[section["offset"]:section["offset"] + section["stats"].size] == body
+    assert section["stats"].line_count == body.count(b"\n")
+
+
+def test_build_index_includes_members(zipped):
+    sections = bugreport_index.build_index(FakeFs(zipped), "blob")
+    members = {s["name"]: s["kind"] for s in sections if s["kind"] in ("member", "dropbox")}
+    assert members == {"main_entry.txt": "member", "proto/activity.proto": "member",
+                       "FS/data/system/dropbox/system_app_crash@1711792800000.txt": "dropbox"}
+    assert all(s["member"] == MAIN for s in sections if s["kind"] in ("section", "service"))
+
+
+def test_main_entry_falls_back_to_largest_text():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        archive.writestr("version.txt", b"2.0")
+        archive.writestr(MAIN, TEXT)
+    with zipfile.ZipFile(buf) as archive:
+        assert bugreport_index.main_entry(archive) == MAIN
+
+
+def test_find_section_for_artifacts(zipped):
+    sections = bugreport_index.build_index(FakeFs(zipped), "blob")
+    for artifact in ("wifi_information.txt", "sensor_data.txt", "device_properties.txt", "logcat_capture.txt"):
+        kind, name, command = bugreport_index.ARTIFACT_SECTIONS[artifact]
+        assert bugreport_index.find_section(sections, kind, name, command) is not None, artifact
+    kind, name, command = bugreport_index.ARTIFACT_SECTIONS["ip_address_information.txt"]
+    assert bugreport_index.find_section(sections, kind, name, command) is None
@@ -0,0 +1,75 @@
+"""logcat_binary.Decoder on hand-built logger_entry records (v1, v4, events, truncated)."""
+import struct
+
+import pytest
+
+import logcat_binary
+
+
+def text_payload(priority, tag, message):
+    return bytes([priority]) + tag + b"\0" + message + b"\0"
+
+
+def v1(pid, sec, payload):
+    return struct.pack("<HHiiii", len(payload), 0, pid, pid + 1, sec, 0) + payload
+
+
+def v4(pid, sec, nsec, lid, uid, payload):
+    return struct.pack("<HHiiiiII", len(payload), 28, pid, pid + 1, sec, nsec, lid, uid) + payload
+
+
+# int32 tag 2718 with a list [7, "abc"]
+EVENT = (struct.pack("<I", 2718) + bytes([logcat_binary.EVENT_LIST, 2, logcat_binary.EVENT_INT]) + struct.pack("<i", 7)
+         + bytes([logcat_binary.EVENT_STRING]) + struct.pack("<i", 3) + b"abc")
+
+DUMP = (v4(100, 1700000000, 5_000_000, 0, 1000, text_payload(4, b"ActivityManager", b"Start proc\nline2"))
+        + v4(200, 1700003600, 0, 3, 1000, text_payload(6, b"Sys", b"err\n"))
+        + v4(1, 1700000001, 0, 2, 0, EVENT)
+        + v1(5, 1600000000, text_payload(3, b"Old", b"v1 msg")))
+
+
+def decode_all(data, step):
+    decoder = logcat_binary.Decoder()
+    entries = []
+    for i in range(0, len(data), step):
+        entries += decoder.feed(data[i:i + step])
+    return entries, decoder
+
+
+@pytest.mark.parametrize("step", [1, 7, len(DUMP)])
+def test_entries_split_across_chunks(step):
+    entries, decoder = decode_all(DUMP, step)
+    assert [(e["buffer"], e["priority"], e["tag"], e["message"]) for e in entries] == [
+        ("main", "I", "ActivityManager", "Start proc\nline2"),
+        ("system", "E", "Sys", "err"),
+        ("events", "I", "2718", "[7, 'abc']"),
+        ("main", "D", "Old", "v1 msg"),
+    ]
+    assert decoder.entries == 4
+    assert decoder.close() == 0
+
+
+def test_v4_header_fields():
+    entry = logcat_binary.Decoder().feed(DUMP)[0]
+    assert (entry["pid"], entry["tid"], entry["sec"], entry["nsec"], entry["lid"], entry["uid"]) == (
+        100, 101, 1700000000, 5_000_000, 0, 1000)
+    assert logcat_binary.format_threadtime(entry) == (
+        "11-14 22:13:20.005   100   101 I ActivityManager: Start proc\n"
+        "11-14 22:13:20.005   100   101 I ActivityManager: line2")
+
+
+def test_v1_header_has_no_uid():
+    entry = logcat_binary.Decoder().feed(v1(5, 1600000000, text_payload(3, b"Old", b"v1 msg")))[0]
+    assert (entry["pid"], entry["tid"], entry["lid"], entry["uid"]) == (5, 6, 0, None)
+
+
+def test_truncated_entry_is_kept_back():
+    decoder = logcat_binary.Decoder()
+    entries = decoder.feed(DUMP[:-5])
+    assert len(entries) == 3
+    assert decoder.close() == len(v1(5, 1600000000, text_payload(3, b"Old", b"v1 msg"))) - 5
+
+
+def test_bad_header_size_raises():
+    with pytest.raises(ValueError, match="header size"):
+        logcat_binary.Decoder().feed(struct.pack("<HH", 4, 12) + b"\0" * 30)
@@ -0,0 +1,121 @@
+"""package_inventory.Inventory on sample `pm list packages` and `dumpsys package` output."""
+import datetime
+
+import pytest
+
+import package_inventory
+
+PM_LIST = b"""package:/data/app/~~abc==/com.whatsapp-xyz==/base.apk=com.whatsapp installer=com.android.vending uid:10123
+package:/system/app/Settings/Settings.apk=com.android.settings installer=null uid:1000\r
+package:/system/priv-app/Only/Only.apk=com.only.listed uid:10200
+"""
+
+DUMP = b"""Activity Resolver Table:
+  Non-Data Actions:
+      android.intent.action.MAIN:
+        abc com.whatsapp/.Main filter 1
+
+Packages:
+  Package [com.whatsapp] (4b1a2c):
+    userId=10123
+    codePath=/data/app/~~abc==/com.whatsapp-xyz==
+    versionCode=231234 minSdk=21 targetSdk=33
+    versionName=2.23.1
+    flags=[ HAS_CODE ALLOW_CLEAR_USER_DATA ]
+    firstInstallTime=2023-05-01 10:00:01
+    lastUpdateTime=2023-06-01 11:00:00
+    installerPackageName=com.android.vending
+    requested permissions:
+      android.permission.INTERNET
+      android.permission.CAMERA
+    install permissions:
+      android.permission.INTERNET: granted=true
+      android.permission.WAKE_LOCK: granted=false
+    User 0: ceDataInode=123 installed=true hidden=false suspended=false stopped=false
+      gids=[3003]
+      runtime permissions:
+        android.permission.CAMERA: granted=true, flags=[ USER_SET ]
+        android.permission.BODY_SENSORS: granted=false, flags=[ ]
+  Package [com.android.settings] (5c):
+    userId=1000
+    versionCode=33 minSdk=33 targetSdk=33
+    versionName=13
+    install permissions:
+      android.permission.REBOOT: granted=true
+
+Hidden system packages:
+  Package [com.android.settings] (5d):
+    userId=1000
+    versionName=12
+"""
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    def insert_many(self, docs, ordered=True):
+        self.docs += docs
+
+    def insert_one(self, doc):
+        self.docs.append(doc)
+
+
+class FakeDb(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def run(chunk_size, batch_size=1):
+    db = FakeDb()
+    inventory = package_inventory.Inventory(db, serial="S1", batch_size=batch_size)
+    for i in range(0, len(PM_LIST), chunk_size):
+        inventory.feed_list(PM_LIST[i:i + chunk_size])
+    for i in range(0, len(DUMP), chunk_size):
+        inventory.feed_dump(DUMP[i:i + chunk_size])
+    count = inventory.close(sources={"dumpsys package": "sha"})
+    return count, {d["package"]: d for d in db[package_inventory.PACKAGES].docs}, db
+
+
+def test_parse_list_line():
+    assert package_inventory.parse_list_line("package:/system/app/S.apk=com.s installer=null uid:1000") == {
+        "package": "com.s", "path": "/system/app/S.apk", "uid": 1000, "installer": None}
+    assert package_inventory.parse_list_line("not a package line") is None
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64, len(DUMP)])
+def test_dump_and_list_are_merged(chunk_size):
+    count, packages, db = run(chunk_size)
+    assert count == 3
+    assert sorted(packages) == ["com.android.settings", "com.only.listed", "com.whatsapp"]
+    assert db[package_inventory.INVENTORIES].docs[0]["packages"] == 3
+    whatsapp = packages["com.whatsapp"]
+    assert whatsapp["path"] == "/data/app/~~abc==/com.whatsapp-xyz==/base.apk"
+    assert whatsapp["installer"] == "com.android.vending"
+    assert (whatsapp["uid"], whatsapp["version_code"], whatsapp["min_sdk"], whatsapp["target_sdk"]) == (10123, 231234, 21, 33)
+    assert whatsapp["flags"] == ["HAS_CODE", "ALLOW_CLEAR_USER_DATA"]
+    assert whatsapp["first_install_time"] == datetime.datetime(2023, 5, 1, 10, 0, 1)
+
+
+def test_only_granted_permissions_are_kept():
+    _, packages, _ = run(64)
+    whatsapp = packages["com.whatsapp"]
+    assert whatsapp["install_permissions"] == ["android.permission.INTERNET"]
+    assert whatsapp["runtime_permissions"] == ["android.permission.CAMERA"]
+    assert whatsapp["permissions"] == ["android.permission.CAMERA", "android.permission.INTERNET"]
+    assert whatsapp["users"]["0"]["installed"] == "true"
+
+
+def test_hidden_system_packages_are_skipped():
+    _, packages, _ = run(64)
+    assert packages["com.android.settings"]["version_name"] == "13"
+    assert packages["com.android.settings"]["installer"] is None
+
+
+def test_listed_package_missing_from_dump_is_kept():
+    _, packages, _ = run(64)
+    listed = packages["com.only.listed"]
+    assert (listed["path"], listed["uid"], listed["installer"], listed["permissions"]) == (
+        "/system/priv-app/Only/Only.apk", 10200, None, [])
+    assert "version_name" not in listed
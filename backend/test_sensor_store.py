@@ -0,0 +1,50 @@
+"""sensor_store on sample `dumpsys sensorservice` output: parsing, masked events and the blob round trip."""
+import numpy as np
+
+import sensor_store
+
+DUMP = b"""Sensor List:
+0x0000000b) lsm6dso Accelerometer | STMicro | ver: 1 | type: android.sensor.accelerometer(1)
+Recent Sensor events:
+lsm6dso Accelerometer: last 3 events
+     1 (ts=12345.678901, wall=10:11:12.345) 0.12, 9.81, 0.30,
+     2 (ts=12345.700000, wall=10:11:12.4) [value masked]
+     3 (ts=12345.800000, wall=23:59:59.999) -1.5e-01, 9.80, 0.31,
+Heart Rate: last 1 events
+     1 (ts=12000.000000, wall=10:00:00) 72.00,
+Empty Sensor: last 0 events
+"""
+
+
+def parse(chunk_size):
+    parser = sensor_store.SensorParser()
+    for i in range(0, len(DUMP), chunk_size):
+        parser.feed(DUMP[i:i + chunk_size])
+    return parser.columns()
+
+
+def test_columns_per_sensor():
+    columns = parse(5)
+    assert list(columns) == ["lsm6dso Accelerometer", "Heart Rate"]
+    ts, wall, values = columns["lsm6dso Accelerometer"]
+    assert ts.tolist() == [12345.678901, 12345.7, 12345.8]
+    assert sensor_store.wall_text(wall) == ["10:11:12.345", "10:11:12.400", "23:59:59.999"]
+    assert values.shape == (3, 3)
+    np.testing.assert_allclose(values[2], [-0.15, 9.80, 0.31], rtol=1e-6)
+
+
+def test_masked_event_is_a_row_of_nan():
+    _, _, values = parse(len(DUMP))["lsm6dso Accelerometer"]
+    assert np.isnan(values[1]).all()
+    assert not np.isnan(values[0]).any()
+
+
+def test_blob_round_trip_is_zero_copy():
+    columns = parse(64)
+    decoded = sensor_store.decode(sensor_store.encode(columns))
+    assert list(decoded) == list(columns)
+    for name, (ts, wall, values) in columns.items():
+        np.testing.assert_array_equal(decoded[name][0], ts)
+        np.testing.assert_array_equal(decoded[name][1], wall)
+        np.testing.assert_array_equal(decoded[name][2], values)
+    assert not decoded["Heart Rate"][0].flags.writeable
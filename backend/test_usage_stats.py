@@ -0,0 +1,101 @@
+"""usage_stats.UsageIngest on sample `dumpsys usagestats` output, fed in small chunks."""
+import datetime
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+import usage_stats
+
+UTC = datetime.timezone.utc
+
+DUMP = b"""timezone=Europe/Berlin
+utc_offset=+0100
+user=0
+  In-memory daily stats
+  timeRange="2024-03-30 00:00:00 - 2024-03-31 23:59:59"
+  events
+    time="2024-03-30 10:00:00" type=SCREEN_INTERACTIVE package=android
+    time="2024-03-30 10:00:05" type=ACTIVITY_RESUMED package=com.foo class=com.foo.Main instanceId=12 taskRootPackage=com.foo
+    time="2024-03-30 10:05:00" type=ACTIVITY_PAUSED package=com.foo class=com.foo.Main instanceId=12 flags=0x0
+    time="2024-03-31 10:00:00" type=ACTIVITY_RESUMED package=com.bar class=com.bar.A instanceId=3
+    time="not a time" type=ACTIVITY_RESUMED package=com.bad
+user=10
+  events
+    time="1711792800000" type=MOVE_TO_BACKGROUND package=com.work
+"""
+
+
+class FakeCollection:
+    def __init__(self, fail_with=None):
+        self.docs = []
+        self.fail_with = fail_with
+
+    def insert_many(self, docs, ordered=True):
+        if self.fail_with:
+            raise self.fail_with
+        self.docs += docs
+        return type("Result", (), {"inserted_ids": [None] * len(docs)})()
+
+
+def ingest(chunk_size=13, batch_size=2, collection=None):
+    collection = collection or FakeCollection()
+    parser = usage_stats.UsageIngest({usage_stats.EVENTS: collection}, serial="S1", batch_size=batch_size)
+    for i in range(0, len(DUMP), chunk_size):
+        parser.feed(DUMP[i:i + chunk_size])
+    return parser, parser.close(), collection.docs
+
+
+def test_events_are_parsed_in_batches():
+    parser, inserted, docs = ingest()
+    assert parser.parsed == inserted == len(docs) == 5
+    assert [(d["user"], d["type"], d["package"], d["state"]) for d in docs] == [
+        (0, "SCREEN_INTERACTIVE", "android", None),
+        (0, "ACTIVITY_RESUMED", "com.foo", "foreground"),
+        (0, "ACTIVITY_PAUSED", "com.foo", "background"),
+        (0, "ACTIVITY_RESUMED", "com.bar", "foreground"),
+        (10, "MOVE_TO_BACKGROUND", "com.work", "background"),
+    ]
+
+
+def test_fields_are_renamed_or_kept_as_extras():
+    _, _, docs = ingest()
+    assert docs[1]["class"] == "com.foo.Main"
+    assert docs[1]["instance_id"] == "12"
+    assert docs[1]["task_root_package"] == "com.foo"
+    assert docs[2]["extras"] == {"flags": "0x0"}
+    assert "extras" not in docs[0]
+
+
+def test_local_times_follow_the_device_timezone_across_dst():
+    _, _, docs = ingest()
+    # Berlin is UTC+1 before 2024-03-31 02:00 and UTC+2 after
+    assert docs[0]["time"] == datetime.datetime(2024, 3, 30, 9, 0, tzinfo=UTC)
+    assert docs[3]["time"] == datetime.datetime(2024, 3, 31, 8, 0, tzinfo=UTC)
+    assert docs[0]["epoch_ms"] == 1711789200000
+    assert docs[4]["time"] == datetime.datetime(2024, 3, 30, 10, 0, tzinfo=UTC)
+
+
+def test_duplicates_are_counted_not_raised():
+    error = BulkWriteError({"nInserted": 1, "writeErrors": [{"code": 11000}]})
+    _, inserted, _ = ingest(batch_size=100, collection=FakeCollection(fail_with=error))
+    assert inserted == 1
+
+
+def test_other_write_errors_are_raised():
+    error = BulkWriteError({"nInserted": 0, "writeErrors": [{"code": 121}]})
+    with pytest.raises(BulkWriteError):
+        ingest(batch_size=100, collection=FakeCollection(fail_with=error))
+
+
+def test_foreground_spans():
+    _, _, docs = ingest()
+    assert usage_stats.foreground_spans(docs) == [
+        ("com.foo", docs[1]["time"], docs[2]["time"]),
+        ("com.bar", docs[3]["time"], None),
+    ]
+
+
+def test_unknown_zone_falls_back_to_the_utc_offset():
+    parser = usage_stats.UsageIngest({usage_stats.EVENTS: FakeCollection()})
+    parser.feed(b"timezone=Not/AZone\nutc_offset=-0530\n")
+    assert parser._time("2024-03-30 10:00:00") == datetime.datetime(2024, 3, 30, 15, 30, tzinfo=UTC)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Line splitting and device timezone for dumps parsed while they stream.
+
+Collectors tap the chunks of a dump on their way into evidence storage
+(package_inventory, usage_stats, battery_history, sensor_store) and the
+chunks end anywhere, so LineFeed carries the unfinished line over to the
+next one. Dumps with device-local times are run behind TIMEZONE_COMMAND,
+whose output lines timezone_line() turns into a tzinfo.
+"""
+import datetime
+import re
+import zoneinfo
+
+# Prefix for a shell command: its first lines give the device timezone.
+TIMEZONE_COMMAND = "echo \"timezone=$(getprop persist.sys.timezone)\"; echo \"utc_offset=$(date +%z)\"; "
+
+UTC_OFFSET = re.compile(r"([+-])(\d\d)(\d\d)")
+
+
+class LineFeed:
+    """Splits fed byte chunks into decoded lines (without "\\r\\n") for a callback."""
+
+    def __init__(self, on_line, errors="replace"):
+        self._on_line = on_line
+        self._errors = errors
+        self._pending = b""
+
+    def feed(self, chunk):
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()
+        for line in lines:
+            self._on_line(line.rstrip(b"\r").decode("utf-8", self._errors))
+
+    def close(self):
+        if self._pending:
+            self._on_line(self._pending.rstrip(b"\r").decode("utf-8", self._errors))
+            self._pending = b""
+
+
+def iter_lines(chunks, errors="replace"):
+    """Yield the decoded lines of an iterator of byte chunks as they complete."""
+    lines = []
+    feed = LineFeed(lines.append, errors)
+    for chunk in chunks:
+        feed.feed(chunk)
+        yield from lines
+        lines.clear()
+    feed.close()
+    yield from lines
+
+
+def timezone_line(line, tz):
+    """
+    The timezone after `line` if it is one of TIMEZONE_COMMAND's lines
+    (`tz` is the one known so far), else None. A named zone is kept over
+    the numeric offset, which is only right for one side of a DST change.
+    """
+    if not line.startswith(("timezone=", "utc_offset=")):
+        return None
+    key, _, value = line.partition("=")
+    if key == "timezone":
+        try:
+            return zoneinfo.ZoneInfo(value.strip())
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            return tz
+    match = UTC_OFFSET.fullmatch(value.strip())
+    if not match or isinstance(tz, zoneinfo.ZoneInfo):
+        return tz
+    delta = datetime.timedelta(hours=int(match.group(2)), minutes=int(match.group(3)))
+    return datetime.timezone(-delta if match.group(1) == "-" else delta)
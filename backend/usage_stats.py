@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+App usage timeline from `dumpsys usagestats`.
+
+The dump lists, per user and interval, the raw usage events:
+
+    user=0
+      In-memory daily stats
+      ...
+      events
+        time="2024-03-01 10:00:00" type=ACTIVITY_RESUMED package=com.foo class=com.foo.Main instanceId=12 ...
+
+It is streamed into evidence storage and parsed on the way through, one
+line at a time. Device times are local, so the same shell call prints the
+device timezone first; events get UTC datetimes and epoch milliseconds.
+Each event becomes a document in `usage_events`, with `state` set to
+"foreground" or "background" for activity/app transitions. The collection
+is indexed on (serial, time) and (serial, package, time), so "what was
+the user doing between T1 and T2" is a range query. A unique key on the
+event fields drops the copies that appear in several intervals or in
+repeated acquisitions.
+
+    python usage_stats.py START END [--serial S] [--package P]     # ISO times, UTC
+"""
+import argparse
+import datetime
+import re
+
+import pymongo
+from pymongo.errors import BulkWriteError
+
+import text_stream
+
+EVENTS = "usage_events"
+
+# The timezone lines come first, so dump times can be converted while streaming.
+COMMAND = text_stream.TIMEZONE_COMMAND + "dumpsys usagestats"
+
+BATCH_SIZE = 1000
+
+FIELD = re.compile(r'(\w+)=("[^"]*"|\S+)')
+USER_LINE = re.compile(r"^user=(\d+)")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FOREGROUND = {"ACTIVITY_RESUMED", "MOVE_TO_FOREGROUND", "FOREGROUND_SERVICE_START"}
+BACKGROUND = {"ACTIVITY_PAUSED", "ACTIVITY_STOPPED", "MOVE_TO_BACKGROUND", "FOREGROUND_SERVICE_STOP"}
+
+# Event fields that identify one event; the unique index is built on them.
+EVENT_KEY = ("serial", "user", "epoch_ms", "type", "package", "class", "instance_id")
+
+# Dump field -> document field; the rest go into `extras`.
+RENAMED = {"package": "package", "class": "class", "instanceId": "instance_id",
+           "taskRootPackage": "task_root_package", "taskRootClass": "task_root_class",
+           "shortcutId": "shortcut_id", "standbyBucket": "standby_bucket", "channelId": "channel_id"}
+
+
+class UsageIngest:
+    """
+    Streaming parser for COMMAND's output: feed() raw chunks, close() at
+    the end. Finished events are written in batches of BATCH_SIZE.
+    """
+
+    def __init__(self, db, serial=None, batch_size=BATCH_SIZE):
+        self.db = db
+        self.serial = serial
+        self.batch_size = batch_size
+        self.tz = datetime.timezone.utc
+        self.user = None
+        self.parsed = 0
+        self.inserted = 0
+        self._batch = []
+        self._lines = text_stream.LineFeed(self._line)
+
+    def feed(self, chunk):
+        self._lines.feed(chunk)
+
+    def _line(self, line):
+        line = line.strip()
+        tz = text_stream.timezone_line(line, self.tz)
+        if tz is not None:
+            self.tz = tz
+            return
+        user = USER_LINE.match(line)
+        if user:
+            self.user = int(user.group(1))
+            return
+        if line.startswith("time=") and " type=" in line:
+            event = self.parse_event(line)
+            if event:
+                self._batch.append(event)
+                if len(self._batch) >= self.batch_size:
+                    self.flush()
+
+    def parse_event(self, line):
+        fields = {k: v.strip('"') for k, v in FIELD.findall(line)}
+        when = self._time(fields.pop("time", ""))
+        if when is None:
+            return None
+        event_type = fields.pop("type", None)
+        doc = {"serial": self.serial, "user": self.user, "time": when,
+               "epoch_ms": int(when.timestamp() * 1000), "type": event_type,
+               "state": "foreground" if event_type in FOREGROUND else "background" if event_type in BACKGROUND else None,
+               "package": None, "class": None, "instance_id": None}
+        extras = {}
+        for key, value in fields.items():
+            if key in RENAMED:
+                doc[RENAMED[key]] = value
+            else:
+                extras[key] = value
+        if extras:
+            doc["extras"] = extras
+        self.parsed += 1
+        return doc
+
+    def _time(self, text):
+        """Dump time ("yyyy-MM-dd HH:mm:ss" local, or epoch ms) as an aware UTC datetime."""
+        if text.isdigit():
+            return datetime.datetime.fromtimestamp(int(text) / 1000, tz=datetime.timezone.utc)
+        try:
+            local = datetime.datetime.strptime(text, TIME_FORMAT)
+        except ValueError:
+            return None
+        return local.replace(tzinfo=self.tz).astimezone(datetime.timezone.utc)
+
+    def flush(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        try:
+            self.inserted += len(self.db[EVENTS].insert_many(batch, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # duplicates of events already stored are expected
+            self.inserted += e.details.get("nInserted", 0)
+            if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                raise
+
+    def close(self):
+        self._lines.close()
+        self.flush()
+        return self.inserted
+
+
+def ensure_indexes(db):
+    db[EVENTS].create_index([("serial", 1), ("time", 1)])
+    db[EVENTS].create_index([("serial", 1), ("package", 1), ("time", 1)])
+    db[EVENTS].create_index([(field, 1) for field in EVENT_KEY], unique=True)
+
+
+def events_between(db, start, end, serial=None, package=None):
+    """Usage events with start <= time < end (aware or UTC datetimes), oldest first."""
+    query = {"time": {"$gte": start, "$lt": end}}
+    if serial is not None:
+        query["serial"] = serial
+    if package is not None:
+        query["package"] = package
+    return db[EVENTS].find(query, {"_id": 0}, sort=[("time", pymongo.ASCENDING)])
+
+
+def foreground_spans(events):
+    """
+    (package, start, end) spans an app was in the foreground, from
+    time-ordered events; a span still open at the end has end None.
+    """
+    spans, opened = [], {}
+    for event in events:
+        package = event.get("package")
+        if event.get("state") == "foreground":
+            opened.setdefault(package, event["time"])
+        elif event.get("state") == "background" and package in opened:
+            spans.append((package, opened.pop(package), event["time"]))
+    spans += [(package, start, None) for package, start in opened.items()]
+    return sorted(spans, key=lambda s: s[1])
+
+
+def _utc(text):
+    when = datetime.datetime.fromisoformat(text)
+    return when if when.tzinfo else when.replace(tzinfo=datetime.timezone.utc)
+
+
+def main(argv=None):
+    import mongo_store
+    parser = argparse.ArgumentParser(description="Print app usage between two times.")
+    parser.add_argument("start", type=_utc, help="ISO time, UTC unless an offset is given")
+    parser.add_argument("end", type=_utc)
+    parser.add_argument("--serial")
+    parser.add_argument("--package")
+    parser.add_argument("--events", action="store_true", help="print raw events instead of foreground spans")
+    args = parser.parse_args(argv)
+    events = list(events_between(mongo_store.get_db(), args.start, args.end, args.serial, args.package))
+    if not events:
+        print("[-] No usage events in that range.")
+        return
+    if args.events:
+        for e in events:
+            print(f"{e['time']:%Y-%m-%d %H:%M:%S}  {e['type']:<28} {e.get('package') or ''} {e.get('class') or ''}")
+        return
+    for package, start, end in foreground_spans(events):
+        until = f"{end:%H:%M:%S}" if end else "..."
+        print(f"{start:%Y-%m-%d %H:%M:%S} - {until:<8}  {package}")
+
+
+if __name__ == "__main__":
+    main()
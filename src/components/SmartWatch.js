@@ -16,6 +16,7 @@ const SmartWatch = () => {
   const [artifacts, setArtifacts] = useState({});
   const [selectedArtifact, setSelectedArtifact] = useState(null);
   const [artifactText, setArtifactText] = useState('');
+  const [artifactNextLine, setArtifactNextLine] = useState(null);
   const [statusMessage, setStatusMessage] = useState('');
 
   // 👉 New filesystem states
@@ -39,6 +40,7 @@ const SmartWatch = () => {
     setArtifacts({});
     setSelectedArtifact(null);
     setArtifactText('');
+    setArtifactNextLine(null);
     try {
       const queryParams = new URLSearchParams({ source: 'SmartWatch' });
       const response = await fetch(`http://localhost:5000/api/packet-report?${queryParams.toString()}`);
@@ -93,12 +95,33 @@ const SmartWatch = () => {
     );
   };
 
+  // ============================
+  // 🧩 Page artifact contents on demand
+  // ============================
+  const ARTIFACT_PAGE_LINES = 500;
+
+  const loadArtifactPage = async (artifactName, start) => {
+    try {
+      const queryParams = new URLSearchParams({ start, lines: ARTIFACT_PAGE_LINES });
+      const response = await fetch(`http://localhost:5000/artifact/content/${encodeURIComponent(artifactName)}?${queryParams.toString()}`);
+      if (!response.ok) throw new Error(`Failed to load ${artifactName}: ${response.statusText}`);
+      const page = await response.json();
+      setArtifactText((prev) => (start === 0 ? page.content : `${prev}\n${page.content}`));
+      const next = start + page.lines;
+      const total = page.line_count ?? artifacts[artifactName]?.line_count ?? 0;
+      setArtifactNextLine(page.lines > 0 && next < total ? next : null);
+    } catch (err) {
+      setArtifactText(`Error reading ${artifactName}: ${err.message}`);
+      setArtifactNextLine(null);
+    }
+  };
+
   // ============================
   // 🧩 Download Artifact
   // ============================
   const handleDownloadArtifact = async (artifactName) => {
     try {
-      const response = await fetch(`http://localhost:5000/artifact/download/${artifactName}`);
+      const response = await fetch(`http://localhost:5000/artifact/download/${encodeURIComponent(artifactName)}`);
       if (!response.ok) throw new Error('Failed to download file.');
 
       const blob = await response.blob();
@@ -235,9 +258,11 @@ const SmartWatch = () => {
                       if (selectedArtifact === key) {
                         setSelectedArtifact(null);
                         setArtifactText('');
+                        setArtifactNextLine(null);
                       } else {
                         setSelectedArtifact(key);
-                        setArtifactText(artifacts[key]);
+                        setArtifactText('Loading...');
+                        loadArtifactPage(key, 0);
                       }
                     }}
                     style={{
@@ -298,6 +323,24 @@ const SmartWatch = () => {
                 <>
                   <h3 style={{ color: '#0f0' }}>{selectedArtifact.replace(/_/g, ' ')}</h3>
                   <p style={{ fontFamily: 'monospace' }}>{artifactText}</p>
+                  {artifactNextLine !== null && (
+                    <motion.button
+                      onClick={() => loadArtifactPage(selectedArtifact, artifactNextLine)}
+                      style={{
+                        padding: '6px 10px',
+                        backgroundColor: '#0f0',
+                        color: '#000',
+                        border: 'none',
+                        borderRadius: '5px',
+                        cursor: 'pointer',
+                        fontSize: '0.8rem',
+                        fontFamily: "'Orbitron', sans-serif"
+                      }}
+                      whileHover={{ scale: 1.05 }}
+                    >
+                      Load more ({artifacts[selectedArtifact]?.line_count - artifactNextLine} lines left)
+                    </motion.button>
+                  )}
                 </>
               ) : (
                 <p style={{ color: '#0f0', opacity: 0.7 }}>Select an artifact to view its contents.</p>